@@ -0,0 +1,76 @@
+"""Compares adaptive quadtree sampling of the potential with uniform grids.
+
+Run from the repository root:
+
+    python benchmarks/adaptive.py [scene ...]
+
+For each scene (by default all in scenes/) the heatmap of an 800x600 view
+is computed exactly, one sample per pixel, then with uniform grids scaled
+up as Potential.plot does and with HeatmapRefiner at several tolerances.
+Reports the kernel evaluations of each and its visual error: the mean
+difference in colormap entries from the exact heatmap and the share of
+pixels more than one entry off.
+"""
+import glob
+import os
+import sys
+import time
+
+import numpy
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import electrostatics  # noqa: E402
+from electrostatics import HeatmapRefiner, log_scale, sample_grid  # noqa: E402
+from scene import load_scene  # noqa: E402
+
+WIDTH, HEIGHT = 800, 600
+RESOLUTIONS = (50, 100, 200, 400)
+TOLERANCES = (0.1, 0.03, 0.01, 0.003)
+
+
+def color_index(z, n=256):
+    """Returns the colormap entries of the potentials 'z', as get_colors picks them."""
+    return numpy.clip(log_scale(z) * n, 0, n - 1).astype(int)
+
+
+def report(name, evaluations, seconds, z, exact):
+    difference = numpy.abs(color_index(z) - exact)
+    print('  %-16s %8d evaluations %7.1f ms   mean error %5.2f   off by >1: %5.2f%%'
+          % (name, evaluations, 1e3 * seconds, difference.mean(), 100 * (difference > 1).mean()))
+
+
+def main(*scenes):
+    electrostatics.init(WIDTH, HEIGHT)
+    for path in scenes or sorted(glob.glob('scenes/*.json')):
+        charges = load_scene(path)
+        x, y = sample_grid(WIDTH, HEIGHT)
+        charges.V(x[:2, :2].ravel(), y[:2, :2].ravel())  # Compile the kernels outside the timings
+        start = time.perf_counter()
+        z = charges.V(x.ravel(), y.ravel()).reshape(HEIGHT, WIDTH)
+        seconds = time.perf_counter() - start
+        exact = color_index(z)
+        print(path)
+        report('exact', z.size, seconds, z, exact)
+
+        for resolution in RESOLUTIONS:
+            start = time.perf_counter()
+            x, y = sample_grid(resolution, resolution)
+            z = charges.V(x.ravel(), y.ravel()).reshape(resolution, resolution)
+            seconds = time.perf_counter() - start
+            # Scaled up to the screen by nearest neighbor, like pygame.transform.scale
+            rows = numpy.arange(HEIGHT) * resolution // HEIGHT
+            columns = numpy.arange(WIDTH) * resolution // WIDTH
+            report('grid %dx%d' % (resolution, resolution), z.size, seconds, z[numpy.ix_(rows, columns)], exact)
+
+        for tolerance in TOLERANCES:
+            start = time.perf_counter()
+            refiner = HeatmapRefiner(charges, WIDTH, HEIGHT, tolerance=tolerance)
+            refiner.refine(numpy.inf)
+            z = refiner.values()
+            seconds = time.perf_counter() - start
+            report('tolerance %g' % tolerance, refiner.evaluations, seconds, z, exact)
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
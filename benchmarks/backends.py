@@ -0,0 +1,46 @@
+"""Compares the compiled kernels with the NumPy kernels for agreement and speed.
+
+Run from the repository root (needs numba for the compiled side):
+
+    python benchmarks/backends.py
+"""
+import os
+import sys
+import timeit
+
+import numpy
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import electrostatics  # noqa: E402
+
+
+def main(n=200000, k=50, repeat=3):
+    print('active backend:', electrostatics.backend())
+    if electrostatics.JIT_KERNELS is None:
+        print('numba is not installed; nothing to compare')
+        return
+
+    rng = numpy.random.default_rng(0)
+    x, y = rng.uniform(-400, 400, n), rng.uniform(-300, 300, n)
+    px, py = rng.uniform(-200, 200, k), rng.uniform(-200, 200, k)
+    q = rng.choice([-1e-6, 1e-6], k)
+    x1, x2 = rng.uniform(-200, 200, (k, 2)), rng.uniform(-200, 200, (k, 2))
+    sources = {'point': (px, py, q), 'line': (x1, x2, q)}
+
+    for quantity in ('E', 'V'):
+        ncomp, *numpy_kernels = electrostatics.NUMPY_KERNELS[quantity]
+        _, *jit_kernels = electrostatics.JIT_KERNELS[quantity]
+        for kind, numpy_kernel, jit_kernel in zip(('point', 'line'), numpy_kernels, jit_kernels):
+            def run(kernel, kind=kind):
+                return electrostatics.superpose(kernel, ncomp, x, y, *sources[kind])
+            expected, result = run(numpy_kernel), run(jit_kernel)
+            error = numpy.max(numpy.abs(result - expected)) / numpy.max(numpy.abs(expected))
+            t_numpy = min(timeit.repeat(lambda: run(numpy_kernel), number=1, repeat=repeat))
+            t_jit = min(timeit.repeat(lambda: run(jit_kernel), number=1, repeat=repeat))
+            print('%s %-5s %d points x %d charges: numpy %.1f ms, numba %.1f ms, max relative difference %.1e'
+                  % (quantity, kind, n, k, 1e3 * t_numpy, 1e3 * t_jit, error))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""Checks the flux through closed curves against the charge they enclose.
+
+Run from the repository root:
+
+    python benchmarks/gauss.py [scene ...]
+
+For each scene (by default all in scenes/) the flux through circles,
+squares and star-shaped freehand curves of several sizes about the
+origin is integrated at each tolerance, and flux/4pi is compared with the
+enclosed charge worked out from the geometry.  Reports the worst error
+relative to the total charge, the kernel evaluations and the time of
+each integration.
+"""
+import glob
+import os
+import sys
+import time
+
+import numpy
+from numpy import pi
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from flux import Circle, Polygon, enclosed_charge, flux, freehand  # noqa: E402
+from scene import load_scene  # noqa: E402
+
+SIZES = (50, 120, 200, 290)
+TOLERANCES = (1e-3, 1e-6, 1e-9)
+
+
+def curves(size):
+    """Yields (name, curve) for the curves of 'size' about the origin."""
+    yield 'circle', Circle((0, 0), size)
+    yield 'square', Polygon([(-size, -size), (size, -size), (size, size), (-size, size)])
+    angle = numpy.linspace(0, 2 * pi, 300, endpoint=False)
+    radius = size * (1 + 0.3 * numpy.sin(5 * angle))
+    yield 'freehand', freehand(numpy.column_stack([radius * numpy.cos(angle), radius * numpy.sin(angle)]))
+
+
+def main(*scenes):
+    for path in scenes or sorted(glob.glob('scenes/*.json')):
+        charges = load_scene(path)
+        scale = numpy.abs(charges._rows()[2]).sum()
+        print(path)
+        for tolerance in TOLERANCES:
+            for name in ('circle', 'square', 'freehand'):
+                worst = evaluations = seconds = 0
+                for size in SIZES:
+                    curve = dict(curves(size))[name]
+                    start = time.perf_counter()
+                    total, _, count = flux(charges, curve, tolerance * 4 * pi * scale)
+                    seconds += time.perf_counter() - start
+                    evaluations += count
+                    worst = max(worst, abs(total / (4 * pi) - enclosed_charge(charges, curve)) / scale)
+                print('  %-9s tolerance %-6g worst error %8.1e  %7d evaluations %6.2f ms'
+                      % (name, tolerance, worst, evaluations / len(SIZES), 1e3 * seconds / len(SIZES)))
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
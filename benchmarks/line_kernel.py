@@ -0,0 +1,79 @@
+"""Benchmarks the fused line charge kernel against the original implementation.
+
+Run from the repository root:
+
+    python benchmarks/line_kernel.py
+"""
+import os
+import sys
+import timeit
+
+import numpy
+from numpy import array, cos, pi, where, inf
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from electrostatics import LineCharge, angle, point_line_distance, is_left, norm  # noqa: E402
+
+
+def legacy_E(charge, x, y):  # pylint: disable=invalid-name
+    """The original LineCharge.E, built from the angle/distance/det helpers."""
+    x_points = array([x, y]).T
+    x1, x2, lam = charge.x1, charge.x2, charge.lam
+
+    theta1 = angle(x_points, x1, x2)
+    theta2 = pi - angle(x_points, x2, x1)
+    a = point_line_distance(x_points, x1, x2)
+    r1 = norm(x_points - x1)
+    r2 = norm(x_points - x2)
+    sign = where(is_left(x_points, x1, x2), 1, -1)
+
+    Epara = lam * (1 / r2 - 1 / r1)
+    Eperp = -sign * lam * (cos(theta2) - cos(theta1)) / where(a == 0, inf, a)
+
+    dx = x2 - x1
+    dx_norm = norm(dx)
+    Ex = Eperp * (-dx[1] / dx_norm) + Epara * (dx[0] / dx_norm)
+    Ey = Eperp * (dx[0] / dx_norm) + Epara * (dx[1] / dx_norm)
+    return Ex, Ey
+
+
+def legacy_V(charge, x, y):  # pylint: disable=invalid-name
+    """The original scalar LineCharge.V, looped over the points."""
+    L = norm(charge.x2 - charge.x1)  # pylint: disable=invalid-name
+    V = numpy.empty(len(x))
+    for i, point in enumerate(zip(x, y)):
+        point = array(point)
+        r1, r2 = norm(point - charge.x1), norm(point - charge.x2)
+        V[i] = charge.lam * numpy.log((r1 + r2 + L) / (r1 + r2 - L))
+    return V
+
+
+def relative_error(a, b):
+    """Returns the largest difference between a and b relative to the largest |b|."""
+    return numpy.max(numpy.abs(numpy.asarray(a) - numpy.asarray(b))) / numpy.max(numpy.abs(b))
+
+
+def main(n=20000, repeat=5):
+    rng = numpy.random.default_rng(0)
+    charge = LineCharge(1e-6, [-80, -160], [-60, 160])
+    x, y = rng.uniform(-400, 400, n), rng.uniform(-300, 300, n)
+
+    with numpy.errstate(all='ignore'):
+        print('E agreement (max relative difference): %.2e'
+              % relative_error(numpy.stack(charge.E(x, y)), numpy.stack(legacy_E(charge, x, y))))
+        m = min(n, 2000)
+        print('V agreement (max relative difference): %.2e'
+              % relative_error(charge.V(x[:m], y[:m]), legacy_V(charge, x[:m], y[:m])))
+
+        for name, fused, legacy, points in (
+                ('E', lambda: charge.E(x, y), lambda: legacy_E(charge, x, y), n),
+                ('V', lambda: charge.V(x[:m], y[:m]), lambda: legacy_V(charge, x[:m], y[:m]), m)):
+            t_fused = min(timeit.repeat(fused, number=1, repeat=repeat))
+            t_legacy = min(timeit.repeat(legacy, number=1, repeat=repeat))
+            print('%s on %d points: fused %.2f ms, legacy %.2f ms, speedup %.1fx'
+                  % (name, points, 1e3 * t_fused, 1e3 * t_legacy, t_legacy / t_fused))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""Times how long a simulation launched from the menu takes to show up.
+
+Run from the repository root:
+
+    python benchmarks/startup.py [scene]
+
+Reports the time to import the simulation in a fresh interpreter, and for
+a cold process (as the menu launches without PREWARM) and a pre-warmed one
+(menu.simulation_worker) the time from the click to the first frame and
+to the first rendered field tile.  Runs without a display.
+"""
+import multiprocessing
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, SRC)
+
+import pygame  # noqa: E402
+
+import menu  # noqa: E402
+
+
+def install_hooks(events):
+    """Reports the first frame and the first field tile to 'events', then quits the simulation."""
+    import main
+    render_tile = main.render_tile
+    update = pygame.display.update
+    seen = set()
+
+    def report(name):
+        if name not in seen:
+            seen.add(name)
+            events.put((name, time.monotonic()))
+
+    def hooked_render_tile(*args):
+        surface = render_tile(*args)
+        report('layer')
+        return surface
+
+    def hooked_update(*args):
+        update(*args)
+        report('frame')
+        if 'layer' in seen:
+            pygame.event.post(pygame.event.Event(pygame.QUIT))
+
+    main.render_tile = hooked_render_tile
+    pygame.display.update = hooked_update
+
+
+def cold(scene, events):
+    install_hooks(events)
+    menu.run_simulation(scene)
+
+
+def warm(connection, events):
+    install_hooks(events)
+    menu.simulation_worker(connection)
+
+
+def collect(events):
+    """Returns the times of the first frame and the first layer."""
+    times = dict(events.get() for _ in range(2))
+    return times['frame'], times['layer']
+
+
+def time_import():
+    code = 'import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)'
+    output = subprocess.run([sys.executable, '-c', code], cwd=SRC, capture_output=True, text=True, check=True)
+    return float(output.stdout.split()[-1])
+
+
+def main(scene='scenes/05_quadrupolo.json', repeat=3):
+    context = multiprocessing.get_context('fork')
+    events = context.Queue()
+    results = {'cold': [], 'warm': []}
+    imports = [time_import() for _ in range(repeat)]
+    for _ in range(repeat):
+        # Cold: the process imports and initializes everything after the click
+        start = time.monotonic()
+        process = context.Process(target=cold, args=(scene, events))
+        process.start()
+        frame, layer = collect(events)
+        process.join()
+        results['cold'].append((frame - start, layer - start))
+
+        # Warm: the process is ready before the click
+        connection, child = context.Pipe()
+        process = context.Process(target=warm, args=(child, events))
+        process.start()
+        connection.recv()
+        start = time.monotonic()
+        connection.send((scene,))
+        frame, layer = collect(events)
+        process.join()
+        results['warm'].append((frame - start, layer - start))
+
+    print('import main: %.0f ms' % (1e3 * statistics.median(imports)))
+    for name, times in results.items():
+        frames, layers = zip(*times)
+        print('%s start: first frame %.0f ms, first field tile %.0f ms (median of %d)'
+              % (name, 1e3 * statistics.median(frames), 1e3 * statistics.median(layers), repeat))
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
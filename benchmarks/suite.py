@@ -0,0 +1,420 @@
+"""Times the kernels, the renderers and the interactive frame loop.
+
+Run from the repository root:
+
+    python benchmarks/suite.py [-k NAME] [-o results.json] [--baseline FILE] [--threshold 0.2]
+
+Runs without a display.  The scenes are the menu's dipole, quadrupole and
+line scenes, tiled over the screen to each of --counts charges (0 keeps
+the scene as it is) and optionally with every charge made a point or a
+line charge (--kinds).  Grids are sampled at each of --resolutions points
+per axis.  Each case is run --repeat times after one warm-up run, and the
+median and minimum times are reported and saved as JSON.  The scripted
+main() loop drags a charge, shows the potential, zooms and pans over
+FRAMES frames, and each session recorded in benchmarks/sessions (see
+main.py --record) is replayed; both report the mean and 95th percentile
+frame time.  A frame is timed until the background renderer has rendered
+every tile it was asked for, so the tiles count toward the frame that
+asked for them.
+
+The medians (the means for the main() loop) are compared with those in
+the --baseline file (BASELINE, which is committed, by default), and cases
+more than --threshold (a fraction) slower are reported as regressions,
+which makes the exit status 1.  A baseline that does not exist yet is
+written from this run; --no-baseline skips the comparison.
+"""
+import argparse
+import glob
+import json
+import math
+import os
+import platform
+import statistics
+import sys
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+import numpy  # noqa: E402
+import pygame  # noqa: E402
+
+import electrostatics  # noqa: E402
+from electrostatics import ChargeSet, ElectricField, LineCharge, PointCharge, Potential  # noqa: E402
+from scene import columns_from_dicts  # noqa: E402
+
+WIDTH, HEIGHT = 800, 600
+SCENES = {  # The menu's scenes the benchmark scenes are made from
+    'dipolo': 'scenes/01_dipolo.json',
+    'quadrupolo': 'scenes/05_quadrupolo.json',
+    'linha': 'scenes/03_linha_ponto.json',
+}
+KINDS = ('scene', 'point', 'line')  # Charges as in the scene, or all made one kind
+LINE_LENGTH = 80  # The length of the line charges points are made into
+FRAMES = 150  # The frames of each scripted main() run
+SESSIONS = os.path.join(ROOT, 'benchmarks', 'sessions')  # Recorded sessions replayed through main()
+BASELINE = os.path.normpath(os.path.join(ROOT, 'benchmarks', 'baseline.json'))  # The committed results compared with by default
+
+
+def make_scene(name, count=0, kind='scene'):
+    """Returns the charges of scene 'name' as dicts, tiled to 'count' charges and made of 'kind' charges.
+
+    The scene is shrunk into each cell of a square grid of copies over the
+    screen, and the last copy is cut short to give exactly 'count' charges.
+    """
+    with open(os.path.join(ROOT, SCENES[name]), encoding='utf-8') as f:
+        charges = json.load(f)['charges']
+    if kind == 'point':
+        charges = [{'type': 'point', 'x': (c['start'][0] + c['end'][0]) / 2, 'y': (c['start'][1] + c['end'][1]) / 2,
+                    'q': c['q']} if c['type'] == 'line' else c for c in charges]
+    elif kind == 'line':
+        charges = [{'type': 'line', 'q': c['q'], 'start': [c['x'], c['y'] - LINE_LENGTH / 2],
+                    'end': [c['x'], c['y'] + LINE_LENGTH / 2]} if c['type'] == 'point' else c for c in charges]
+    if not count:
+        return charges
+
+    side = math.ceil(math.sqrt(math.ceil(count / len(charges))))
+    tiled = []
+    for i in range(side * side):
+        cx = (i % side + 0.5) * WIDTH / side - WIDTH / 2
+        cy = (i // side + 0.5) * HEIGHT / side - HEIGHT / 2
+
+        def place(point):
+            return [cx + point[0] / side, cy + point[1] / side]
+        for c in charges:
+            if c['type'] == 'point':
+                x, y = place((c['x'], c['y']))
+                tiled.append({'type': 'point', 'x': x, 'y': y, 'q': c['q']})
+            else:
+                tiled.append({'type': 'line', 'q': c['q'], 'start': place(c['start']), 'end': place(c['end'])})
+    return tiled[:count]
+
+
+def make_charges(name, count=0, kind='scene'):
+    """Returns make_scene(name, count, kind) as a ChargeSet."""
+    return ChargeSet.from_arrays(*columns_from_dicts(make_scene(name, count, kind)))
+
+
+def label(*parts, **parameters):
+    """Returns the name of a case, as Case/part/key=value, leaving out default parameters."""
+    return '/'.join([str(part) for part in parts]
+                    + ['%s=%s' % item for item in parameters.items() if item[1] not in (None, 'scene')])
+
+
+def time_runs(run, repeat):
+    """Returns the times of 'repeat' calls of run(), after one warm-up call."""
+    run()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return times
+
+#-----------------------------------------------------------------------------
+# Cases
+#
+# Each case generator yields (name, run) pairs, where run() is timed.
+
+def charge_cases(options):
+    """PointCharge.E/V and LineCharge.E/V of a single charge on grids."""
+    charges = {'PointCharge': PointCharge(10, 20, 1e-6), 'LineCharge': LineCharge(1e-6, [-80, -160], [-80, 160])}
+    for resolution in options.resolutions:
+        x, y = electrostatics.sample_grid(resolution, resolution)
+        for kind, charge in charges.items():
+            yield label(kind + '.E', res=resolution), lambda charge=charge, x=x, y=y: charge.E(x, y)
+            yield label(kind + '.V', res=resolution), lambda charge=charge, x=x, y=y: charge.V(x, y)
+
+
+def scene_variants(options):
+    """Yields the (scene, count, kind) of each benchmark scene."""
+    for name in SCENES:
+        for count in options.counts:
+            for kind in options.kinds:
+                yield name, count, kind
+
+
+def field_cases(options):
+    """ElectricField.vector on grids and ElectricField.plot of the screen."""
+    for name, count, kind in scene_variants(options):
+        charges = make_charges(name, count, kind)
+        n = count or None
+        for resolution in options.resolutions:
+            x, y = electrostatics.sample_grid(resolution, resolution)
+            field = ElectricField(charges)
+            yield (label('ElectricField.vector', name, n=n, kind=kind, res=resolution),
+                   lambda field=field, x=x, y=y: field.vector(x, y))
+        surface = pygame.Surface((WIDTH, HEIGHT))
+        # A new field each run, so that its grid cache does not hide the work
+        yield (label('ElectricField.plot', name, n=n, kind=kind),
+               lambda charges=charges, surface=surface: ElectricField(charges).plot(surface, WIDTH, HEIGHT))
+
+
+def potential_cases(options):
+    """Potential.plot of the screen at each resolution."""
+    surface = pygame.Surface((WIDTH, HEIGHT))
+    for name, count, kind in scene_variants(options):
+        charges = make_charges(name, count, kind)
+        for resolution in options.resolutions:
+            yield (label('Potential.plot', name, n=count or None, kind=kind, res=resolution),
+                   lambda charges=charges, resolution=resolution:
+                   Potential(charges).plot(surface, WIDTH, HEIGHT, resolution=resolution))
+
+
+def lines_cases(options):
+    """ElectricField.lines: 200 field lines traced over the screen."""
+    for name, count, kind in scene_variants(options):
+        field = ElectricField(make_charges(name, count, kind))
+        yield label('ElectricField.lines', name, n=count or None, kind=kind), lambda field=field: field.lines(200)
+
+
+CASES = (charge_cases, field_cases, potential_cases, lines_cases)
+
+#-----------------------------------------------------------------------------
+# The scripted frame loop
+
+class ScriptedClock:
+    """Stands in for pygame.time.Clock in main(): plays a script of events and times the frames.
+
+    The time of each frame is taken from one tick to the next, once the
+    background renderers are idle, leaving out the frame rate cap, and the
+    loop is quit once the script is played.
+    """
+
+    def __init__(self, charges, renderers):
+        self.charges = charges
+        self.renderers = renderers
+        self.times = []
+        self.frame = 0
+        self._script = None
+        self._last = None
+
+    def tick(self, framerate=0):
+        wait_idle(self.renderers)
+        now = time.perf_counter()
+        if self._last is not None:
+            self.times.append(now - self._last)
+        if self._script is None:
+            self._script = self.script()
+        for event in self._script.get(self.frame, ()):
+            pygame.event.post(event)
+        if self.frame >= FRAMES:
+            pygame.event.post(pygame.event.Event(pygame.QUIT))
+        self.frame += 1
+        self._last = time.perf_counter()
+        return 0
+
+    def get_fps(self):
+        return 0
+
+    def script(self):
+        """Returns the events to post by frame: drag a charge, show the potential, zoom in, pan, zoom out."""
+        import main
+        script = {}
+        x1 = self.charges._rows()[0]
+        sx, sy = electrostatics.to_screen(x1[:, 0], x1[:, 1], WIDTH, HEIGHT)
+        # The charge nearest the center, clear of the sidebar
+        free = sx > 260
+        i = numpy.argmin(numpy.where(free, (sx - WIDTH / 2)**2 + (sy - HEIGHT / 2)**2, numpy.inf))
+        start = (int(sx[i]), int(sy[i]))
+        script[5] = [pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=start, button=1)]
+        for step in range(1, 31):
+            position = (start[0] + 2 * step, start[1] + step)
+            script[5 + step] = [pygame.event.Event(pygame.MOUSEMOTION, pos=position, rel=(2, 1), buttons=(1, 0, 0))]
+        script[36] = [pygame.event.Event(pygame.MOUSEBUTTONUP, pos=position, button=1)]
+        script[40] = [pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=main.initialize_buttons()['plot']['rect'].center,
+                                         button=1)]
+        for step in range(5):
+            script[60 + 2 * step] = [pygame.event.Event(pygame.MOUSEWHEEL, x=0, y=1, flipped=False)]
+        script[80] = [pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=(700, 500), button=1)]
+        for step in range(1, 21):
+            script[80 + step] = [pygame.event.Event(pygame.MOUSEMOTION, pos=(700 - 5 * step, 500 - 3 * step),
+                                                    rel=(-5, -3), buttons=(1, 0, 0))]
+        script[101] = [pygame.event.Event(pygame.MOUSEBUTTONUP, pos=(600, 440), button=1)]
+        for step in range(5):
+            script[110 + 2 * step] = [pygame.event.Event(pygame.MOUSEWHEEL, x=0, y=-1, flipped=False)]
+        return script
+
+
+def wait_idle(renderers):
+    """Waits until each of the BackgroundRenderers 'renderers' has rendered the tiles asked for."""
+    for renderer in renderers:
+        renderer.wait_idle()
+
+
+def tracking_renderers(main, renderers):
+    """Makes main() add the BackgroundRenderers it creates to the list 'renderers', returning the undo."""
+    real_renderer = main.BackgroundRenderer
+
+    def create(*args, **kwargs):
+        renderer = real_renderer(*args, **kwargs)
+        renderers.append(renderer)
+        return renderer
+
+    main.BackgroundRenderer = create
+    return lambda: setattr(main, 'BackgroundRenderer', real_renderer)
+
+
+def run_main(charges):
+    """Runs main() on 'charges' (dicts) through the script, returning the frame times."""
+    import main
+    electrostatics.init(WIDTH, HEIGHT)
+    renderers = []
+    clock = ScriptedClock(ChargeSet.from_arrays(*columns_from_dicts(charges)), renderers)
+    real_clock = pygame.time.Clock
+    pygame.time.Clock = lambda: clock
+    untrack = tracking_renderers(main, renderers)
+    try:
+        main.main(charges)
+    finally:
+        pygame.time.Clock = real_clock
+        untrack()
+    return clock.times
+
+
+def main_cases(options):
+    """Yields (name, run) for the scripted main() loop of each scene, where run() returns the frame times."""
+    def run(charges):
+        return [t for _ in range(options.main_repeat) for t in run_main(charges)]
+    for name, count, kind in scene_variants(options):
+        yield (label('main.frame', name, n=count or None, kind=kind),
+               lambda charges=make_scene(name, count, kind): run(charges))
+
+
+def replay_cases(options):
+    """Yields (name, run) for each recorded session, where run() replays it and returns the frame times."""
+    import main
+    from recording import Replay
+
+    def run(path):
+        times = []
+        for _ in range(options.main_repeat):
+            electrostatics.init(WIDTH, HEIGHT)
+            replay = Replay(path)
+            renderers = []
+            events = replay.events
+            replay.events = lambda: (wait_idle(renderers), events())[1]  # Frames are timed in events()
+            untrack = tracking_renderers(main, renderers)
+            try:
+                main.main(replay=replay)
+            finally:
+                untrack()
+            if not replay.reproduced:
+                raise RuntimeError('%s: the replay did not end with the recorded charges' % path)
+            times += replay.times
+        return times
+    for path in sorted(glob.glob(os.path.join(SESSIONS, '*.json*'))):
+        name = os.path.basename(path).split('.')[0]
+        yield label('main.replay', name), lambda path=path: run(path)
+
+#-----------------------------------------------------------------------------
+# Results
+
+def summary(times, metric='median'):
+    """Returns the statistics of a list of times, in seconds, and the one compared with baselines."""
+    times = sorted(times)
+    return {'median': statistics.median(times), 'mean': statistics.fmean(times), 'min': times[0],
+            'p95': times[min(len(times) - 1, int(0.95 * len(times)))], 'runs': len(times), 'metric': metric}
+
+
+def compare(results, baseline, threshold):
+    """Prints the change of each case from 'baseline' and returns the names of the regressions."""
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        metric = result['metric']
+        ratio = result[metric] / baseline[name][metric]
+        status = ''
+        if ratio > 1 + threshold:
+            status = 'REGRESSION'
+            regressions.append(name)
+        elif ratio < 1 / (1 + threshold):
+            status = 'faster'
+        print('%-60s %9.2f ms -> %9.2f ms  %+6.0f%%  %s'
+              % (name, 1e3 * baseline[name][metric], 1e3 * result[metric], 100 * (ratio - 1), status))
+    return regressions
+
+
+def metadata():
+    return {
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': numpy.__version__,
+        'backend': electrostatics.backend(),
+        'machine': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def parse_list(text):
+    return [int(value) for value in text.split(',')]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Times the kernels, renderers and frame loop.')
+    parser.add_argument('-k', '--filter', default='', help='only run the cases whose name contains this')
+    parser.add_argument('-o', '--output', default='benchmark_results.json', help='the JSON file of the results')
+    parser.add_argument('--baseline', default=BASELINE,
+                        help='compare with (or create) this JSON file of results (default benchmarks/baseline.json)')
+    parser.add_argument('--no-baseline', dest='baseline', action='store_const', const=None,
+                        help='do not compare with a baseline')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='the slowdown reported as a regression, as a fraction (default 0.2)')
+    parser.add_argument('--counts', type=parse_list, default=[0, 64, 512],
+                        help='charge counts of the scenes, 0 for as is (default 0,64,512)')
+    parser.add_argument('--resolutions', type=parse_list, default=[100, 400],
+                        help='grid points per axis (default 100,400)')
+    parser.add_argument('--kinds', type=lambda text: text.split(','), default=['scene'],
+                        help='charge kinds of the scenes, of %s (default scene)' % ', '.join(KINDS))
+    parser.add_argument('--repeat', type=int, default=5, help='timed runs per case (default 5)')
+    parser.add_argument('--main-repeat', type=int, default=1,
+                        help='scripted main() runs per scene and replays per session (default 1)')
+    parser.add_argument('--no-main', action='store_true', help='skip the scripted and replayed main() loops')
+    args = parser.parse_args(argv)
+    if set(args.kinds) - set(KINDS):
+        parser.error('--kinds must be among %s' % ', '.join(KINDS))
+    return args
+
+
+def main(argv=None):
+    options = parse_args(argv)
+    pygame.display.init()
+    pygame.font.init()
+    electrostatics.init(WIDTH, HEIGHT)
+
+    results = {}
+    for cases in CASES:
+        for name, run in cases(options):
+            if options.filter in name:
+                results[name] = summary(time_runs(run, options.repeat))
+                print('%-60s %9.2f ms' % (name, 1e3 * results[name]['median']))
+    for name, run in () if options.no_main else (*main_cases(options), *replay_cases(options)):
+        if options.filter in name:
+            # Most frames redraw nothing, so the loop is compared by its mean frame time
+            results[name] = summary(run(), 'mean')
+            print('%-60s %9.2f ms  mean, p95 %.2f ms' % (name, 1e3 * results[name]['mean'], 1e3 * results[name]['p95']))
+
+    with open(options.output, 'w', encoding='utf-8') as f:
+        json.dump({'metadata': metadata(), 'results': results}, f, indent=2)
+    print('results saved to', options.output)
+
+    if options.baseline:
+        if not os.path.exists(options.baseline):
+            with open(options.baseline, 'w', encoding='utf-8') as f:
+                json.dump({'metadata': metadata(), 'results': results}, f, indent=2)
+            print('baseline saved to', options.baseline)
+            return 0
+        with open(options.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        print('\ncompared with', options.baseline)
+        regressions = compare(results, baseline, options.threshold)
+        if regressions:
+            print('\n%d regression(s) over %.0f%%' % (len(regressions), 100 * options.threshold))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
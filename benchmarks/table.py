@@ -0,0 +1,85 @@
+"""Compares point queries through a FieldTable with the exact superposition.
+
+Run from the repository root:
+
+    python benchmarks/table.py [--counts 0,64,512] [--scenes dipolo,linha]
+
+For each scene, tiled to each number of charges as in suite.py, reports
+the time to build a bilinear and a bicubic table of an 800x600 view, the
+time of single-point and batched queries against the exact sums, the
+cells along the longer side and the margin the table chose, the share of
+cells near a charge (whose near charges are summed exactly) and of cells
+evaluated exactly for the field, the error of the field at random points
+relative to its magnitude there (the 99th percentile and the maximum), and
+the time to trace field lines with and without the table.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from suite import HEIGHT, WIDTH, make_scene, parse_list  # noqa: E402
+
+import electrostatics  # noqa: E402
+from electrostatics import ChargeSet, ElectricField, FieldTable  # noqa: E402
+from scene import columns_from_dicts  # noqa: E402
+
+POINTS = 10000  # The random points of the batched queries and the error
+SINGLE = 500  # The single-point queries timed
+LINES = 100  # The field lines traced
+
+
+def seconds(run, repeat=1):
+    """Returns the mean time of 'repeat' calls of run()."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        run()
+    return (time.perf_counter() - start) / repeat
+
+
+def trace(charges, table):
+    field = ElectricField(charges)
+    field.table = table
+    return seconds(lambda: field.lines(LINES))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compares FieldTable queries with the exact sums.')
+    parser.add_argument('--counts', type=parse_list, default=[0, 64, 512])
+    parser.add_argument('--scenes', type=lambda text: text.split(','), default=['dipolo', 'linha'])
+    options = parser.parse_args(argv)
+    electrostatics.init(WIDTH, HEIGHT)
+    rng = numpy.random.default_rng(0)
+    x, y = rng.uniform(-WIDTH / 2, WIDTH / 2, POINTS), rng.uniform(-HEIGHT / 2, HEIGHT / 2, POINTS)
+    singles = list(zip(x[:SINGLE].tolist(), y[:SINGLE].tolist()))
+
+    for name in options.scenes:
+        for count in options.counts:
+            charges = ChargeSet.from_arrays(*columns_from_dicts(make_scene(name, count)))
+            Ex, Ey = charges.E(x, y)  # Also compiles the kernels outside the timings
+            magnitude = numpy.hypot(Ex, Ey)
+            print('%s, %d charges' % (name, len(charges)))
+            print('  exact    single %6.1f us  batch %8.2f ms  lines %7.1f ms'
+                  % (1e6 * seconds(lambda: [charges.E(*point) for point in singles]) / SINGLE,
+                     1e3 * seconds(lambda: charges.E(x, y), 3), 1e3 * trace(charges, None)))
+            for order in (1, 3):
+                table = FieldTable(charges, order=order)
+                build = seconds(lambda: table.E(0.0, 0.0))
+                ex, ey = table.E(x, y)
+                error = numpy.hypot(ex - Ex, ey - Ey) / magnitude
+                _, resolution = table._geometry
+                exact = table._tables['E'][-1][1:-1, 1:-1]  # The outer cells are off the table
+                print('  order %d  single %6.1f us  batch %8.2f ms  lines %7.1f ms  build %7.1f ms  '
+                      'cells %4d margin %2d  near %3.0f%%  exact %3.0f%%  error p99 %.1e max %.1e'
+                      % (order, 1e6 * seconds(lambda: [table.E(*point) for point in singles]) / SINGLE,
+                         1e3 * seconds(lambda: table.E(x, y), 3), 1e3 * trace(charges, table), 1e3 * build,
+                         resolution, table.margin, 100 * (table._near >= 0).mean(), 100 * exact.mean(),
+                         numpy.percentile(error, 99), error.max()))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,5 @@
-
+import functools
+import numpy
 import pygame
 from numpy import arctan2, cos, sin, pi
 
@@ -35,3 +36,91 @@ def draw_arrow(surface, start, end, color, body_width=2, head_width=6, head_heig
 
     # Draw the arrowhead
     pygame.draw.polygon(surface, color, [end, arrowhead_left, arrowhead_right])
+
+def arrowhead_points(starts, ends, head_height=10):
+    """
+    Computes the arrowhead corners of many arrows at once.
+
+    Args:
+        starts: An (n, 2) array of starting positions.
+        ends: An (n, 2) array of ending positions.
+        head_height: The height of the arrows' heads.
+
+    Returns:
+        tuple: The (n, 2) arrays of left and right arrowhead corners.
+    """
+    starts, ends = numpy.asarray(starts, dtype=float), numpy.asarray(ends, dtype=float)
+    d = ends - starts
+    angle = arctan2(d[:, 1], d[:, 0])
+    left = ends - head_height * numpy.stack([cos(angle + pi / 6), sin(angle + pi / 6)], axis=-1)
+    right = ends - head_height * numpy.stack([cos(angle - pi / 6), sin(angle - pi / 6)], axis=-1)
+    return left, right
+
+def draw_arrows(surface, starts, ends, color, body_width=2, head_width=6, head_height=10):
+    """
+    Draws many arrows, computing their geometry as arrays.
+
+    Args:
+        surface: The pygame surface to draw on.
+        starts: An (n, 2) array of starting positions.
+        ends: An (n, 2) array of ending positions.
+        color: The color of the arrows.
+        body_width: The width of the arrows' bodies.
+        head_width: The width of the arrows' heads.
+        head_height: The height of the arrows' heads.
+    """
+    left, right = arrowhead_points(starts, ends, head_height)
+    for start, end, l, r in zip(numpy.asarray(starts).tolist(), numpy.asarray(ends).tolist(),
+                                left.tolist(), right.tolist()):
+        pygame.draw.line(surface, color, start, end, body_width)
+        pygame.draw.polygon(surface, color, [end, l, r])
+
+class ArrowSprites:
+    """Arrows of one length and color, pre-rasterized at quantized angles."""
+
+    def __init__(self, length, color, angles=72, body_width=2, head_width=6, head_height=10):
+        """
+        Rasterizes the arrows.
+
+        Args:
+            length: The length of the arrows.
+            color: The color of the arrows.
+            angles: The number of directions the full turn is quantized into.
+            body_width: The width of the arrows' bodies.
+            head_width: The width of the arrows' heads.
+            head_height: The height of the arrows' heads.
+        """
+        self.angles = angles
+        self.center = int(numpy.ceil(length)) + body_width + 1
+        size = 2 * self.center + 1
+        key = tuple(255 - c for c in color[:3])  # Transparent color keyed out when blitting
+        self.sprites = []
+        for theta in numpy.arange(angles) * (2 * pi / angles):
+            sprite = pygame.Surface((size, size))
+            sprite.fill(key)
+            sprite.set_colorkey(key, pygame.RLEACCEL)
+            end = (self.center + length * cos(theta), self.center + length * sin(theta))
+            draw_arrow(sprite, (self.center, self.center), end, color, body_width, head_width, head_height)
+            self.sprites.append(sprite)
+
+    def stamp(self, surface, starts, directions):
+        """
+        Blits an arrow at each start position, pointing along each direction.
+
+        Args:
+            surface: The pygame surface to draw on.
+            starts: An (n, 2) array of starting positions.
+            directions: An (n, 2) array of direction vectors in screen coordinates.
+        """
+        directions = numpy.asarray(directions, dtype=float)
+        angle = arctan2(directions[:, 1], directions[:, 0])
+        index = numpy.rint(angle * (self.angles / (2 * pi))).astype(int) % self.angles
+        corners = numpy.asarray(starts, dtype=int) - self.center
+        sprites = self.sprites
+        surface.blits([(sprites[i], corner) for i, corner in zip(index.tolist(), corners.tolist())],
+                      doreturn=False)
+
+@functools.lru_cache(maxsize=None)
+def arrow_sprites(length, color, angles=72):
+    """Returns the shared ArrowSprites for 'length', 'color' and 'angles'."""
+    return ArrowSprites(length, color, angles)
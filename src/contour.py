@@ -0,0 +1,137 @@
+"""Contour lines of a sampled grid by marching squares.
+
+The crossings of all the cells with all the levels are found at once with
+NumPy: each sample is binned against the sorted levels, so a cell crosses
+exactly the levels between its lowest and highest corner bins and cells
+away from any contour cost nothing.  Only joining the segments into
+polylines walks them one by one.
+"""
+import numpy
+
+# The end points of each cell edge as (row, column) offsets of the lower
+# corner first: bottom, right, top and left
+EDGES = numpy.array([(0, 0, 0, 1), (0, 1, 1, 1), (1, 0, 1, 1), (0, 0, 1, 0)])
+
+# The segments of each cell case, as pairs of edges, for saddle cases with
+# the center below and above the level.  The case has bit 0 set when the
+# corner (r, c) is above the level, bit 1 for (r, c+1), bit 2 for (r+1, c+1)
+# and bit 3 for (r+1, c).
+_SEGMENTS = {
+    1: [(3, 0)], 2: [(0, 1)], 3: [(3, 1)], 4: [(1, 2)],
+    5: ([(3, 0), (1, 2)], [(0, 1), (2, 3)]),
+    6: [(0, 2)], 7: [(3, 2)], 8: [(2, 3)], 9: [(0, 2)],
+    10: ([(0, 1), (2, 3)], [(3, 0), (1, 2)]),
+    11: [(1, 2)], 12: [(3, 1)], 13: [(0, 1)], 14: [(3, 0)],
+}
+SEGMENTS = numpy.full((16, 2, 2, 2), -1)  # Case, center above, segment, edge
+for _case, _segments in _SEGMENTS.items():
+    for _above in (0, 1):
+        _pairs = _segments[_above] if isinstance(_segments, tuple) else _segments
+        SEGMENTS[_case, _above, :len(_pairs)] = _pairs
+
+def auto_levels(values, n=20):
+    """Returns about 'n' levels for the contours of 'values'.
+
+    Potentials span many orders of magnitude, so the levels are spaced
+    evenly in log|V| over the bulk of the values, separately for each sign
+    present, with the zero level between opposite signs.
+    """
+    values = numpy.asarray(values, dtype=float)
+    magnitude = numpy.abs(values[numpy.isfinite(values) & (values != 0)])
+    if not len(magnitude):
+        return numpy.empty(0)
+    low, high = numpy.log10(numpy.percentile(magnitude, [25, 99.5]))
+    signs = [sign for sign, present in ((-1, (values < 0).any()), (1, (values > 0).any())) if present]
+    count = max(1, (n - (len(signs) > 1)) // len(signs))
+    magnitudes = numpy.logspace(low, high, count) if high > low else numpy.array([10**high])
+    levels = [sign * magnitudes for sign in signs] + ([[0.0]] if len(signs) > 1 else [])
+    return numpy.unique(numpy.concatenate(levels))
+
+def marching_squares(values, levels):
+    """Returns the contours of the grid 'values' at each of 'levels'.
+
+    'values' is indexed [row, column].  Returns a list of (level, points)
+    pairs, where 'points' is an (m, 2) array of (column, row) positions
+    along an open or closed polyline.
+    """
+    values = numpy.asarray(values, dtype=float)
+    levels = numpy.unique(numpy.asarray(levels, dtype=float))
+    rows, columns = values.shape
+    if not len(levels) or rows < 2 or columns < 2:
+        return []
+
+    # The levels crossed by each cell lie between its lowest and highest corner bins
+    bins = numpy.searchsorted(levels, values)
+    corners = (bins[:-1, :-1], bins[:-1, 1:], bins[1:, 1:], bins[1:, :-1])
+    low = numpy.minimum(numpy.minimum(corners[0], corners[1]), numpy.minimum(corners[2], corners[3]))
+    high = numpy.maximum(numpy.maximum(corners[0], corners[1]), numpy.maximum(corners[2], corners[3]))
+    counts = (high - low).ravel()
+    cell = numpy.repeat(numpy.arange(counts.size), counts)
+    if not len(cell):
+        return []
+    starts = numpy.cumsum(counts) - counts
+    level = low.ravel()[cell] + numpy.arange(len(cell)) - numpy.repeat(starts, counts)
+    r, c = numpy.divmod(cell, columns - 1)
+
+    # Classify each (cell, level) crossing and look up its segments
+    case = numpy.zeros(len(cell), dtype=int)
+    for bit, corner in enumerate(corners):
+        case |= (corner.ravel()[cell] > level) << bit
+    center = (values[r, c] + values[r, c + 1] + values[r + 1, c + 1] + values[r + 1, c]) / 4
+    segments = SEGMENTS[case, (center > levels[level]).astype(int)]  # (n, 2, 2)
+    second = segments[:, 1, 0] >= 0
+    edges = numpy.concatenate([segments[:, 0], segments[second, 1]])
+    r, c, level = (numpy.concatenate([a, a[second]]) for a in (r, c, level))
+
+    # Place each segment end on its edge, and number the edges so that the
+    # two cells sharing an edge give it the same id
+    r0, c0, r1, c1 = (EDGES[edges, i] + (r if i % 2 == 0 else c)[:, None] for i in range(4))
+    v0, v1 = values[r0, c0], values[r1, c1]
+    t = (levels[level][:, None] - v0) / (v1 - v0)
+    points = numpy.stack([c0 + t * (c1 - c0), r0 + t * (r1 - r0)], axis=-1)
+    horizontal = rows * (columns - 1)
+    ids = numpy.where(r0 == r1, r0 * (columns - 1) + c0, horizontal + r0 * columns + c0)
+    ids += (level * (horizontal + (rows - 1) * columns))[:, None]
+
+    n = len(ids)
+    return [(levels[level[chain[0] % n]], points.reshape(-1, 2)[_ends(chain, n)])
+            for chain in _join(ids[:, 0], ids[:, 1])]
+
+def _ends(chain, n):
+    """Maps segment ends numbered as in _join to rows of the (n, 2, 2) points array reshaped to (2n, 2)."""
+    chain = numpy.asarray(chain)
+    return 2 * (chain % n) + chain // n
+
+def _join(a, b):
+    """Joins the segments between edges a[i] and b[i] into chains.
+
+    Segment ends are numbered i for a[i] and n + i for b[i].  Returns the
+    ends along each chain, in order.
+    """
+    n = len(a)
+    ids = numpy.concatenate([a, b])
+    order = numpy.argsort(ids, kind='stable')
+    shared = ids[order[1:]] == ids[order[:-1]]
+    partner = numpy.full(2 * n, -1)
+    partner[order[:-1][shared]] = order[1:][shared]
+    partner[order[1:][shared]] = order[:-1][shared]
+
+    partner = partner.tolist()
+    visited = [False] * n
+    chains = []
+    # Open chains start at an end no other segment shares, closed ones anywhere
+    starts = [end for end in range(2 * n) if partner[end] < 0] + list(range(n))
+    for start in starts:
+        if visited[start % n]:
+            continue
+        chain = [start]
+        end = start
+        while True:
+            visited[end % n] = True
+            other = end + n if end < n else end - n
+            chain.append(other)
+            end = partner[other]
+            if end < 0 or visited[end % n]:
+                break
+        chains.append(chain)
+    return chains
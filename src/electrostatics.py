@@ -1,4 +1,7 @@
 import functools
+import math
+import os
+import time
 import numpy
 from numpy import array, arange, linspace, meshgrid, zeros_like, ones_like
 from numpy import log10, sin, cos, arctan2, arccos, sqrt, fabs, cumsum
@@ -8,18 +11,28 @@ from numpy import all as alltrue, isclose  # Updated here: alltrue -> numpy.all
 from numpy import where, insert
 from numpy import newaxis
 from numpy.linalg import det
-from scipy.integrate import ode
-from scipy.interpolate import splrep, splev
 import pygame
-import matplotlib.cm as cm
 
-from arrow import draw_arrow
+import colormaps
+import profiler
+from arrow import draw_arrows, arrow_sprites
+from contour import auto_levels, marching_squares
+from multipole import QuadTree
+from spatial import SpatialHash
 
 # The area of interest
 XMIN, XMAX = None, None
 YMIN, YMAX = None, None
 ZOOM = None
 XOFFSET = None
+YOFFSET = None
+
+# The Barnes-Hut evaluator for point charges (see set_multipole)
+MULTIPOLE_THETA = None
+MULTIPOLE_MIN = 1000
+
+# The floating point type the charge kernels work in (see set_precision)
+DTYPE = numpy.float64
 
 #-----------------------------------------------------------------------------
 # Decorators
@@ -36,15 +49,64 @@ def arrayargs(func):
 # Functions
 
 
-def init(screen_width, screen_height, zoom=1, xoffset=0):
+def init(screen_width, screen_height, zoom=1, xoffset=0, yoffset=0):
     """Initializes the domain based on the screen size."""
-    global XMIN, XMAX, YMIN, YMAX, ZOOM, XOFFSET
+    global XMIN, XMAX, YMIN, YMAX, ZOOM, XOFFSET, YOFFSET
     # Set the domain to match the screen size
     XMIN, XMAX = -screen_width // 2, screen_width // 2
     YMIN, YMAX = -screen_height // 2, screen_height // 2
     ZOOM = zoom
     XOFFSET = xoffset
-    
+    YOFFSET = yoffset
+
+def set_view(zoom=None, xoffset=None, yoffset=None):
+    """Sets the zoom and the world point (xoffset, yoffset) at the center of the screen.
+
+    Values left as None are kept.
+    """
+    global ZOOM, XOFFSET, YOFFSET
+    ZOOM = ZOOM if zoom is None else zoom
+    XOFFSET = XOFFSET if xoffset is None else xoffset
+    YOFFSET = YOFFSET if yoffset is None else yoffset
+
+def set_multipole(theta=0.5, min_charges=1000):
+    """Sums point charges with a Barnes-Hut quadtree, or directly if 'theta' is None.
+
+    'theta' sets the accuracy: a node of the tree is summed through its
+    multipole moments when its width is less than theta times its distance
+    from the point, so smaller values are slower and more accurate.  Sets of
+    fewer than 'min_charges' point charges are always summed directly.
+    """
+    global MULTIPOLE_THETA, MULTIPOLE_MIN
+    MULTIPOLE_THETA = theta
+    MULTIPOLE_MIN = min_charges
+
+def set_precision(precision='float64'):
+    """Evaluates the charges in 'precision', 'float32' or 'float64'.
+
+    float32 halves the memory of the sample grids, the results and the
+    temporaries, and lets more points through each chunk of the NumPy
+    kernels, at about seven significant digits.
+    """
+    global DTYPE
+    DTYPE = numpy.dtype(precision).type
+    if DTYPE not in (numpy.float32, numpy.float64):
+        raise ValueError('precision must be float32 or float64, not %r' % precision)
+
+def set_memory_budget(nbytes=16 * 2**20):
+    """Bounds the temporaries of each kernel call to about 'nbytes', whatever the grid and charges."""
+    global CHUNK_BYTES
+    CHUNK_BYTES = nbytes
+
+def viewport():
+    """Returns a hashable description of the current domain."""
+    return XMIN, XMAX, YMIN, YMAX, ZOOM, XOFFSET, YOFFSET
+
+def domain():
+    """Returns the (xmin, xmax, ymin, ymax) world rectangle shown on the screen."""
+    return (XMIN / ZOOM + XOFFSET, XMAX / ZOOM + XOFFSET,
+            YMIN / ZOOM + YOFFSET, YMAX / ZOOM + YOFFSET)
+
 def norm(x):
     """Returns the magnitude of the vector x."""
     return sqrt(numpy.sum(array(x)**2, axis=-1))
@@ -71,60 +133,372 @@ def is_left(x0, x1, x2):
         matrix = matrix.transpose((1, 2, 0))
     return det(matrix) > 0
 
+def segment_distance(x, y, x1, x2):
+    """Returns the (n, k) distances from the points (x, y) to the segments x1 to x2.
+
+    A segment may have no length, for the distance to a point.
+    """
+    d = x2 - x1
+    ax, ay = x[:, newaxis] - x1[:, 0], y[:, newaxis] - x1[:, 1]
+    length_squared = (d**2).sum(axis=1)
+    length_squared[length_squared == 0] = 1  # A point: t is 0 anyway
+    t = numpy.clip((ax * d[:, 0] + ay * d[:, 1]) / length_squared, 0, 1)
+    return sqrt((ax - t * d[:, 0])**2 + (ay - t * d[:, 1])**2)
+
+def charge_cells(x1, x2, line, origin, step, shape, margin=0):
+    """Returns the (cell, charge) pairs of the cells of a grid within 'margin' cells of each charge.
+
+    The grid has 'shape' (rows, columns) of square cells 'step' wide, from
+    'origin' up and to the right, numbered row by row.  A charge lies in the
+    cell of its position or, for a line charge, the cells of points along it
+    half a cell apart; charges are given as rows (x1, x2, line) (see
+    ChargeSet.from_arrays).  Returns the flat cell indices and the charge
+    indices as two arrays, sorted by cell and without repeats.
+    """
+    rows, columns = shape
+    steps = numpy.where(line, numpy.ceil(2 * norm(x2 - x1) / step), 0).astype(int) + 1
+    t = numpy.arange(steps.sum()) - numpy.repeat(numpy.cumsum(steps) - steps, steps)
+    t = t / numpy.repeat(numpy.maximum(steps - 1, 1), steps)
+    start, end = numpy.repeat(x1, steps, axis=0), numpy.repeat(x2, steps, axis=0)
+    points = start + t[:, newaxis] * (end - start)
+    charge = numpy.repeat(arange(len(steps)), steps)
+    i = numpy.floor((points[:, 0] - origin[0]) / step).astype(int)
+    j = numpy.floor((points[:, 1] - origin[1]) / step).astype(int)
+    offsets = arange(-margin, margin + 1)
+    i = (i[:, newaxis, newaxis] + offsets[newaxis, :]).repeat(len(offsets), axis=1)
+    j = (j[:, newaxis, newaxis] + offsets[:, newaxis]).repeat(len(offsets), axis=2)
+    charge = numpy.broadcast_to(charge[:, newaxis, newaxis], i.shape)
+    valid = (i >= 0) & (i < columns) & (j >= 0) & (j < rows)
+    pairs = numpy.unique((j[valid] * columns + i[valid]) * len(steps) + charge[valid])
+    return pairs // max(len(steps), 1), pairs % max(len(steps), 1)
+
 def lininterp2(x1, y1, x):
     """Linear interpolation at points x between numpy arrays (x1, y1)."""
+    from scipy.interpolate import splrep, splev  # Imported on use, as it is slow to load
     return splev(x, splrep(x1, y1, s=0, k=1))
 
+def to_screen(x, y, screen_width, screen_height):
+    """Converts world coordinates (scalars or arrays) to screen coordinates, as floats."""
+    return screen_width / 2 + (x - XOFFSET) * ZOOM, screen_height / 2 - (y - YOFFSET) * ZOOM
+
+def to_world(sx, sy, screen_width, screen_height):
+    """Converts screen coordinates to world coordinates (the inverse of to_screen)."""
+    return (sx - screen_width / 2) / ZOOM + XOFFSET, (screen_height / 2 - sy) / ZOOM + YOFFSET
+
 def to_screen_coordinates(x, y, screen_width, screen_height):
     """Convert world coordinates to screen coordinates."""
-    sx = screen_width / 2 + x
-    sy = screen_height / 2 - y
+    sx, sy = to_screen(x, y, screen_width, screen_height)
     return int(sx), int(sy)
 
+#-----------------------------------------------------------------------------
+# Kernels
+#
+# Each kernel evaluates a batch of n points (x, y) against k charges of one
+# kind by broadcasting to (n, k) arrays, and sums over the charges.
+
+CHUNK_BYTES = 16 * 2**20  # Bound on the memory used by the broadcast temporaries
+TEMPORARIES = 12  # The number of (n, k) float arrays a kernel keeps alive
+TREE_CHUNK = 2**16  # The number of points per traversal of a QuadTree
+
+def superpose(kernel, ncomp, x, y, *sources, step=None, out=None):
+    """Sums the 'ncomp' components of 'kernel' over 'sources' at points (x, y).
+
+    The points and sources are taken in the DTYPE precision, and the points
+    are evaluated in chunks so that the (n, k) temporaries stay within
+    CHUNK_BYTES (see chunk_points), or in chunks of 'step' points if given.  Each chunk is
+    added in place into 'out', a new array of zeros if None, of shape
+    (ncomp,) + shape of (x, y).  Returns 'out'.
+    """
+    x, y = numpy.asarray(x, dtype=DTYPE), numpy.asarray(y, dtype=DTYPE)
+    if x.shape != y.shape:
+        x, y = numpy.broadcast_arrays(x, y)
+    if out is None:
+        out = numpy.zeros((ncomp,) + x.shape, dtype=DTYPE)
+    k = len(sources[0])
+    if k and x.size:
+        sources = [numpy.asarray(source, dtype=DTYPE) for source in sources]
+        step = step or chunk_points(kernel, ncomp, k)
+        if x.ndim <= 1 and x.size <= step:
+            # A single chunk, such as the few points of each step of trace, skips the chunking
+            values = kernel(numpy.ascontiguousarray(x.reshape(-1)), numpy.ascontiguousarray(y.reshape(-1)), *sources)
+            for component, value in zip(out.reshape(ncomp, -1), values):
+                component += value
+            return out
+        grid = out.view()
+        grid.shape = (ncomp, -1, x.shape[-1] if x.ndim else 1)  # Raises rather than copy
+        for index, xs, ys in _chunks(x, y, step):
+            grid[index] += numpy.reshape(kernel(xs, ys, *sources), grid[index].shape)
+    return out
+
+def chunk_points(kernel, ncomp, k):
+    """Returns the number of points per chunk of 'kernel' against 'k' charges.
+
+    The NumPy kernels keep TEMPORARIES (n, k) arrays alive, so their chunks
+    shrink as k grows.  The compiled kernels loop over the charges of each
+    point without temporaries, so only the copied points and the (ncomp, n)
+    result are bounded, and each chunk stays large enough to run in parallel.
+    """
+    itemsize = numpy.dtype(DTYPE).itemsize
+    if hasattr(kernel, 'py_func'):  # A numba dispatcher
+        return max(1, CHUNK_BYTES // (itemsize * (ncomp + 2)))
+    return max(1, CHUNK_BYTES // (itemsize * TEMPORARIES * k))
+
+def _chunks(x, y, step):
+    """Yields (index, x, y) chunks of at most 'step' points of the arrays (x, y).
+
+    The points are only copied a chunk at a time, so that grids broadcast
+    from their axes (see sample_grid) are never expanded in full.  'index'
+    selects the chunk's results in an (ncomp, rows, width) array, where
+    the points are taken as rows of their last axis.
+    """
+    width = x.shape[-1] if x.ndim else 1
+    x, y = x.reshape(-1, width), y.reshape(-1, width)
+    if width <= step:
+        rows = step // width
+        for start in range(0, len(x), rows):
+            block = slice(start, start + rows)
+            yield (slice(None), block), x[block].ravel(), y[block].ravel()
+    else:
+        for row in range(len(x)):
+            for start in range(0, width, step):
+                block = slice(start, start + step)
+                yield (slice(None), row, block), numpy.ascontiguousarray(x[row, block]), \
+                    numpy.ascontiguousarray(y[row, block])
+
+def _point_E(x, y, px, py, q):  # pylint: disable=invalid-name
+    """Field owing to point charges 'q' at (px, py)."""
+    dx = x[:, newaxis] - px
+    dy = y[:, newaxis] - py
+    r_squared = dx**2 + dy**2
+    r_squared[r_squared == 0] = inf  # No self-field at the charge location
+    s = q / (r_squared * sqrt(r_squared))
+    return (s * dx).sum(axis=1), (s * dy).sum(axis=1)
+
+def _point_V(x, y, px, py, q):  # pylint: disable=invalid-name
+    """Potential owing to point charges 'q' at (px, py)."""
+    r = sqrt((x[:, newaxis] - px)**2 + (y[:, newaxis] - py)**2)
+    r[r == 0] = inf
+    return ((q / r).sum(axis=1),)
+
+def _line_frame(x, y, x1, x2):
+    """Returns the segment lengths and the local coordinates of the points.
+
+    For a segment of length L along the unit vector u, a point p has
+    s = (p - x1).u along the segment, h the signed distance to its left,
+    t = s - L, and distances r1 and r2 to the end points.
+    """
+    d = x2 - x1
+    L = sqrt(d[:, 0]**2 + d[:, 1]**2)  # pylint: disable=invalid-name
+    ux, uy = d[:, 0] / L, d[:, 1] / L
+    ax, ay = x[:, newaxis] - x1[:, 0], y[:, newaxis] - x1[:, 1]
+    s = ax * ux + ay * uy
+    h = ay * ux - ax * uy
+    t = s - L
+    r1 = sqrt(s * s + h * h)
+    r2 = sqrt(t * t + h * h)
+    return L, ux, uy, s, h, t, r1, r2
+
+def _line_E(x, y, x1, x2, q):  # pylint: disable=invalid-name
+    """Field owing to line charges 'q' from x1 to x2.
+
+    With lam = q/L, the field along the segment is lam*(1/r2 - 1/r1) and
+    across it lam*(s/r1 - t/r2)/h.  Off to the side of the segment s and t
+    differ in sign and the latter is evaluated as is; on its extension they
+    share a sign and it is rewritten as lam*h*L*(s + t)/((s*r2 + t*r1)*r1*r2)
+    to avoid cancellation.  Points on the segment get no field across it,
+    and the end points none at all.
+    """
+    L, ux, uy, s, h, t, r1, r2 = _line_frame(x, y, x1, x2)  # pylint: disable=invalid-name
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        inv = (q / L) / (r1 * r2)
+        extension = s * t > 0
+        F = where(extension, h * L * (s + t) / (s * r2 + t * r1), (s * r2 - t * r1) / h)
+        F[~extension & (h == 0)] = 0
+        Epara = inv * (r1 - r2)
+        Eperp = inv * F
+    singular = (r1 == 0) | (r2 == 0)
+    Epara[singular] = 0
+    Eperp[singular] = 0
+    return Epara @ ux - Eperp @ uy, Epara @ uy + Eperp @ ux
+
+def _line_V(x, y, x1, x2, q):  # pylint: disable=invalid-name
+    """Potential owing to line charges 'q' from x1 to x2.
+
+    The potential is lam*log((r1 + r2 + L)/(r1 + r2 - L)), where the
+    denominator is summed as (r1 - s) + (r2 + t) with each term rewritten
+    to avoid cancellation.  It is singular, and set to zero, on the segment.
+    """
+    L, _, _, s, h, t, r1, r2 = _line_frame(x, y, x1, x2)  # pylint: disable=invalid-name
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        h2 = h * h
+        gap = where(s > 0, h2 / (r1 + s), r1 - s) + where(t < 0, h2 / (r2 - t), r2 + t)
+        V = numpy.log((r1 + r2 + L) / gap)
+    V[gap == 0] = 0
+    return (V @ (q / L),)
+
+NUMPY_KERNELS = {  # The number of components and the point and line kernels of each quantity
+    'E': (2, _point_E, _line_E),
+    'V': (1, _point_V, _line_V),
+}
+
+JIT_KERNELS = None  # The compiled kernels, once loaded
+JIT_SERIAL_KERNELS = None  # The compiled kernels that run on the calling thread alone, once loaded
+KERNELS = None  # The kernels of the active backend, chosen on first use (see kernels)
+
+def kernels():
+    """Returns the kernels of the active backend, choosing it on first use.
+
+    The compiled kernels are used when numba is installed, unless the
+    ELECTROSTATICS_BACKEND environment variable is set to 'numpy'.  numba
+    is only imported here, as it is slow to load.
+    """
+    global KERNELS, JIT_KERNELS, JIT_SERIAL_KERNELS
+    if KERNELS is None:
+        if os.environ.get('ELECTROSTATICS_BACKEND', 'numba') != 'numpy':
+            try:
+                from jit import KERNELS as JIT_KERNELS, SERIAL_KERNELS as JIT_SERIAL_KERNELS
+            except ImportError:
+                pass
+        KERNELS = JIT_KERNELS or NUMPY_KERNELS
+    return KERNELS
+
+def serial_kernels():
+    """Returns the kernels of the active backend for a single point, which the compiled ones sum on one thread."""
+    return JIT_SERIAL_KERNELS if kernels() is JIT_KERNELS else NUMPY_KERNELS
+
+def backend():
+    """Returns the name of the active kernel backend, 'numba' or 'numpy'."""
+    return 'numba' if kernels() is JIT_KERNELS else 'numpy'
+
+PROFILER_NAMES = {quantity: ('kernel ' + quantity, quantity + ' evaluations') for quantity in 'EV'}  # Phase, counter
+
+def superpose_columns(quantity, x, y, columns):
+    """Sums the field 'E' or potential 'V' of charge columns (see split_columns)."""
+    ncomp, point_kernel, line_kernel = kernels()[quantity]
+    px, py, pq, x1, x2, lq = columns
+    shape = numpy.shape(x) if numpy.shape(x) == numpy.shape(y) else numpy.broadcast(x, y).shape
+    out = numpy.zeros((ncomp,) + shape, dtype=DTYPE)  # Each kind is added in place
+    phase, counter = PROFILER_NAMES[quantity]
+    if profiler.ENABLED:  # Nothing is computed for the profiler while it is off
+        profiler.count(counter, math.prod(shape) * (len(pq) + len(lq)))
+    with profiler.phase(phase):
+        if len(pq) and MULTIPOLE_THETA is not None and len(pq) >= MULTIPOLE_MIN:
+            tree = quadtree(px, py, pq)
+            superpose(lambda x, y, _: tree.evaluate(quantity, point_kernel, MULTIPOLE_THETA, x, y),
+                      ncomp, x, y, pq, step=TREE_CHUNK, out=out)
+        elif len(pq):
+            superpose(point_kernel, ncomp, x, y, px, py, pq, out=out)
+        if len(lq):
+            superpose(line_kernel, ncomp, x, y, x1, x2, lq, out=out)
+    return out
+
+def each_charge(quantity, rows, charge, x, y):
+    """Returns the field 'E' or potential 'V' of each charge alone at its own points.
+
+    The charge rows[charge[n]] (see ChargeSet._rows) is evaluated at the
+    points x[n], y[n] along the first axis of (x, y).  Each kind of charge
+    takes a single kernel call: point charges as a unit charge at the
+    origin, at the points relative to each charge, and line charges as a
+    unit segment from (0, 0) to (1, 0), at the points in each segment's
+    frame scaled by its length L, the field then being rotated back and
+    scaled by q/L**2 and the potential by q/L.  Returns an array of shape
+    (components,) + x.shape.
+    """
+    ncomp, point_kernel, line_kernel = kernels()[quantity]
+    x1, x2, q, line = rows
+    x, y = numpy.asarray(x, dtype=DTYPE), numpy.asarray(y, dtype=DTYPE)
+    out = numpy.empty((ncomp,) + x.shape, dtype=DTYPE)
+
+    def per_charge(values):
+        """Broadcasts a value per charge over the points of each."""
+        return values.reshape((-1,) + (1,) * (x.ndim - 1))
+
+    point = ~line[charge]
+    if point.any():
+        k = charge[point]
+        unit = superpose(point_kernel, ncomp, x[point] - per_charge(x1[k, 0]), y[point] - per_charge(x1[k, 1]),
+                         *UNIT_POINT)
+        out[:, point] = unit * per_charge(q[k])
+    if not point.all():
+        k = charge[~point]
+        d = x2[k] - x1[k]
+        L = numpy.hypot(d[:, 0], d[:, 1])  # pylint: disable=invalid-name
+        ux, uy = per_charge(d[:, 0] / L), per_charge(d[:, 1] / L)
+        ax, ay = x[~point] - per_charge(x1[k, 0]), y[~point] - per_charge(x1[k, 1])
+        L = per_charge(L)  # pylint: disable=invalid-name
+        unit = superpose(line_kernel, ncomp, (ax * ux + ay * uy) / L, (ay * ux - ax * uy) / L, *UNIT_LINE)
+        if quantity == 'E':
+            along, across = unit
+            out[:, ~point] = (along * ux - across * uy, along * uy + across * ux) * (per_charge(q[k]) / L**2)
+        else:
+            out[:, ~point] = unit * (per_charge(q[k]) / L)
+    return out
+
+UNIT_POINT = (array([0.0]), array([0.0]), array([1.0]))  # The (px, py, q) of a unit point charge at the origin
+UNIT_LINE = (array([[0.0, 0.0]]), array([[1.0, 0.0]]), array([1.0]))  # The (x1, x2, q) of a unit segment
+
+_QUADTREE = [None, None]  # The columns and QuadTree most recently built
+
+def quadtree(px, py, q):
+    """Returns a QuadTree over the point charges, reusing the last one if they match."""
+    columns, tree = _QUADTREE
+    if columns is None or not all(numpy.array_equal(a, b) for a, b in zip(columns, (px, py, q))):
+        columns, tree = (px.copy(), py.copy(), q.copy()), QuadTree(px, py, q)
+        _QUADTREE[:] = columns, tree
+    return tree
+
 #-----------------------------------------------------------------------------
 # Classes
 
 class PointCharge:
-    """A point charge."""
+    """A point charge.
+
+    The charge is a view onto one row of a ChargeSet.  A charge created on its
+    own gets a private set, and moves into another set when appended to it;
+    a charge already in a shared set stays there (see ChargeSet.append).
+    """
 
     R = 0.01  # The effective radius of the charge
 
     def __init__(self, x, y, q):
         """Initializes the position (x, y) and quantity of charge 'q'."""
-        self.x = x
-        self.y = y
-        self.q = q
+        ChargeSet._new_private()._insert(self, (x, y), (x, y), q, False)
 
-    
-    def E(self, x, y):  # pylint: disable=invalid-name
-        """Electric field vector at point (x, y)."""
-        if self.q == 0:
-            return 0, 0
+    def get_x(self):
+        """Returns the x coordinate of the charge."""
+        return self._store._x1[self._index, 0]
 
-        # Convert inputs to numpy arrays if they aren't already
-        x = numpy.array(x)
-        y = numpy.array(y)
+    def set_x(self, x):
+        """Sets the x coordinate of the charge."""
+        self._store._update(self._index, x1=(x, self.y), x2=(x, self.y))
+    x = property(get_x, set_x)
 
-        dx = x - self.x
-        dy = y - self.y
-        r_squared = dx**2 + dy**2
+    def get_y(self):
+        """Returns the y coordinate of the charge."""
+        return self._store._x1[self._index, 1]
 
-        # Handle division by zero for points exactly at the charge location
-        r_squared = numpy.where(r_squared == 0, numpy.inf, r_squared)
+    def set_y(self, y):
+        """Sets the y coordinate of the charge."""
+        self._store._update(self._index, x1=(self.x, y), x2=(self.x, y))
+    y = property(get_y, set_y)
 
-        r = numpy.sqrt(r_squared)
-        field_magnitude = self.q / r_squared
+    def get_q(self):
+        """Returns the quantity of charge."""
+        return self._store._q[self._index]
 
-        # Calculate field components
-        Ex = field_magnitude * (dx / r)
-        Ey = field_magnitude * (dy / r)
+    def set_q(self, q):
+        """Sets the quantity of charge."""
+        self._store._update(self._index, q=q)
+    q = property(get_q, set_q)
+
+    def E(self, x, y):  # pylint: disable=invalid-name
+        """Electric field vector at point (x, y)."""
+        Ex, Ey = superpose(_point_E, 2, x, y, array([self.x]), array([self.y]), array([self.q]))
+        return Ex, Ey
 
-        return Ex, Ey    
-    
     def V(self, x, y):  # pylint: disable=invalid-name
         """Potential at point (x, y)."""
-        r = sqrt((x - self.x)**2 + (y - self.y)**2)
-        return self.q / r if r != 0 else 0
+        return superpose(_point_V, 1, x, y, array([self.x]), array([self.y]), array([self.q]))[0]
 
     def is_close(self, x, y):
         """Returns True if (x, y) is close to the charge; False otherwise."""
@@ -138,46 +512,54 @@ class PointCharge:
         pygame.draw.circle(screen, color, pos, r)       
         
 class LineCharge:
-    """A line charge."""
+    """A line charge.
+
+    Like PointCharge, the charge is a view onto one row of a ChargeSet.
+    """
 
     R = 0.01  # The effective radius of the charge
 
     def __init__(self, q, x1, x2):
         """Initializes the quantity of charge 'q' and end point vectors 'x1' and 'x2'."""
-        self.q, self.x1, self.x2 = q, array(x1), array(x2)
+        ChargeSet._new_private()._insert(self, x1, x2, q, True)
+
+    def get_x1(self):
+        """Returns a read-only copy of the first end point (assign x1 to move it)."""
+        return _read_only(self._store._x1[self._index])
+
+    def set_x1(self, x1):
+        """Sets the first end point."""
+        self._store._update(self._index, x1=x1)
+    x1 = property(get_x1, set_x1)
+
+    def get_x2(self):
+        """Returns a read-only copy of the second end point (assign x2 to move it)."""
+        return _read_only(self._store._x2[self._index])
+
+    def set_x2(self, x2):
+        """Sets the second end point."""
+        self._store._update(self._index, x2=x2)
+    x2 = property(get_x2, set_x2)
+
+    def get_q(self):
+        """Returns the quantity of charge."""
+        return self._store._q[self._index]
+
+    def set_q(self, q):
+        """Sets the quantity of charge."""
+        self._store._update(self._index, q=q)
+    q = property(get_q, set_q)
 
     def get_lam(self):
         """Returns the total charge on the line."""
         return self.q / norm(self.x2 - self.x1)
     lam = property(get_lam)
 
-   
     def E(self, x, y):  # pylint: disable=invalid-name
         """Electric field vector at point (x, y)."""
-        
-        # Convert (x, y) to a numpy array with shape (n, 2)
-        x_points = numpy.array([x, y]).T  # Transpose to get (n, 2) shape
-        x1, x2, lam = self.x1, self.x2, self.lam
-
-        theta1 = angle(x_points, x1, x2)
-        theta2 = pi - angle(x_points, x2, x1)
-        a = point_line_distance(x_points, x1, x2)
-        r1 = norm(x_points - x1)
-        r2 = norm(x_points - x2)
-        sign = where(is_left(x_points, x1, x2), 1, -1)
-
-        Epara = lam * (1 / r2 - 1 / r1)
-        Eperp = -sign * lam * (cos(theta2) - cos(theta1)) / where(a == 0, inf, a)
-
-        dx = x2 - x1
-        dx_norm = norm(dx)
-
-        # Calculate components
-        Ex = Eperp * (-dx[1] / dx_norm) + Epara * (dx[0] / dx_norm)
-        Ey = Eperp * (dx[0] / dx_norm) + Epara * (dx[1] / dx_norm)
+        Ex, Ey = superpose(_line_E, 2, x, y, self.x1[newaxis], self.x2[newaxis], array([self.q]))
+        return Ex, Ey
 
-        return Ex, Ey   
-    
     def is_close(self, x):
         """Returns True if x is close to the charge."""
         theta1 = angle(x, self.x1, self.x2)
@@ -187,15 +569,10 @@ class LineCharge:
             return point_line_distance(x, self.x1, self.x2) < self.R
         return numpy.min([norm(self.x1-x), norm(self.x2-x)], axis=0) < self.R
 
-   
     def V(self, x, y):  # pylint: disable=invalid-name
         """Potential at point (x, y)."""
-        x = array([x, y])  # Convert (x, y) to a numpy array
-        r1 = norm(x - self.x1)
-        r2 = norm(x - self.x2)
-        L = norm(self.x2 - self.x1)  # pylint: disable=invalid-name
-        return self.lam * numpy.log((r1 + r2 + L) / (r1 + r2 - L))
-    
+        return superpose(_line_V, 1, x, y, self.x1[newaxis], self.x2[newaxis], array([self.q]))[0]
+
     def plot(self, screen, screen_width, screen_height):
         """Plots the charge using pygame."""
         color = (0, 0, 255) if self.q < 0 else (255, 0, 0) if self.q > 0 else (0, 0, 0)
@@ -204,6 +581,682 @@ class LineCharge:
         end_pos = to_screen_coordinates(self.x2[0], self.x2[1], screen_width, screen_height)
         pygame.draw.line(screen, color, start_pos, end_pos, width)
 
+def _read_only(a):
+    """Returns a copy of 'a' that raises on in-place changes, which would not reach the charge."""
+    a = a.copy()
+    a.flags.writeable = False
+    return a
+
+class ChargeSet:
+    """A collection of charges stored as contiguous arrays.
+
+    Point and line charges share the same columns so that insertion order is
+    kept: a point charge stores its position as both end points.  The set
+    behaves like a list of PointCharge/LineCharge views, and evaluates the
+    field and potential of all its charges in a single broadcast kernel.
+    Views are only created when a charge is first accessed, so that large
+    sets can be built from arrays (see from_arrays).
+    """
+
+    def __init__(self, charges=()):
+        """Initializes an empty set and appends 'charges' to it."""
+        self._x1 = numpy.empty((0, 2))
+        self._x2 = numpy.empty((0, 2))
+        self._q = numpy.empty(0)
+        self._line = numpy.empty(0, dtype=bool)
+        self._views = []
+        self._packed = None
+        self.revision = 0  # Bumped whenever a charge is added, removed or changed
+        self.held = None  # The charge being dragged, if any
+        self._handles = None  # The SpatialHash of handles, built on first use
+        self.private = False  # True for the set of a charge created on its own, see append
+        self.extend(charges)
+
+    def __len__(self):
+        return len(self._views)
+
+    def __iter__(self):
+        return iter([self[i] for i in range(len(self._views))])
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self._views)))]
+        view = self._views[i]
+        if view is None:
+            i = range(len(self._views))[i]
+            kind = LineCharge if self._line[i] else PointCharge
+            view = kind.__new__(kind)
+            view._store, view._index = self, i
+            self._views[i] = view
+        return view
+
+    @classmethod
+    def _new_private(cls):
+        """Returns a new set to hold a charge created on its own."""
+        charges = cls()
+        charges.private = True
+        return charges
+
+    @classmethod
+    def from_arrays(cls, x1, x2, q, line):
+        """Returns a set of charges built straight from (x1, x2, q, line) columns.
+
+        'x1' and 'x2' are (n, 2) arrays of end points (a point charge's
+        position in both), 'q' the (n,) charges and 'line' an (n,) boolean
+        array that is True for line charges.
+        """
+        charges = cls()
+        charges._x1 = numpy.array(x1, dtype=float).reshape(-1, 2)
+        charges._x2 = numpy.array(x2, dtype=float).reshape(-1, 2)
+        charges._q = numpy.array(q, dtype=float).ravel()
+        charges._line = numpy.array(line, dtype=bool).ravel()
+        charges._views = [None] * len(charges._q)
+        return charges
+
+    def snapshot(self):
+        """Returns a copy of the charges and the index of the held charge, for restore."""
+        held = self.held._index if self.held in self else None
+        return tuple(column.copy() for column in self._rows()) + (held,)
+
+    def restore(self, snapshot):
+        """Makes this set a copy of the one 'snapshot' was taken from.
+
+        The set keeps its views while the number of charges is unchanged, and
+        only starts a new revision if the charges differ.
+        """
+        *rows, held = snapshot
+        if len(rows[2]) != len(self._views):
+            self._x1, self._x2, self._q, self._line = (column.copy() for column in rows)
+            self._views = [None] * len(rows[2])
+            self._handles = None
+            self._changed()
+        elif not all(numpy.array_equal(a, b) for a, b in zip(self._rows(), rows)):
+            for column, values in zip(self._rows(), rows):
+                column[:] = values
+            if self._handles is not None:
+                self._handles = None
+            self._changed()
+        self.held = None if held is None else self[held]
+
+    def plot(self, screen, screen_width, screen_height):
+        """Plots all charges using pygame, as PointCharge.plot and LineCharge.plot do."""
+        x1, x2, q, line = self._rows()
+        sx1 = numpy.stack(to_screen(x1[:, 0], x1[:, 1], screen_width, screen_height), axis=-1).astype(int)
+        sx2 = numpy.stack(to_screen(x2[:, 0], x2[:, 1], screen_width, screen_height), axis=-1).astype(int)
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            width = (5 * (sqrt(fabs(q / norm(x2 - x1))) / 2 + 1)).astype(int)
+        for start, end, charge, is_line, w in zip(sx1.tolist(), sx2.tolist(), q.tolist(),
+                                                  line.tolist(), width.tolist()):
+            color = (0, 0, 255) if charge < 0 else (255, 0, 0) if charge > 0 else (0, 0, 0)
+            if is_line:
+                pygame.draw.line(screen, color, start, end, w)
+            else:
+                pygame.draw.circle(screen, color, start, 10)
+
+    def __contains__(self, charge):
+        return getattr(charge, '_store', None) is self
+
+    def append(self, charge):
+        """Moves 'charge' into this set.
+
+        Only a charge in its private set (one created on its own, or removed
+        from a set) can be moved: taking a charge out of another shared set
+        would change that set behind its users' backs, so it raises
+        ValueError (see copy_of to append a copy instead).
+        """
+        if charge in self:
+            raise ValueError('charge is already in the set')
+        old = charge._store
+        if not old.private:
+            raise ValueError('charge belongs to another ChargeSet; append a copy instead')
+        self.private = False
+        row = old._row(charge._index)
+        old._discard(charge._index)
+        self._insert(charge, *row)
+
+    def extend(self, charges):
+        """Appends each of 'charges'."""
+        for charge in charges:
+            self.append(charge)
+
+    def copy_of(self, charge):
+        """Appends a copy of 'charge', leaving it in its own set, and returns the copy."""
+        kind = type(charge)
+        view = kind.__new__(kind)
+        self.private = False
+        self._insert(view, *charge._store._row(charge._index))
+        return view
+
+    def remove(self, charge):
+        """Removes 'charge', which keeps its values in a private set."""
+        if charge not in self:
+            raise ValueError('ChargeSet.remove(x): x not in set')
+        row = self._row(charge._index)
+        self._discard(charge._index)
+        ChargeSet._new_private()._insert(charge, *row)
+
+    def E(self, x, y):  # pylint: disable=invalid-name
+        """Electric field vector at point (x, y) owing to all charges."""
+        Ex, Ey = superpose_columns('E', x, y, self._pack())
+        return Ex[()], Ey[()]
+
+    def V(self, x, y):  # pylint: disable=invalid-name
+        """Potential at point (x, y) owing to all charges."""
+        return superpose_columns('V', x, y, self._pack())[0][()]
+
+    def hold(self, charge):
+        """Marks 'charge' as the one being moved, or clears the mark if None.
+
+        Grid caches use this to keep the sum over all other charges while
+        the held charge is dragged around.
+        """
+        self.held = charge
+
+    def get_handles(self):
+        """Returns the SpatialHash of the charges' handles.
+
+        A handle is a point that can be picked to drag or remove a charge:
+        the position of a point charge, under the key (charge, None), and the
+        end points of a line charge, under (charge, 'start') and (charge, 'end').
+        The index is built on first use and then kept up to date.
+        """
+        if self._handles is None:
+            self._handles = SpatialHash()
+            for i in range(len(self._views)):
+                self._add_handles(i)
+        return self._handles
+    handles = property(get_handles)
+
+    def handle_position(self, key):
+        """Returns the (x, y) position of the handle 'key'."""
+        charge, end = key
+        x, y = (self._x2 if end == 'end' else self._x1)[charge._index]
+        return float(x), float(y)
+
+    def _handle_keys(self, i):
+        """Returns the handle keys of row 'i'."""
+        view = self[i]
+        return ((view, 'start'), (view, 'end')) if self._line[i] else ((view, None),)
+
+    def _add_handles(self, i):
+        """Adds the handles of row 'i' to the index."""
+        for key in self._handle_keys(i):
+            self._handles.insert(key, *self.handle_position(key))
+
+    def _row(self, i):
+        """Returns the stored values of row 'i'."""
+        return self._x1[i].copy(), self._x2[i].copy(), self._q[i], self._line[i]
+
+    def _insert(self, view, x1, x2, q, line):
+        """Appends a row and binds 'view' to it."""
+        n = len(self._views)
+        if n == len(self._q):
+            capacity = max(4, 2 * n)
+            self._x1 = numpy.resize(self._x1, (capacity, 2))
+            self._x2 = numpy.resize(self._x2, (capacity, 2))
+            self._q = numpy.resize(self._q, capacity)
+            self._line = numpy.resize(self._line, capacity)
+        self._x1[n], self._x2[n], self._q[n], self._line[n] = x1, x2, q, line
+        view._store, view._index = self, n
+        self._views.append(view)
+        if self._handles is not None:
+            self._add_handles(n)
+        self._changed()
+
+    def _discard(self, i):
+        """Deletes row 'i', shifting the following rows down."""
+        n = len(self._views)
+        if self._handles is not None:
+            for key in self._handle_keys(i):
+                self._handles.remove(key)
+        for column in (self._x1, self._x2, self._q, self._line):
+            column[i:n-1] = column[i+1:n]
+        del self._views[i]
+        for j in range(i, n - 1):
+            if self._views[j] is not None:
+                self._views[j]._index = j
+        self._changed()
+
+    def _update(self, i, x1=None, x2=None, q=None):
+        """Overwrites the given values of row 'i'."""
+        if x1 is not None:
+            self._x1[i] = x1
+        if x2 is not None:
+            self._x2[i] = x2
+        if q is not None:
+            self._q[i] = q
+        if self._handles is not None:
+            for key in self._handle_keys(i):
+                self._handles.move(key, *self.handle_position(key))
+        self._changed()
+
+    def _changed(self):
+        """Drops the cached columns and starts a new revision."""
+        self._packed = None
+        self.revision += 1
+
+    def _pack(self):
+        """Returns the columns of all charges, gathered once per change."""
+        if self._packed is None:
+            self._packed = split_columns(*self._rows())
+        return self._packed
+
+    def _rows(self):
+        """Returns the (x1, x2, q, line) storage of the charges."""
+        n = len(self._views)
+        return self._x1[:n], self._x2[:n], self._q[:n], self._line[:n]
+
+def split_columns(x1, x2, q, line):
+    """Splits rows of charges into point charge (x, y, q) and line charge (x1, x2, q) columns."""
+    point = ~line
+    return x1[point, 0], x1[point, 1], q[point], x1[line], x2[line], q[line]
+
+def as_charge_set(charges):
+    """Returns 'charges' as a ChargeSet.
+
+    A ChargeSet is returned as is, and so is the set that a list of charges
+    already makes up in full.  Otherwise the charges are gathered into a new
+    set: those created on their own are moved into it, so that changing them
+    changes the set, while those in another set are copied, which leaves that
+    set and its users as they were.
+    """
+    if isinstance(charges, ChargeSet):
+        return charges
+    charges = list(charges)
+    if charges and all(charge._store is charges[0]._store for charge in charges) \
+            and len(charges[0]._store) == len(charges):
+        charges[0]._store.private = False  # Shared from now on
+        return charges[0]._store
+    gathered = ChargeSet()
+    for charge in charges:
+        if charge._store.private:
+            gathered.append(charge)
+        else:
+            gathered.copy_of(charge)
+    return gathered
+
+class GridSum:
+    """The field or potential of a ChargeSet on a fixed grid of points.
+
+    The result is kept until the set's revision changes.  While a charge is
+    held (see ChargeSet.hold), the sum over all other charges is kept
+    separately, so that moving the held charge only costs evaluating that one
+    charge on the grid.  When the charge is released its contribution is
+    folded back in; every REFRESH folds the grid is recomputed in full to
+    bound the rounding error of the updates.
+    """
+
+    REFRESH = 50  # The number of folds between full recomputes
+
+    def __init__(self, charges, quantity):
+        """Initializes the cache of 'quantity' ('E' or 'V') for 'charges'."""
+        self.charges = charges
+        self.quantity = quantity
+        self._x = self._y = None
+        self._total = None  # The sum over all charges
+        self._rows = None  # The charges _total was computed from
+        self._revision = None  # The revision of _rows
+        self._held = None
+        self._static = None  # The sum over all charges but the held one
+        self._folds = 0
+
+    def evaluate(self, x, y):
+        """Returns the sum at the grid points (x, y), shaped (components,) + x.shape."""
+        x, y = numpy.broadcast_arrays(numpy.asarray(x, dtype=DTYPE), numpy.asarray(y, dtype=DTYPE))
+        if self._x is None or x.shape != self._x.shape \
+                or not (numpy.array_equal(x, self._x) and numpy.array_equal(y, self._y)):
+            # Read-only grids (see sample_grid) are kept as they are, unexpanded
+            self._x, self._y = (a if not a.flags.writeable else a.copy() for a in (x, y))
+            self._total = self._rows = self._revision = self._held = self._static = None
+
+        charges = self.charges
+        if self._revision == charges.revision:
+            return self._total
+
+        rows = tuple(column.copy() for column in charges._rows())
+        held = charges.held if charges.held in charges else None
+        if held is not self._held:
+            self._release()
+        if held is None:
+            if not self._same_except(rows, None):
+                self._total = self._sum(rows, slice(None))
+                self._folds = 0
+        else:
+            i = held._index
+            if not self._same_except(rows, i):
+                self._static = self._sum(rows, numpy.arange(len(rows[2])) != i)
+            elif self._static is None:
+                # Split the held charge's old contribution off the total
+                self._static = self._total - self._sum(self._rows, [i])
+            self._total = self._static + self._sum(rows, [i])
+        self._held, self._rows, self._revision = held, rows, charges.revision
+        return self._total
+
+    def _release(self):
+        """Folds the previously held charge back into the total.
+
+        The total already includes the held charge as of the last evaluation,
+        so only the separate sum of the other charges is dropped.
+        """
+        if self._held is not None:
+            self._folds += 1
+            if self._folds >= self.REFRESH:
+                self._total = None
+        self._static = None
+
+    def _same_except(self, rows, i):
+        """Returns True if 'rows' match the rows of _total, except possibly row 'i' (None for all)."""
+        if self._total is None or len(rows[2]) != len(self._rows[2]):
+            return False
+        others = numpy.arange(len(rows[2])) != i
+        return all(numpy.array_equal(a[others], b[others]) for a, b in zip(rows, self._rows))
+
+    def _sum(self, rows, index):
+        """Sums the quantity of the charges rows[index] over the grid."""
+        columns = split_columns(*(column[index] for column in rows))
+        return superpose_columns(self.quantity, self._x, self._y, columns)
+
+def cached_grid(grids, key, charges, quantity, limit):
+    """Returns the GridSum of 'quantity' under 'key' in the dict 'grids', making it if missing.
+
+    'grids' is kept in least recently used order and trimmed to 'limit'
+    entries, so that each of several grids drawn in turn (such as tiles)
+    keeps its own sums.
+    """
+    grid = grids.pop(key, None)
+    if grid is None:
+        grid = GridSum(charges, quantity)
+    grids[key] = grid  # Most recently used last
+    while len(grids) > limit:
+        del grids[next(iter(grids))]
+    return grid
+
+class FieldTable:
+    """The field and potential of a ChargeSet tabulated on a grid, for fast point queries.
+
+    The table covers 'extent' (xmin, xmax, ymin, ymax), by default the
+    domain as of each build, in square cells, and is built on the first
+    query after the charges change (through GridSums, so that dragging a
+    charge only evaluates that charge on the grid).  Points are then
+    interpolated from the nearest nodes, bilinearly with 'order' 1 or
+    bicubically (Catmull-Rom) with 'order' 3.
+
+    Near a charge the field changes too fast to interpolate, so in cells
+    within 'margin' cells of charges those charges are taken out of the
+    nodes around the cell and evaluated exactly at the point instead: only
+    the smooth remainder of the other charges is interpolated, at the cost
+    of the charges near the point.  The margin defaults to the one at which
+    interpolating a single charge errs by about 'tolerance' relative to its
+    field (see MARGIN_ERROR), and the cell size to the one at which the
+    cells within the margin of a point hold about NEAR_CHARGES charges, for
+    the charges' density over the extent; a 'resolution' given sets the
+    cells along the longer side of the extent instead.  As the charges'
+    fields add up and cancel, each build also compares the interpolation
+    with the exact sum at the center of every cell, and the cells off by
+    more than 'tolerance' relative to the exact value (and, for the
+    potential, the cells it crosses zero in) are evaluated exactly, as are
+    points off the table.
+    """
+
+    MARGIN_ERROR = {1: (0.3, 1.5), 3: (0.6, 3)}  # (c, p): interpolating a charge m cells away errs by about c / m**p
+    MARGINS = (2, 16)  # The bounds of the default margin
+    NEAR_CHARGES = 4  # The charges within the margin of a point on average, for the default cell size
+    RESOLUTIONS = (32, 1024)  # The bounds of the default resolution
+
+    def __init__(self, charges, resolution=None, order=3, margin=None, extent=None, tolerance=1e-3):
+        if order not in (1, 3):
+            raise ValueError('order must be 1 (bilinear) or 3 (bicubic), not %r' % order)
+        self.charges = as_charge_set(charges)
+        self.resolution = resolution
+        self.order = order
+        self.tolerance = tolerance
+        if margin is None:
+            c, p = self.MARGIN_ERROR[order]
+            margin = min(max(math.ceil((c / tolerance)**(1 / p)), self.MARGINS[0]), self.MARGINS[1])
+        self.margin = margin
+        self.extent = extent
+        self._grids = {'E': GridSum(self.charges, 'E'), 'V': GridSum(self.charges, 'V')}
+        self._checks = {'E': GridSum(self.charges, 'E'), 'V': GridSum(self.charges, 'V')}  # At the cell centers
+        self._key = None  # The revision and extent the table was built for
+        self._geometry = None  # The extent and resolution of the nodes
+        self._x = self._y = None  # The node coordinates
+        self._centers = None  # The coordinates of the cell centers
+        self._origin = self._step = None  # The position of node (0, 0) and the node spacing
+        self._near = None  # The index of each cell among those near a charge, or -1
+        self._pairs = None  # The (cell, charge) pairs within 'margin' cells, sorted by cell, point charges first
+        self._starts = None  # The first pair of each near cell, and the number of pairs
+        self._spans = None  # The first pair, first line charge pair and end of each near cell, as a list
+        self._columns = None  # The point and line charge columns (see split_columns) of each pair's charge
+        self._tables = {}  # The values at the nodes and the cells evaluated exactly by quantity, on first use
+
+    def E(self, x, y):  # pylint: disable=invalid-name
+        """Electric field vector at point (x, y)."""
+        Ex, Ey = self._query('E', x, y)
+        return Ex[()], Ey[()]
+
+    def V(self, x, y):  # pylint: disable=invalid-name
+        """Potential at point (x, y)."""
+        return self._query('V', x, y)[0][()]
+
+    def build(self):
+        """Tabulates the charges, unless the table is up to date."""
+        extent = tuple(domain() if self.extent is None else self.extent)
+        if self._key == (self.charges.revision, extent):
+            return
+        geometry = (extent, self._resolution(extent))
+        if self._geometry != geometry:
+            # The nodes reach a cell past the extent on each side, for the bicubic stencil
+            (xmin, xmax, ymin, ymax), resolution = geometry
+            step = max(xmax - xmin, ymax - ymin) / resolution
+            columns, rows = int(numpy.ceil((xmax - xmin) / step)) + 3, int(numpy.ceil((ymax - ymin) / step)) + 3
+            self._origin, self._step = (xmin - step, ymin - step), step
+            x = (xmin + (arange(columns) - 1) * step).astype(DTYPE)
+            y = (ymin + (arange(rows) - 1) * step).astype(DTYPE)
+            self._x, self._y = meshgrid(x, y, copy=False)
+            self._centers = meshgrid(x[:-1] + step / 2, y[:-1] + step / 2, copy=False)
+            for a in (self._x, self._y, *self._centers):
+                a.flags.writeable = False
+            self._geometry = geometry
+        self._near_cells()
+        self._tables = {}
+        self._key = (self.charges.revision, extent)
+
+    def _resolution(self, extent):
+        """Returns the cells along the longer side of 'extent', from the charges' density unless set."""
+        if self.resolution is not None:
+            return self.resolution
+        xmin, xmax, ymin, ymax = extent
+        if not len(self.charges):
+            return self.RESOLUTIONS[0]
+        spacing = math.sqrt((xmax - xmin) * (ymax - ymin) / len(self.charges))  # Between charges, on average
+        step = spacing * math.sqrt(self.NEAR_CHARGES) / (2 * self.margin + 1)
+        resolution = math.ceil(max(xmax - xmin, ymax - ymin) / step)
+        return min(max(resolution, self.RESOLUTIONS[0]), self.RESOLUTIONS[1])
+
+    def _near_cells(self):
+        """Finds the charges within 'margin' cells of each cell."""
+        rows, columns = self._x.shape
+        x1, x2, q, line = self.charges._rows()
+        cells, charge = charge_cells(x1, x2, line, self._origin, self._step, (rows - 1, columns - 1), self.margin)
+        order = numpy.lexsort((line[charge], cells))
+        self._pairs = cells, charge = cells[order], charge[order]
+        cells, starts = numpy.unique(cells, return_index=True)
+        self._starts = numpy.append(starts, len(charge))
+        lines = starts + numpy.add.reduceat(~line[charge], starts, dtype=int) if len(charge) else starts
+        self._spans = numpy.column_stack([starts, lines, self._starts[1:]]).tolist()
+        self._near = numpy.full((rows - 1, columns - 1), -1)
+        self._near.flat[cells] = arange(len(cells))
+        x1, x2, q = x1[charge].astype(DTYPE), x2[charge].astype(DTYPE), q[charge].astype(DTYPE)
+        self._columns = (x1[:, 0].copy(), x1[:, 1].copy(), q), (x1, x2, q)
+
+    def _stencil_nodes(self, cells):
+        """Returns the flat indices of the nodes interpolated in each of 'cells', shaped (cells, nodes)."""
+        rows, columns = self._x.shape
+        stencil = array(_stencil(self.order))
+        j, i = numpy.divmod(cells, columns - 1)
+        return (numpy.clip(j[:, newaxis] + stencil[:, 1], 0, rows - 1) * columns
+                + numpy.clip(i[:, newaxis] + stencil[:, 0], 0, columns - 1))
+
+    def _remainders(self, quantity, nodes):
+        """Returns the 'nodes' (nodes, components) of each cell near a charge less the charges near it.
+
+        The result is shaped (cells, stencil nodes, components), by near cell.
+        """
+        cells, charge = self._pairs
+        first = self._starts[:-1]
+        if not len(cells):
+            return numpy.zeros((0, len(_stencil(self.order)), nodes.shape[1]), dtype=DTYPE)
+        remainders = nodes.take(self._stencil_nodes(cells[first]), axis=0)
+        node = self._stencil_nodes(cells)
+        near = each_charge(quantity, self.charges._rows(), charge, numpy.take(self._x, node), numpy.take(self._y, node))
+        near = near.transpose(1, 2, 0)
+        cell = numpy.repeat(arange(len(first)), numpy.diff(self._starts))
+        rank = arange(len(cells)) - first[cell]  # The place of each pair among those of its cell
+        for r in range(rank.max() + 1):
+            # No two pairs of the same rank share a cell, so none of the subtractions are lost
+            pairs = rank == r
+            remainders[cell[pairs]] -= near[pairs]
+        return remainders
+
+    def _table(self, quantity):
+        """Returns the table of 'quantity': the node values, and the cells to evaluate exactly.
+
+        The values are kept as (components, rows, columns), as a (nodes,
+        components) copy for gathers, and as the remainders of the cells
+        near charges.
+        """
+        if quantity not in self._tables:
+            table = self._grids[quantity].evaluate(self._x, self._y)
+            nodes = table.reshape(len(table), -1).T.copy()
+            remainders = self._remainders(quantity, nodes)
+
+            # The interpolation is checked at the center of each cell of the table (the
+            # cells of the outer nodes are off the table, and evaluated exactly anyway)
+            exact = numpy.ones(self._near.shape, dtype=bool)
+            inner = (slice(1, -1), slice(1, -1))
+            x, y = self._centers[0][inner], self._centers[1][inner]
+            cells = arange(exact.size).reshape(exact.shape)[inner].ravel()
+            half = numpy.full(len(cells), 0.5)
+            error = self._interpolate(quantity, nodes, remainders, cells, half, half, x.ravel(), y.ravel())
+            values = self._checks[quantity].evaluate(x, y).reshape(len(table), -1)
+            error -= values
+            # The error is taken relative to the smallest magnitude at the center and the corners,
+            # as the magnitude changes across the cell
+            magnitude = numpy.hypot.reduce(table, axis=0)
+            magnitude = numpy.minimum.reduce([magnitude[:-1, :-1], magnitude[1:, :-1],
+                                              magnitude[:-1, 1:], magnitude[1:, 1:]])[inner].ravel()
+            magnitude = numpy.minimum(magnitude, numpy.hypot.reduce(values, axis=0))
+            exact[inner] = (numpy.hypot.reduce(error, axis=0) > self.tolerance * magnitude).reshape(x.shape)
+            if quantity == 'V':
+                # No relative error holds where the potential crosses zero
+                sign = numpy.sign(table[0])
+                exact |= (sign[:-1, :-1] != sign[1:, :-1]) | (sign[:-1, :-1] != sign[:-1, 1:]) \
+                    | (sign[:-1, :-1] != sign[1:, 1:])
+            self._tables[quantity] = (table, nodes, remainders, exact)
+        return self._tables[quantity]
+
+    def _interpolate(self, quantity, nodes, remainders, cells, u, v, x, y):
+        """Returns the 'quantity' interpolated at points (x, y), at fractions (u, v) of 'cells'.
+
+        'cells' are flat cell indices, and the result is shaped (components, points).
+        """
+        columns = self._x.shape[1]
+        out = numpy.empty((nodes.shape[1], len(cells)), dtype=DTYPE)
+        near = self._near.flat[cells]
+        clear = near < 0
+        j, i = numpy.divmod(cells[clear], columns - 1)
+        node = j * columns + i
+        values = numpy.zeros((len(node), nodes.shape[1]), dtype=DTYPE)
+        for (di, dj), weight in zip(_stencil(self.order), _weights(self.order, u[clear], v[clear])):
+            values += nodes.take(node + (dj * columns + di), axis=0) * weight[:, newaxis]
+        out[:, clear] = values.T
+
+        close = ~clear
+        if close.any():
+            # The remainders are interpolated, and the near charges added pair by pair
+            cell = near[close]
+            weights = array(_weights(self.order, u[close], v[close]))
+            values = numpy.einsum('np,pnc->cp', weights, remainders[cell])
+            counts = self._starts[cell + 1] - self._starts[cell]
+            point = numpy.repeat(arange(len(cell)), counts)
+            pair = arange(counts.sum()) + numpy.repeat(self._starts[cell] - (numpy.cumsum(counts) - counts), counts)
+            exact = each_charge(quantity, self.charges._rows(), self._pairs[1][pair], x[close][point], y[close][point])
+            out[:, close] = values + numpy.add.reduceat(exact, numpy.cumsum(counts) - counts, axis=1)
+        return out
+
+    def _query(self, quantity, x, y):
+        """Returns the interpolated or exact 'quantity' at points (x, y), shaped (components,) + shape."""
+        self.build()
+        table, nodes, remainders, exact = self._table(quantity)
+        if isinstance(x, (float, int)) and isinstance(y, (float, int)):
+            out = self._point(quantity, float(x), float(y))
+            return superpose_columns(quantity, x, y, self.charges._pack()) if out is None else out
+
+        x, y = numpy.broadcast_arrays(numpy.asarray(x, dtype=DTYPE), numpy.asarray(y, dtype=DTYPE))
+        shape, x, y = x.shape, x.ravel(), y.ravel()
+        ncomp, rows, columns = table.shape
+        out = numpy.empty((ncomp, len(x)), dtype=DTYPE)
+
+        # Cell (i, j) lies between nodes i and i + 1 across and j and j + 1 up
+        u = (x - self._origin[0]) / self._step
+        v = (y - self._origin[1]) / self._step
+        with numpy.errstate(invalid='ignore'):
+            i, j = numpy.floor(u), numpy.floor(v)
+        inside = (i >= 1) & (i < columns - 2) & (j >= 1) & (j < rows - 2)
+        i, j = i.astype(int) * inside, j.astype(int) * inside
+        cells = j * (columns - 1) + i
+        inside &= ~exact.flat[cells]
+        out[:, inside] = self._interpolate(quantity, nodes, remainders, cells[inside], (u - i)[inside],
+                                           (v - j)[inside], x[inside], y[inside])
+        if not inside.all():
+            out[:, ~inside] = superpose_columns(quantity, x[~inside], y[~inside], self.charges._pack())
+        return out.reshape((ncomp,) + shape)
+
+    def _point(self, quantity, x, y):
+        """Returns the interpolated values at the single point (x, y), or None if it is to be evaluated exactly."""
+        table, _, remainders, exact = self._tables[quantity]
+        u, v = (x - self._origin[0]) / self._step, (y - self._origin[1]) / self._step
+        if not (math.isfinite(u) and math.isfinite(v)):
+            return None
+        i, j = math.floor(u), math.floor(v)
+        _, rows, columns = table.shape
+        if not (1 <= i < columns - 2 and 1 <= j < rows - 2) or exact[j, i]:
+            return None
+        u, v = u - i, v - j
+        cell = self._near[j, i]
+        if cell >= 0:
+            # The kernels are called directly on the near charges' columns, as superpose
+            # costs more than a few charges at one point
+            _, point_kernel, line_kernel = serial_kernels()[quantity]
+            start, lines, end = self._spans[cell]
+            out = numpy.dot(_weights(self.order, u, v), remainders[cell])
+            x, y = array([x], dtype=DTYPE), array([y], dtype=DTYPE)
+            for kernel, sources, pairs in zip((point_kernel, line_kernel), self._columns,
+                                              (slice(start, lines), slice(lines, end))):
+                if pairs.start < pairs.stop:
+                    for k, value in enumerate(kernel(x, y, *(column[pairs] for column in sources))):
+                        out[k] += value[0]
+        elif self.order == 1:
+            out = table[:, j:j + 2, i:i + 2] @ (1 - u, u) @ (1 - v, v)
+        else:
+            out = table[:, j - 1:j + 3, i - 1:i + 3] @ _catmull_rom(u) @ _catmull_rom(v)
+        return out.astype(DTYPE, copy=False)
+
+def _stencil(order):
+    """Returns the (di, dj) offsets from a cell's lower-left node of the nodes interpolated with 'order'."""
+    span = range(2) if order == 1 else range(-1, 3)
+    return [(di, dj) for dj in span for di in span]
+
+def _weights(order, u, v):
+    """Returns the weights of the _stencil nodes at fractions (u, v) of a cell."""
+    wu, wv = ((1 - u, u), (1 - v, v)) if order == 1 else (_catmull_rom(u), _catmull_rom(v))
+    return [a * b for b in wv for a in wu]
+
+def _catmull_rom(t):
+    """Returns the weights of the four nodes around each fraction 't' of a cell, for cubic interpolation."""
+    t2, t3 = t * t, t * t * t
+    return ((-t3 + 2 * t2 - t) / 2, (3 * t3 - 5 * t2 + 2) / 2, (-3 * t3 + 4 * t2 + t) / 2, (t3 - t2) / 2)
+
 class FieldLine:
     """A Field Line."""
 
@@ -211,9 +1264,20 @@ class FieldLine:
         """Initializes the field line points 'x'."""
         self.x = x
 
-    def plot(self, screen, screen_width, screen_height, linewidth=1, startarrows=True, endarrows=True):
-        """Plots the field line and arrows using pygame."""
-        points = [to_screen_coordinates(point[0], point[1], screen_width, screen_height) for point in self.x]
+    def plot(self, screen, screen_width, screen_height, linewidth=1, startarrows=True, endarrows=True,
+             extent=None):
+        """Plots the field line and arrows using pygame.
+
+        'extent' is the (xmin, xmax, ymin, ymax) world rectangle drawn onto
+        the screen, by default the domain.
+        """
+        if extent is None:
+            points = [to_screen_coordinates(point[0], point[1], screen_width, screen_height) for point in self.x]
+        else:
+            xmin, xmax, ymin, ymax = extent
+            k = screen_width / (xmax - xmin)  # Pixels per world unit
+            points = numpy.floor(numpy.column_stack([(self.x[:, 0] - xmin) * k, (ymax - self.x[:, 1]) * k]))
+            points = points.astype(int).tolist()
         if len(points) > 1:
             pygame.draw.lines(screen, (0, 0, 0), False, points, linewidth)
 
@@ -235,19 +1299,19 @@ class ElectricField:
     """The electric field owing to a collection of charges."""
 
     dt0 = 0.01  # The time step for integrations
+    GRIDS = 64  # The most arrow lattices kept at once
 
     def __init__(self, charges):
         """Initializes the field given 'charges'."""
-        self.charges = charges
+        self.charges = as_charge_set(charges)
+        self._grids = {}  # The field on each arrow lattice drawn, by extent, see plot
+        self.table = None  # A FieldTable of the charges answering vector(), if set
 
     def vector(self, x, y):
         """Returns the field vector at point (x, y)."""
-        Ex, Ey = 0, 0
-        for charge in self.charges:
-            charge_ex, charge_ey = charge.E(x, y)
-            Ex += charge_ex
-            Ey += charge_ey
-        return Ex, Ey
+        if self.table is not None:
+            return self.table.E(x, y)
+        return self.charges.E(x, y)
 
     def magnitude(self, x, y):
         """Returns the magnitude of the field vector at point (x, y)."""
@@ -265,42 +1329,203 @@ class ElectricField:
         Ex, Ey = self.vector(x[:, 0], x[:, 1])
 
         # Calculate the projection
-        return Ex * numpy.cos(a) + Ey * numpy.sin(a)   
-       
-    
-    def plot(self, screen, screen_width, screen_height, spacing=27, scale=15):
-        """Plots the electric field vectors as arrows, scaled by magnitude."""
-       
-        for x in range(int(XMIN), int(XMAX), spacing):
-            for y in range(int(YMIN), int(YMAX), spacing):
-                # Calculate the electric field vector at (x, y)
-                Ex, Ey = self.vector(x, y)
-                magnitude = sqrt(Ex**2 + Ey**2)
-
-                # Skip invalid or zero-magnitude vectors
-                if magnitude == 0 or numpy.isnan(magnitude):
-                    continue
-
-                # Normalize the vector for consistent arrow lengths
-                Ex /= magnitude
-                Ey /= magnitude
-
-                # Calculate start and end positions for the arrow
-                start_pos = to_screen_coordinates(x, y, screen_width, screen_height)
-                end_x = x + Ex * scale
-                end_y = y + Ey * scale
-                end_pos = to_screen_coordinates(end_x, end_y, screen_width, screen_height)
-
-                # Draw the arrow using the draw_arrow function
-                draw_arrow(
-                    surface=screen,
-                    start=start_pos,
-                    end=end_pos,
-                    color=(0, 0, 255),  # Blue color for the arrows
-                    )         
-
-
-def get_color(value, zmin=None, zmax=None, colormap=cm.viridis):
+        return Ex * numpy.cos(a) + Ey * numpy.sin(a)
+
+    def seeds(self, nlines=200, radius=5):
+        """Returns starting points around the charges and the direction to trace from each.
+
+        Lines start from the charges whose sign carries the larger total
+        charge, 'nlines' of them shared out in proportion to |q|.  Point
+        charges are seeded on a circle of 'radius', and line charges on both
+        sides of the segment at a distance 'radius'.  Returns an (n, 2) array
+        of points and an (n,) array of signs: +1 to follow the field, -1 to
+        go against it.
+        """
+        px, py, pq, x1, x2, lq = self.charges._pack()
+        q = numpy.concatenate([pq, lq])
+        positive, negative = q[q > 0].sum(), -q[q < 0].sum()
+        if positive == negative == 0:
+            return numpy.empty((0, 2)), numpy.empty(0)
+        sign = 1 if positive >= negative else -1
+        counts = numpy.where(sign * q > 0, numpy.maximum(1, numpy.rint(nlines * fabs(q) / max(positive, negative))), 0)
+        counts = counts.astype(int)
+
+        points = []
+        for cx, cy, n in zip(px, py, counts[:len(pq)]):
+            if n == 0:
+                continue
+            theta = (arange(n) + 0.5) * (2 * pi / n)
+            points.append(numpy.stack([cx + radius * cos(theta), cy + radius * sin(theta)], axis=-1))
+        for a, b, n in zip(x1, x2, counts[len(pq):]):
+            if n == 0:
+                continue
+            d = (b - a) / norm(b - a)
+            normal = array([-d[1], d[0]])
+            for side, k in ((1, (n + 1) // 2), (-1, n // 2)):
+                t = (arange(k) + 0.5) / k
+                points.append(a + t[:, newaxis] * (b - a) + side * radius * normal)
+        points = numpy.concatenate(points) if points else numpy.empty((0, 2))
+        return points, numpy.full(len(points), float(sign))
+
+    def trace(self, x0, signs, radius=5, tol=0.5, hmin=0.05, hmax=40, max_steps=2000, extent=None):
+        """Traces field lines from the points 'x0' all together.
+
+        Each line follows the field direction times its entry in 'signs',
+        parametrized by arc length and integrated with an adaptive
+        Bogacki-Shampine (RK23) stepper whose step size is kept per line.
+        A line stops when it comes within 0.8*'radius' of a charge, leaves
+        'extent' (xmin, xmax, ymin, ymax), by default the domain, by more
+        than 'radius', closes on itself, reaches a point where the field
+        vanishes, or after 'max_steps' steps.  'tol' is the local error
+        tolerance and 'hmin'/'hmax' bound the step size, all in world units.
+        Returns a list of (n, 2) arrays of points.
+        """
+        points = numpy.array(x0, dtype=float).reshape(-1, 2)
+        m = len(points)
+        track = numpy.empty((max_steps + 1, m, 2))
+        track[0] = points
+        count = numpy.ones(m, dtype=int)
+
+        # The state of the lines still being traced, which is compacted as lines stop
+        index = numpy.arange(m)
+        y, s = points.copy(), numpy.asarray(signs, dtype=float).copy()
+        h = numpy.full(m, float(min(hmax, radius)))
+        length = numpy.zeros(m)
+
+        # Only the lines in cells next to a charge are tested against the charges
+        px, py, pq, x1, x2, lq = self.charges._pack()
+        capture = 0.8 * radius
+        xmin, xmax, ymin, ymax = domain() if extent is None else extent
+        xmin, xmax, ymin, ymax = xmin - radius, xmax + radius, ymin - radius, ymax + radius
+        cell = max(capture, (xmax - xmin) / 1024, (ymax - ymin) / 1024)
+        shape = int((ymax - ymin) // cell) + 1, int((xmax - xmin) // cell) + 1
+        occupied = numpy.zeros(shape, dtype=bool)
+        x1_rows, x2_rows, _, line = self.charges._rows()
+        occupied.flat[charge_cells(x1_rows, x2_rows, line, (xmin, ymin), cell, shape, margin=2)[0]] = True
+
+        def direction(points, s):
+            Ex, Ey = self.vector(points[:, 0], points[:, 1])
+            scale = s / numpy.hypot(Ex, Ey)
+            return numpy.stack([Ex * scale, Ey * scale], axis=-1)
+
+        # Points where the field vanishes give NaN directions, which stop their lines
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            k1 = direction(y, s)
+            for _ in range(8 * max_steps):
+                if not len(index):
+                    break
+                step = h[:, newaxis]
+                k2 = direction(y + 0.5 * step * k1, s)
+                k3 = direction(y + 0.75 * step * k2, s)
+                y_new = y + step * (2 / 9 * k1 + 1 / 3 * k2 + 4 / 9 * k3)
+                k4 = direction(y_new, s)
+                error = step * (-5 / 72 * k1 + 1 / 12 * k2 + 1 / 9 * k3 - 1 / 8 * k4)
+                error = numpy.hypot(error[:, 0], error[:, 1])
+
+                # Accept the steps within tolerance, then adapt every step size
+                error[~numpy.isfinite(error)] = inf
+                accept = (error <= tol) | (h <= hmin)
+                factor = numpy.minimum(numpy.maximum(0.9 * (tol / error)**(1 / 3), 0.2), 5)
+                h = numpy.minimum(numpy.maximum(h * factor, hmin), hmax)
+                done = index[accept]
+                moved = y_new[accept]
+                track[count[done], done] = moved
+                count[done] += 1
+                length[accept] += numpy.hypot(*(moved - y[accept]).T)
+                y[accept], k1[accept] = moved, k4[accept]
+
+                # Termination: capture by a charge, leaving the domain, loop closure, step budget
+                u, v = y[:, 0], y[:, 1]
+                outside = (u < xmin) | (u > xmax) | (v < ymin) | (v > ymax)
+                near = occupied[numpy.minimum(numpy.maximum((v - ymin) // cell, 0), shape[0] - 1).astype(int),
+                                numpy.minimum(numpy.maximum((u - xmin) // cell, 0), shape[1] - 1).astype(int)]
+                if near.any():
+                    p = y[near]
+                    captured = numpy.zeros(len(p), dtype=bool)
+                    if len(pq):
+                        captured |= (((p[:, newaxis, 0] - px)**2 + (p[:, newaxis, 1] - py)**2) < capture**2).any(axis=1)
+                    if len(lq):
+                        captured |= (segment_distance(p[:, 0], p[:, 1], x1, x2) < capture).any(axis=1)
+                    near[near] = captured
+                closed = (length > 10 * radius) & (numpy.hypot(*(y - points[index]).T) < radius)
+                keep = ~(near | outside | closed | (count[index] > max_steps) | ~numpy.isfinite(k1).all(axis=1))
+                if not keep.all():
+                    index, y, s, h, length, k1 = (a[keep] for a in (index, y, s, h, length, k1))
+
+        return [track[:count[i], i].copy() for i in range(m)]
+
+    def lines(self, nlines=200, radius=5, **kwargs):
+        """Returns FieldLines seeded around the charges (see seeds and trace)."""
+        x0, signs = self.seeds(nlines, radius)
+        return [FieldLine(x) for x in self.trace(x0, signs, radius, **kwargs)]
+
+    def plot(self, screen, screen_width, screen_height, spacing=27, scale=15, sprites=True, extent=None):
+        """Plots the electric field vectors as arrows, scaled by magnitude.
+
+        With 'sprites' the arrows are stamped from pre-rasterized sprites
+        quantized by angle; otherwise each arrow is drawn as polygons.
+        'extent' is the (xmin, xmax, ymin, ymax) world rectangle drawn onto
+        the screen, by default the domain.
+        """
+        xmin, xmax, ymin, ymax = domain() if extent is None else extent
+        k = screen_width / (xmax - xmin)  # Pixels per world unit
+
+        # The lattice is aligned to multiples of its spacing, so that separately
+        # drawn tiles join up, and reaches past the edges for the arrows that
+        # cross them
+        step, margin = spacing / k, scale / k
+        x, y = meshgrid(arange(numpy.ceil((xmin - margin) / step), numpy.floor((xmax + margin) / step) + 1) * step,
+                        arange(numpy.ceil((ymin - margin) / step), numpy.floor((ymax + margin) / step) + 1) * step)
+
+        # Calculate the electric field vectors on the whole lattice at once.  Each
+        # extent (each tile) keeps its own sums, so dragging a charge only
+        # evaluates that charge on the lattices redrawn
+        grid = cached_grid(self._grids, (xmin, xmax, ymin, ymax, screen_width, spacing, scale),
+                           self.charges, 'E', self.GRIDS)
+        Ex, Ey = grid.evaluate(x, y)
+        magnitude = sqrt(Ex**2 + Ey**2)
+
+        # Skip invalid or zero-magnitude vectors
+        valid = (magnitude != 0) & numpy.isfinite(magnitude)
+        x, y, magnitude = x[valid], y[valid], magnitude[valid]
+
+        # Normalize the vectors for consistent arrow lengths
+        Ex, Ey = Ex[valid] / magnitude, Ey[valid] / magnitude
+
+        # Calculate start and end positions for the arrows (screen y points down)
+        sx, sy = (x - xmin) * k, (ymax - y) * k
+        starts = numpy.floor(numpy.stack([sx, sy], axis=-1)).astype(int)
+        color = (0, 0, 255)  # Blue color for the arrows
+        if sprites:
+            arrow_sprites(scale, color).stamp(screen, starts, numpy.stack([Ex, -Ey], axis=-1))
+        else:
+            ends = numpy.floor(numpy.stack([sx + Ex * scale, sy - Ey * scale], axis=-1)).astype(int)
+            draw_arrows(screen, starts, ends, color)
+
+
+def sample_grid(columns, rows, extent=None):
+    """Returns the (x, y) world coordinates of a columns x rows grid of samples.
+
+    The samples are at the centers of the cells dividing 'extent' (xmin,
+    xmax, ymin, ymax), by default the domain, with rows from ymin up.
+    """
+    xmin, xmax, ymin, ymax = domain() if extent is None else extent
+    x, y = numpy.meshgrid((xmin + (arange(columns) + 0.5) * (xmax - xmin) / columns).astype(DTYPE),
+                          (ymin + (arange(rows) + 0.5) * (ymax - ymin) / rows).astype(DTYPE), copy=False)
+    x.flags.writeable = y.flags.writeable = False
+    return x, y
+
+def get_colormap(colormap):
+    """Returns the Matplotlib colormap 'colormap', which may be given by name.
+
+    Matplotlib is only imported here, as it is slow to load.
+    """
+    if isinstance(colormap, str):
+        import matplotlib
+        return matplotlib.colormaps[colormap]
+    return colormap
+
+def get_color(value, zmin=None, zmax=None, colormap='viridis'):
     """
     Maps a value to a color using a Matplotlib colormap.
 
@@ -308,7 +1533,7 @@ def get_color(value, zmin=None, zmax=None, colormap=cm.viridis):
         value (float): The value to map to a color.
         zmin (float): The minimum value of the range (optional).
         zmax (float): The maximum value of the range (optional).
-        colormap: A Matplotlib colormap (default is 'viridis').
+        colormap: A Matplotlib colormap or its name (default is 'viridis').
 
     Returns:
         tuple: An RGB color tuple.
@@ -322,55 +1547,340 @@ def get_color(value, zmin=None, zmax=None, colormap=cm.viridis):
         normalized = value
 
     # Get the color from the colormap
-    rgba = colormap(normalized)  # Returns an RGBA tuple (values in [0, 1])
+    rgba = get_colormap(colormap)(normalized)  # Returns an RGBA tuple (values in [0, 1])
     rgb = (int(rgba[0] * 255), int(rgba[1] * 255), int(rgba[2] * 255))  # Convert to Pygame RGB format
     return rgb
 
+_COLORMAP_TABLES = {}
+
+def colormap_table(colormap, n=256):
+    """Returns the colors of 'colormap' (a colormap or its name) as an (n, 3) uint8 lookup table.
+
+    Tables are built once per (colormap name, n) and cached.  The 256 color
+    tables shipped in the colormaps module are used without Matplotlib.
+    """
+    name = colormap if isinstance(colormap, str) else colormap.name
+    key = (name, n)
+    if key not in _COLORMAP_TABLES:
+        table = colormaps.table(name) if n == 256 else None
+        if table is None:
+            rgba = get_colormap(colormap)(linspace(0, 1, n))
+            table = (rgba[:, :3] * 255).astype(numpy.uint8)
+        _COLORMAP_TABLES[key] = table
+    return _COLORMAP_TABLES[key]
+
+def get_colors(values, zmin=None, zmax=None, colormap='viridis', n=256):
+    """
+    Maps an array of values to colors, like get_color, through a lookup table.
+
+    Args:
+        values (ndarray): The values to map to colors.
+        zmin (float): The minimum value of the range (optional).
+        zmax (float): The maximum value of the range (optional).
+        colormap: A Matplotlib colormap or its name (default is 'viridis').
+        n (int): The number of entries in the lookup table.
+
+    Returns:
+        ndarray: A uint8 array of RGB colors with shape values.shape + (3,).
+    """
+    values = numpy.asarray(values, dtype=float)
+    if zmin is not None and zmax is not None:
+        # Normalize the values to the range [0, 1]
+        values = (values - zmin) / (zmax - zmin)
+    index = numpy.clip(numpy.nan_to_num(values * n), 0, n - 1).astype(numpy.intp)
+    return colormap_table(colormap, n)[index]
+
+def log_scale(z):
+    """Returns the potentials 'z' on the logarithmic scale of the heatmap colors."""
+    z_scaled = numpy.log10(numpy.abs(z) * 5e8 + 1e-10)  # Add a small offset to avoid log(0)
+    return numpy.nan_to_num(z_scaled, nan=0.0, posinf=0.0, neginf=0.0)  # Handle invalid values
+
+class HeatmapRefiner:
+    """A grid of potential samples filled in coarse to fine, as a quadtree.
+
+    The grid starts as BLOCK x BLOCK blocks of samples, evaluated at their
+    top-left samples.  Each step splits the blocks that look worst into
+    four, which costs evaluating three new top-left samples: blocks near a
+    charge go first, the rest by their area times the spread of the heatmap
+    scale across their siblings.  The samples not evaluated are interpolated
+    linearly between those that are, so once every block is a single sample
+    the grid is exactly the full evaluation.
+
+    With a 'tolerance', blocks away from the charges whose siblings spread
+    less than that in the heatmap scale are not split: smooth regions are
+    left to the interpolation, and the grid is done after far fewer
+    evaluations.  The singularities at the charges are still resolved down
+    to single samples.
+
+    While a charge is held (see ChargeSet.hold), follow() keeps the samples
+    up to date as it is dragged by replacing its contribution alone, so
+    that the refinement carries on rather than starting over.
+    """
+
+    BLOCK = 16  # The size of the coarse blocks in samples, a power of two
+    BATCH = 256  # The blocks split in the first step of each refine call
+    NEAR = 1e6  # The priority added to blocks near a charge
+
+    def __init__(self, charges, columns, rows, extent=None, tolerance=None):
+        """Initializes a columns x rows grid over 'extent' and evaluates its coarse blocks."""
+        self.charges = charges
+        self.revision = charges.revision  # The revision the samples belong to
+        self._rows = tuple(column.copy() for column in charges._rows())  # The charges of the samples
+        self.tolerance = tolerance
+        self.evaluations = 0  # The samples evaluated so far
+        self.shape = rows, columns
+        xmin, xmax, ymin, ymax = domain() if extent is None else extent
+        self._x = xmin + (arange(columns) + 0.5) * (xmax - xmin) / columns
+        self._y = ymin + (arange(rows) + 0.5) * (ymax - ymin) / rows
+
+        # The charges in (column, row) sample coordinates, for the nearness test
+        x1, x2 = self.charges._rows()[:2]
+        scale = array([columns / (xmax - xmin), rows / (ymax - ymin)])
+        origin = array([xmin, ymin])
+        x1, x2 = (x1 - origin) * scale - 0.5, (x2 - origin) * scale - 0.5
+        low, high = numpy.minimum(x1, x2), numpy.maximum(x1, x2)
+        inside = alltrue((high >= -self.BLOCK) & (low <= array([columns, rows]) + self.BLOCK), axis=1)
+        self._x1, self._x2 = x1[inside], x2[inside]  # Only those over the grid can be near a block
+
+        self._z = numpy.zeros(self.shape)
+        self._known = numpy.zeros(self.shape, dtype=bool)
+        r, c = (a.ravel() for a in numpy.meshgrid(arange(0, rows, self.BLOCK),
+                                                   arange(0, columns, self.BLOCK), indexing='ij'))
+        self._evaluate(r, c)
+
+        # The coarse blocks wait their turn by the largest step to a neighbor in the heatmap scale
+        coarse = log_scale(self._z[::self.BLOCK, ::self.BLOCK])
+        spread = numpy.zeros_like(coarse)
+        step = numpy.abs(numpy.diff(coarse, axis=0))
+        spread[1:], spread[:-1] = numpy.maximum(spread[1:], step), numpy.maximum(spread[:-1], step)
+        step = numpy.abs(numpy.diff(coarse, axis=1))
+        spread[:, 1:], spread[:, :-1] = numpy.maximum(spread[:, 1:], step), numpy.maximum(spread[:, :-1], step)
+        self._pending = self._prioritize(r, c, numpy.full(len(r), self.BLOCK), spread.ravel())
+
+    def done(self):
+        """Returns True once no block is left to split."""
+        return not len(self._pending[0])
+
+    def refine(self, budget):
+        """Splits blocks for about 'budget' seconds, at least one step, and returns done()."""
+        start = time.perf_counter()
+        count = self.BATCH if budget < inf else len(self._pending[0])  # Without a budget no order is needed
+        while not self.done():
+            self._step(count)
+            if time.perf_counter() - start >= budget:
+                break
+            count *= 2
+        return self.done()
+
+    def follow(self):
+        """Brings the samples up to date with the charges if only the held charge changed.
+
+        The held charge's old contribution at the evaluated samples is
+        replaced by its new one, which costs one charge per sample instead of
+        all of them.  The blocks keep their priorities from where the charge
+        was.  Returns False, leaving the samples as they were, if any other
+        charge changed.
+        """
+        charges = self.charges
+        rows = charges._rows()
+        if charges.held not in charges or len(rows[2]) != len(self._rows[2]):
+            return False
+        i = charges.held._index
+        others = numpy.arange(len(rows[2])) != i
+        if not all(numpy.array_equal(a[others], b[others]) for a, b in zip(rows, self._rows)):
+            return False
+        r, c = numpy.nonzero(self._known)
+        old, new = (superpose_columns('V', self._x[c], self._y[r], split_columns(*(column[[i]] for column in held)))[0]
+                    for held in (self._rows, rows))
+        self._z[r, c] += new - old
+        self._rows = tuple(column.copy() for column in rows)
+        self.revision = charges.revision
+        return True
+
+    def values(self):
+        """Returns the (rows, columns) potentials, interpolated where not evaluated."""
+        z = self._z[::self.BLOCK, ::self.BLOCK]
+        size = self.BLOCK // 2
+        while size:
+            # Each lattice twice as fine takes the samples evaluated on it, and
+            # the midpoints of the coarser one elsewhere
+            lattice, known = self._z[::size, ::size], self._known[::size, ::size]
+            for axis in (0, 1):
+                z = z.repeat(2, axis=axis)
+                inner = [slice(None), slice(None)]
+                inner[axis] = slice(1, -1, 2)
+                z[tuple(inner)] = (z[tuple(inner)] + numpy.roll(z, -1, axis=axis)[tuple(inner)]) / 2
+            z = where(known, lattice, z[:lattice.shape[0], :lattice.shape[1]])
+            size //= 2
+        return z
+
+    def _step(self, count):
+        """Splits the 'count' pending blocks with the highest priority."""
+        r, c, size, priority = self._pending
+        if count < len(r):
+            split = numpy.zeros(len(r), dtype=bool)
+            split[numpy.argpartition(-priority, count)[:count]] = True
+        else:
+            split = numpy.ones(len(r), dtype=bool)
+        keep = ~split
+        self._pending = tuple(a[keep] for a in self._pending)
+        r, c, size = r[split], c[split], size[split] // 2
+
+        # The four children of each block, as (n, 4) arrays, less those past the edges of the grid
+        r = r[:, newaxis] + array([0, 0, 1, 1]) * size[:, newaxis]
+        c = c[:, newaxis] + array([0, 1, 0, 1]) * size[:, newaxis]
+        size = numpy.repeat(size[:, newaxis], 4, axis=1)
+        inside = (r < self.shape[0]) & (c < self.shape[1])
+        new = inside.copy()
+        new[inside] = ~self._known[r[inside], c[inside]]
+        self._evaluate(r[new], c[new])
+
+        # The children that are still blocks wait their turn, by the spread of their siblings
+        scaled = log_scale(self._z[numpy.minimum(r, self.shape[0] - 1), numpy.minimum(c, self.shape[1] - 1)])
+        spread = where(inside, scaled, -inf).max(axis=1) - where(inside, scaled, inf).min(axis=1)
+        block = inside & (size > 1)
+        spread = numpy.broadcast_to(spread[:, newaxis], block.shape)
+        children = self._prioritize(r[block], c[block], size[block], spread[block])
+        self._pending = tuple(numpy.concatenate(pair) for pair in zip(self._pending, children))
+
+    def _evaluate(self, r, c):
+        """Evaluates the samples at rows 'r' and columns 'c'."""
+        if len(r):
+            self._z[r, c] = self.charges.V(self._x[c], self._y[r])
+            self._known[r, c] = True
+            self.evaluations += len(r)
+
+    def _prioritize(self, r, c, size, spread):
+        """Returns the blocks to split with their priorities: near a charge first, then spread times area."""
+        near = numpy.zeros(len(r), dtype=bool)
+        if len(self._x1) and len(r):
+            center = size / 2 - 0.5
+            near = segment_distance(c + center, r + center, self._x1, self._x2).min(axis=1) < size
+        if self.tolerance is not None:
+            split = near | (spread > self.tolerance)
+            r, c, size, spread, near = r[split], c[split], size[split], spread[split], near[split]
+        return r, c, size, spread * size**2 + self.NEAR * near
+
 class Potential:
     """The potential owing to a collection of charges."""
 
+    REFINERS = 32  # The most progressive heatmaps kept at once
+
     def __init__(self, charges):
         """Initializes the field given 'charges'."""
-        self.charges = charges
+        self.charges = as_charge_set(charges)
+        self.grid = GridSum(self.charges, 'V')  # The potential on the heatmap grid
+        self.contour_grid = GridSum(self.charges, 'V')  # The potential on the contour grid
+        self._contours = (None, None)  # The key and result of the last contours call
+        self._refiners = {}  # The progressive heatmaps by grid, see plot
+        self.table = None  # A FieldTable of the charges answering magnitude(), if set
 
     def magnitude(self, x, y):
         """Returns the magnitude of the potential at point (x, y)."""
-        return sum(charge.V(x, y) for charge in self.charges)
+        if self.table is not None:
+            return self.table.V(x, y)
+        return self.charges.V(x, y)
        
-    def plot(self, screen, screen_width, screen_height, resolution=100):
+    def plot(self, screen, screen_width, screen_height, resolution=100, extent=None, budget=None,
+             tolerance=None):
         """
         Plots the potential as a heatmap using pygame and a Matplotlib colormap.
-        """
-        # Create a grid of points
-        x, y = numpy.meshgrid(
-            numpy.linspace(XMIN / ZOOM + XOFFSET, XMAX / ZOOM + XOFFSET, resolution),
-            numpy.linspace(YMIN / ZOOM, YMAX / ZOOM, resolution)
-        )
-        z = numpy.zeros_like(x)
-
-        # Calculate the potential at each point
-        for i in range(x.shape[0]):
-            for j in range(x.shape[1]):
-                z[i, j] = self.magnitude(x[i, j], y[i, j])
 
-        # Apply logarithmic scaling to the potential values
-        z_scaled = numpy.log10(numpy.abs(z) * 5e8 + 1e-10)  # Add a small offset to avoid log(0)
-        z_scaled = numpy.nan_to_num(z_scaled, nan=0.0, posinf=0.0, neginf=0.0)  # Handle invalid values
+        'resolution' is the number of samples per axis, or a (columns, rows)
+        pair; None samples one point per screen pixel.  'extent' is the
+        (xmin, xmax, ymin, ymax) world rectangle drawn, by default the domain.
+
+        With a 'budget' in seconds the heatmap is drawn progressively (see
+        HeatmapRefiner): the first call draws it coarse, and each later call
+        with the same size and extent refines it for about 'budget' seconds,
+        starting over when the charges change, unless only a held charge
+        moved (see HeatmapRefiner.follow).  A 'tolerance' in the heatmap
+        scale (a color step is 1/256) samples adaptively instead of every
+        point, finishing in one call unless a budget is given.  Returns True
+        once the heatmap is complete.
+        """
+        if resolution is None:
+            resolution = (screen_width, screen_height)
+        columns, rows = (resolution, resolution) if numpy.isscalar(resolution) else resolution
 
-        # Create a surface for the heatmap
-        heatmap_surface = pygame.Surface((resolution, resolution))
+        if budget is None and tolerance is None:
+            # Create a grid of points and evaluate the potential on all of it at once
+            x, y = sample_grid(columns, rows, extent)
+            z, complete = self.grid.evaluate(x, y)[0], True
+        else:
+            z, complete = self._refine(columns, rows, extent, inf if budget is None else budget, tolerance)
 
-        # Draw the heatmap on the surface (flip the y-axis)
-        for i in range(x.shape[0]):
-            for j in range(x.shape[1]):
-                # Get the color for the current potential value (no normalization)
-                color = get_color(z_scaled[i, j], zmin=None, zmax=None, colormap=cm.plasma) 
+        # Apply logarithmic scaling to the potential values
+        z_scaled = log_scale(z)
 
-                # Set the pixel color on the heatmap surface (flip the y-axis)
-                heatmap_surface.set_at((j, resolution - 1 - i), color)  
+        # Map to colors (no normalization) and lay out as (x, y) pixels with the y-axis flipped
+        pixels = get_colors(z_scaled, colormap='plasma').transpose(1, 0, 2)[:, ::-1]
 
-        # Scale the heatmap surface to fit the screen
-        heatmap_surface = pygame.transform.scale(heatmap_surface, (screen_width, screen_height))
+        # Copy the pixels to a surface in one transfer and scale it to fit the screen
+        heatmap_surface = pygame.Surface((columns, rows))
+        pygame.surfarray.blit_array(heatmap_surface, pixels)
+        if (columns, rows) != (screen_width, screen_height):
+            heatmap_surface = pygame.transform.scale(heatmap_surface, (screen_width, screen_height))
 
         # Blit the heatmap surface onto the screen
-        screen.blit(heatmap_surface, (0, 0))       
+        screen.blit(heatmap_surface, (0, 0))
+        return complete
+
+    def _refine(self, columns, rows, extent, budget, tolerance):
+        """Returns the progressive heatmap samples of a grid and whether they are complete."""
+        key = (columns, rows, tuple(domain() if extent is None else extent), tolerance)
+        refiner = self._refiners.pop(key, None)
+        if refiner is not None and refiner.revision != self.charges.revision:
+            # A refiner following a dragged charge only refines once the charge rests
+            if not refiner.follow():
+                refiner = None
+            elif budget < inf:
+                budget = 0
+        if refiner is None:
+            refiner = HeatmapRefiner(self.charges, columns, rows, extent, tolerance)
+            if budget == inf:
+                refiner.refine(budget)
+        elif budget:
+            refiner.refine(budget)
+        self._refiners[key] = refiner  # Most recently used last
+        while len(self._refiners) > self.REFINERS:
+            del self._refiners[next(iter(self._refiners))]
+        return refiner.values(), refiner.done()
+
+    def contours(self, screen_width, screen_height, levels=20, resolution=None, extent=None):
+        """
+        Returns the equipotentials as (level, points) pairs, with the points
+        of each polyline in screen coordinates.
+
+        'levels' is a sequence of potentials, or the number of levels to
+        space automatically (see contour.auto_levels).  'resolution' and
+        'extent' are as for plot.  The lines are kept until the charges, the
+        viewport or the arguments change.
+        """
+        if resolution is None:
+            resolution = (screen_width, screen_height)
+        columns, rows = (resolution, resolution) if numpy.isscalar(resolution) else resolution
+        extent = domain() if extent is None else tuple(extent)
+        key = (self.charges.revision, extent, screen_width, screen_height, columns, rows,
+               levels if numpy.isscalar(levels) else tuple(levels))
+        if key == self._contours[0]:
+            return self._contours[1]
+
+        x, y = sample_grid(columns, rows, extent)
+        z = self.contour_grid.evaluate(x, y)[0]
+        if numpy.isscalar(levels):
+            levels = auto_levels(z, levels)
+
+        # Map grid (column, row) positions to the centers of the heatmap pixels
+        scale = numpy.array([screen_width / columns, -screen_height / rows])
+        offset = numpy.array([0.5 * screen_width / columns, screen_height * (1 - 0.5 / rows)])
+        lines = [(level, points * scale + offset) for level, points in marching_squares(z, levels)]
+        self._contours = (key, lines)
+        return lines
+
+    def plot_contours(self, screen, screen_width, screen_height, levels=20, resolution=None,
+                      color=(255, 255, 255), extent=None):
+        """Plots the equipotentials (see contours) as antialiased lines."""
+        for _, points in self.contours(screen_width, screen_height, levels, resolution, extent):
+            if len(points) > 1:
+                pygame.draw.aalines(screen, color, False, points.tolist())
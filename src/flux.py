@@ -0,0 +1,273 @@
+"""The flux of the field through closed curves, and the charge they enclose.
+
+The charges live in a plane and their fields fall off as 1/r**2, so the
+flux through a closed curve of the plane is not set by the charge inside
+it.  Gauss's law holds for the surface the curve sweeps along the axis
+normal to the plane, an infinite prism.  Its flux is the integral along
+the curve of the normal component of the field summed over that axis, the
+column field, which is 2q/r away from a point charge q at distance r, and
+it comes to 4 pi times the enclosed charge (Coulomb's constant is 1 in the
+kernels).
+
+flux() integrates the column field with Gauss-Legendre panels that are
+split where the estimate of their error is too large, a charge is closer
+than their length or a line charge crosses them; all the panels of a level are evaluated in one
+call of the kernels.  enclosed_charge() gives the exact answer from the
+geometry, to check it against.
+"""
+import numpy
+from numpy import newaxis, pi, sqrt
+
+from electrostatics import _line_frame, norm, segment_distance, split_columns, superpose
+
+ORDER = 8  # The Gauss-Legendre points per panel
+NODES, WEIGHTS = numpy.polynomial.legendre.leggauss(ORDER)
+TOLERANCE = 1e-6  # The default error of flux(), relative to 4 pi times the total charge
+MAX_LEVELS = 30  # The most times a panel is split
+NEAR = 1  # Panels closer to a point charge or line end than NEAR times their length are split
+
+#-----------------------------------------------------------------------------
+# Column field kernels (see electrostatics for the conventions)
+
+def _point_column(x, y, px, py, q):
+    """Column field owing to point charges 'q' at (px, py): 2q/r away from each."""
+    dx = x[:, newaxis] - px
+    dy = y[:, newaxis] - py
+    r_squared = dx**2 + dy**2
+    r_squared[r_squared == 0] = numpy.inf
+    s = 2 * q / r_squared
+    return (s * dx).sum(axis=1), (s * dy).sum(axis=1)
+
+def _line_column(x, y, x1, x2, q):
+    """Column field owing to line charges 'q' from x1 to x2.
+
+    With lam = q/L, the field is 2*lam*log(r1/r2) along the segment and
+    2*lam times the angle it subtends across it.  It is singular, and set
+    to zero, on the segment.
+    """
+    L, ux, uy, s, h, t, r1, r2 = _line_frame(x, y, x1, x2)  # pylint: disable=invalid-name
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        Epara = numpy.log(r1 / r2)
+        Eperp = numpy.arctan2(h * L, s * t + h * h)
+    singular = (r1 == 0) | (r2 == 0) | (h == 0) & (s * t <= 0)
+    Epara[singular] = 0
+    Eperp[singular] = 0
+    lam = 2 * q / L
+    return (Epara * ux - Eperp * uy) @ lam, (Epara * uy + Eperp * ux) @ lam
+
+def column_field(x, y, columns):
+    """Returns the column field at points (x, y) owing to charge columns (see split_columns)."""
+    px, py, pq, x1, x2, lq = columns
+    out = numpy.zeros((2, len(x)))
+    if len(pq):
+        superpose(_point_column, 2, x, y, px, py, pq, out=out)
+    if len(lq):
+        superpose(_line_column, 2, x, y, x1, x2, lq, out=out)
+    return out
+
+#-----------------------------------------------------------------------------
+# Curves
+#
+# A curve is parametrized by t over [0, end), with evaluate(t) giving the
+# points and outward normals scaled by the speed |dr/dt|, so that the flux
+# is the integral of F.n dt.  Panels never straddle a corner.
+
+class Circle:
+    """A circle of 'radius' about 'center'."""
+
+    def __init__(self, center, radius):
+        self.center = numpy.array(center, dtype=float)
+        self.radius = float(radius)
+        self.end = 1  # The end of the parameter range
+
+    def panels(self):
+        """Returns the (a, b) parameter bounds of the initial panels."""
+        edges = numpy.linspace(0, 1, 9)
+        return edges[:-1], edges[1:]
+
+    def evaluate(self, t):
+        """Returns the points (x, y) at parameters 't' and the scaled outward normals (nx, ny)."""
+        c, s = numpy.cos(2 * pi * t), numpy.sin(2 * pi * t)
+        speed = 2 * pi * self.radius
+        return self.center[0] + self.radius * c, self.center[1] + self.radius * s, speed * c, speed * s
+
+    def winding(self, x, y):
+        """Returns the number of times the curve winds around each point (x, y)."""
+        return ((x - self.center[0])**2 + (y - self.center[1])**2 < self.radius**2).astype(int)
+
+    def crossings(self, x1, x2):
+        """Returns the fractions along the segment x1 to x2 where it crosses the curve."""
+        d, a = x2 - x1, x1 - self.center
+        A, B, C = d @ d, 2 * a @ d, a @ a - self.radius**2  # pylint: disable=invalid-name
+        discriminant = B * B - 4 * A * C
+        if A == 0 or discriminant <= 0:
+            return numpy.empty(0)
+        roots = (-B + numpy.array([-1, 1]) * sqrt(discriminant)) / (2 * A)
+        return roots[(roots > 0) & (roots < 1)]
+
+    def moved(self, dx, dy):
+        """Returns the curve translated by (dx, dy)."""
+        return Circle(self.center + (dx, dy), self.radius)
+
+    def outline(self, n=96):
+        """Returns an (n, 2) array of points along the curve, for drawing."""
+        x, y, _, _ = self.evaluate(numpy.arange(n) / n)
+        return numpy.column_stack([x, y])
+
+
+class Polygon:
+    """A closed polygon through 'vertices', an (n, 2) array; edge i runs from vertex i to i + 1.
+
+    The vertices are put in counterclockwise order.  A polygon may cross
+    itself, as freehand curves do (see freehand), and then encloses each
+    charge as many times as it winds around it.
+    """
+
+    def __init__(self, vertices):
+        vertices = numpy.array(vertices, dtype=float).reshape(-1, 2)
+        if len(vertices) > 1 and numpy.array_equal(vertices[0], vertices[-1]):
+            vertices = vertices[:-1]
+        x, y = vertices.T
+        area = (x * numpy.roll(y, -1) - numpy.roll(x, -1) * y).sum() / 2
+        if len(vertices) < 3 or area == 0:
+            raise ValueError('a polygon needs three vertices and an area')
+        self.vertices = vertices if area > 0 else vertices[::-1].copy()
+        self.end = len(vertices)  # The end of the parameter range
+
+    def panels(self):
+        """Returns the (a, b) parameter bounds of the initial panels, one per edge."""
+        edges = numpy.arange(self.end + 1, dtype=float)
+        return edges[:-1], edges[1:]
+
+    def evaluate(self, t):
+        """Returns the points (x, y) at parameters 't' and the scaled outward normals (nx, ny)."""
+        i = numpy.clip(numpy.floor(t).astype(int), 0, self.end - 1)
+        start = self.vertices[i]
+        d = self.vertices[(i + 1) % self.end] - start
+        u = t - i
+        return start[:, 0] + u * d[:, 0], start[:, 1] + u * d[:, 1], d[:, 1], -d[:, 0]
+
+    def winding(self, x, y):
+        """Returns the number of times the curve winds around each point (x, y)."""
+        x, y = numpy.asarray(x, dtype=float)[..., newaxis], numpy.asarray(y, dtype=float)[..., newaxis]
+        (ax, ay), (bx, by) = self.vertices.T, numpy.roll(self.vertices, -1, axis=0).T
+        left = (bx - ax) * (y - ay) - (x - ax) * (by - ay)
+        up = (ay <= y) & (by > y) & (left > 0)
+        down = (ay > y) & (by <= y) & (left < 0)
+        return (up.sum(axis=-1) - down.sum(axis=-1))
+
+    def crossings(self, x1, x2):
+        """Returns the fractions along the segment x1 to x2 where it crosses the curve."""
+        a, b = self.vertices, numpy.roll(self.vertices, -1, axis=0)
+        d, e = x2 - x1, b - a
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            denominator = d[0] * e[:, 1] - d[1] * e[:, 0]
+            w = a - x1
+            s = (w[:, 0] * e[:, 1] - w[:, 1] * e[:, 0]) / denominator
+            u = (w[:, 0] * d[1] - w[:, 1] * d[0]) / denominator
+        return s[(denominator != 0) & (s > 0) & (s < 1) & (u >= 0) & (u <= 1)]
+
+    def moved(self, dx, dy):
+        """Returns the curve translated by (dx, dy)."""
+        return Polygon(self.vertices + (dx, dy))
+
+    def outline(self):
+        """Returns an (n, 2) array of points along the curve, for drawing."""
+        return self.vertices
+
+
+def freehand(points, spacing=2):
+    """Returns the Polygon closing a path of (x, y) points, dropping points within 'spacing' of the last kept."""
+    points = numpy.asarray(points, dtype=float).reshape(-1, 2)
+    kept = [points[0]] if len(points) else []
+    for point in points[1:]:
+        if numpy.hypot(*(point - kept[-1])) >= spacing:
+            kept.append(point)
+    return Polygon(kept)
+
+#-----------------------------------------------------------------------------
+# Integration
+
+def flux(charges, curve, tolerance=None):
+    """Returns the flux of the field of 'charges' through the prism over 'curve' (see the module).
+
+    Returns (flux, error, evaluations): the error is an estimate, within
+    'tolerance' unless a charge lies on the curve, by default TOLERANCE
+    times 4 pi times the sum of the absolute charges.
+    """
+    x1, x2, q, line = charges._rows()
+    columns = split_columns(x1, x2, q, line)
+    ends = numpy.concatenate([x1, x2[line]])  # The points where the column field is singular
+    # The jump in the normal column field across each line charge
+    segments = (x1[line], x2[line], 4 * pi * numpy.abs(q[line]) / norm(x2[line] - x1[line]))
+    if tolerance is None:
+        tolerance = TOLERANCE * 4 * pi * numpy.abs(q).sum()
+    a, b = curve.panels()
+    estimate, evaluations = _panels(curve, columns, a, b), ORDER * len(a)
+    total = error = 0.0
+    for level in range(MAX_LEVELS + 1):
+        # Each panel's estimate is checked against the sum over its halves
+        m = (a + b) / 2
+        halves = _panels(curve, columns, numpy.concatenate([a, m]), numpy.concatenate([m, b]))
+        evaluations += 2 * ORDER * len(a)
+        refined = halves[:len(a)] + halves[len(a):]
+        difference = numpy.abs(refined - estimate)
+        if level == MAX_LEVELS:
+            split = numpy.zeros(len(a), dtype=bool)
+        else:
+            split = _near(curve, ends, segments, a, b, tolerance)
+            if error + difference.sum() > tolerance:
+                split |= difference > tolerance * (b - a) / curve.end
+        done = ~split
+        total += refined[done].sum()
+        error += difference[done].sum()
+        if not split.any():
+            break
+        n = len(split)
+        estimate = numpy.concatenate([halves[:n][split], halves[n:][split]])
+        a, m, b = a[split], m[split], b[split]
+        a, b = numpy.concatenate([a, m]), numpy.concatenate([m, b])
+    return float(total), float(error), evaluations
+
+def _panels(curve, columns, a, b):
+    """Returns the Gauss-Legendre estimates of the flux through the panels (a, b) of 'curve'."""
+    half = (b - a) / 2
+    t = ((a + b) / 2)[:, newaxis] + half[:, newaxis] * NODES
+    x, y, nx, ny = curve.evaluate(t.ravel())
+    Fx, Fy = column_field(x, y, columns)  # pylint: disable=invalid-name
+    return ((Fx * nx + Fy * ny).reshape(t.shape) @ WEIGHTS) * half
+
+def _near(curve, points, segments, a, b, tolerance):
+    """Returns whether each panel (a, b) of 'curve' needs splitting to resolve a singularity.
+
+    That is a panel whose middle is closer to one of 'points' than NEAR
+    times its chord, or closer than its chord to a line charge of
+    'segments' (x1, x2, jump) whose jump is not yet small enough over it.
+    The error estimates cannot be trusted there: near a point the field
+    peaks between the Gauss-Legendre points, and at a jump the estimates
+    of a panel and of its halves may be wrong by the same amount.
+    """
+    x, y, _, _ = curve.evaluate(numpy.concatenate([a, b, (a + b) / 2]))
+    x, y = x.reshape(3, -1), y.reshape(3, -1)
+    chord = numpy.hypot(x[1] - x[0], y[1] - y[0])
+    near = numpy.zeros(len(a), dtype=bool)
+    if len(points):
+        near |= segment_distance(x[2], y[2], points, points).min(axis=1) < NEAR * chord
+    x1, x2, jump = segments
+    if len(jump):
+        crossing = segment_distance(x[2], y[2], x1, x2) < chord[:, newaxis]
+        near |= (crossing & (jump * chord[:, newaxis] > tolerance / (2 * len(jump)))).any(axis=1)
+    return near
+
+def enclosed_charge(charges, curve):
+    """Returns the charge enclosed by 'curve', counted as many times as the curve winds around it.
+
+    A line charge counts for the share of its length inside the curve.
+    """
+    x1, x2, q, line = charges._rows()
+    total = (curve.winding(x1[~line, 0], x1[~line, 1]) * q[~line]).sum()
+    for start, end, charge in zip(x1[line], x2[line], q[line]):
+        s = numpy.concatenate([[0], numpy.sort(curve.crossings(start, end)), [1]])
+        middle = start + ((s[:-1] + s[1:]) / 2)[:, newaxis] * (end - start)
+        total += charge * (curve.winding(middle[:, 0], middle[:, 1]) * numpy.diff(s)).sum()
+    return float(total)
@@ -0,0 +1,111 @@
+"""Numba-compiled charge kernels, parallel over the evaluation points.
+
+These mirror the NumPy kernels in electrostatics (same arguments, same
+results) but loop over the charges for each point instead of broadcasting,
+so they make no (n, k) temporaries.  Results come in the precision of the
+points, though each point's sum is kept in double precision.  They release
+the GIL, so that they can run on a background thread alongside the UI.
+Importing this module raises ImportError when numba is not installed.
+"""
+import os
+import numpy
+from numba import config, njit, prange
+from math import sqrt, log
+
+# The kernels run on the renderer's worker thread as well as the main one.  The
+# OpenMP layer is safe for that; TBB, which numba prefers, keeps the process
+# from exiting once a kernel has run off the main thread.
+if 'NUMBA_THREADING_LAYER' not in os.environ and 'NUMBA_THREADING_LAYER_PRIORITY' not in os.environ:
+    config.THREADING_LAYER_PRIORITY = ['omp', 'tbb', 'workqueue']
+
+@njit(parallel=True, cache=True, nogil=True)
+def _point_E(x, y, px, py, q):  # pylint: disable=invalid-name
+    """Field owing to point charges 'q' at (px, py)."""
+    Ex, Ey = numpy.zeros(len(x), x.dtype), numpy.zeros(len(x), x.dtype)
+    for i in prange(len(x)):
+        ex = ey = 0.0
+        for j in range(len(q)):
+            dx, dy = x[i] - px[j], y[i] - py[j]
+            r_squared = dx * dx + dy * dy
+            if r_squared > 0:
+                s = q[j] / (r_squared * sqrt(r_squared))
+                ex += s * dx
+                ey += s * dy
+        Ex[i], Ey[i] = ex, ey
+    return Ex, Ey
+
+@njit(parallel=True, cache=True, nogil=True)
+def _point_V(x, y, px, py, q):  # pylint: disable=invalid-name
+    """Potential owing to point charges 'q' at (px, py)."""
+    V = numpy.zeros(len(x), x.dtype)
+    for i in prange(len(x)):
+        v = 0.0
+        for j in range(len(q)):
+            r = sqrt((x[i] - px[j])**2 + (y[i] - py[j])**2)
+            if r > 0:
+                v += q[j] / r
+        V[i] = v
+    return (V,)
+
+@njit(parallel=True, cache=True, nogil=True)
+def _line_E(x, y, x1, x2, q):  # pylint: disable=invalid-name
+    """Field owing to line charges 'q' from x1 to x2 (see electrostatics._line_E)."""
+    Ex, Ey = numpy.zeros(len(x), x.dtype), numpy.zeros(len(x), x.dtype)
+    for i in prange(len(x)):
+        ex = ey = 0.0
+        for j in range(len(q)):
+            dx, dy = x2[j, 0] - x1[j, 0], x2[j, 1] - x1[j, 1]
+            L = sqrt(dx * dx + dy * dy)  # pylint: disable=invalid-name
+            ux, uy = dx / L, dy / L
+            ax, ay = x[i] - x1[j, 0], y[i] - x1[j, 1]
+            s = ax * ux + ay * uy
+            h = ay * ux - ax * uy
+            t = s - L
+            r1 = sqrt(s * s + h * h)
+            r2 = sqrt(t * t + h * h)
+            if r1 == 0 or r2 == 0:
+                continue
+            if s * t > 0:
+                F = h * L * (s + t) / (s * r2 + t * r1)
+            elif h != 0:
+                F = (s * r2 - t * r1) / h
+            else:
+                F = 0.0
+            inv = q[j] / L / (r1 * r2)
+            Epara, Eperp = inv * (r1 - r2), inv * F
+            ex += Epara * ux - Eperp * uy
+            ey += Epara * uy + Eperp * ux
+        Ex[i], Ey[i] = ex, ey
+    return Ex, Ey
+
+@njit(parallel=True, cache=True, nogil=True)
+def _line_V(x, y, x1, x2, q):  # pylint: disable=invalid-name
+    """Potential owing to line charges 'q' from x1 to x2 (see electrostatics._line_V)."""
+    V = numpy.zeros(len(x), x.dtype)
+    for i in prange(len(x)):
+        v = 0.0
+        for j in range(len(q)):
+            dx, dy = x2[j, 0] - x1[j, 0], x2[j, 1] - x1[j, 1]
+            L = sqrt(dx * dx + dy * dy)  # pylint: disable=invalid-name
+            ax, ay = x[i] - x1[j, 0], y[i] - x1[j, 1]
+            s = (ax * dx + ay * dy) / L
+            h = (ay * dx - ax * dy) / L
+            t = s - L
+            r1 = sqrt(s * s + h * h)
+            r2 = sqrt(t * t + h * h)
+            gap = (h * h / (r1 + s) if s > 0 else r1 - s) + (h * h / (r2 - t) if t < 0 else r2 + t)
+            if gap > 0:
+                v += q[j] / L * log((r1 + r2 + L) / gap)
+        V[i] = v
+    return (V,)
+
+KERNELS = {  # The number of components and the point and line kernels of each quantity
+    'E': (2, _point_E, _line_E),
+    'V': (1, _point_V, _line_V),
+}
+
+# Starting the threads costs more than a single point's sum over a few charges
+SERIAL_KERNELS = {  # The kernels compiled to run on the calling thread alone, for single points
+    quantity: (ncomp,) + tuple(njit(cache=True, nogil=True)(kernel.py_func) for kernel in pair)
+    for quantity, (ncomp, *pair) in KERNELS.items()
+}
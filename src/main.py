@@ -1,7 +1,18 @@
+import math
+import os
+import threading
+import time
 import pygame
 import numpy  # Add this import
-from numpy import array, sqrt
-from electrostatics import PointCharge, LineCharge, ElectricField, Potential, init 
+from numpy import array, pi, sqrt
+import electrostatics
+from electrostatics import PointCharge, LineCharge, ChargeSet, ElectricField, FieldTable, Potential, init, viewport
+from electrostatics import domain, set_view, to_screen, to_world
+from scene import load_scene, columns_from_dicts
+from recording import Recorder, Replay
+from flux import Circle, Polygon, enclosed_charge, flux, freehand
+import profiler
+from tiles import TileCache, compose, level_zoom, render_tile, tile_origin
 
 # Constants
 SCREEN_WIDTH = 800
@@ -11,10 +22,18 @@ BLACK = (0, 0, 0)
 BUTTON_COLOR = (0, 128, 255)
 BUTTON_TEXT_COLOR = (255, 255, 255)
 SIDEBAR_COLOR = (100, 100, 100)
+TRANSPARENT = (255, 0, 255)  # The color key of layers drawn over others
+PICK_RADIUS = 25  # How close a click, in pixels, must be to a charge to pick it
+MIN_ZOOM_LEVEL, MAX_ZOOM_LEVEL = -12, 16  # The zoom levels reachable with the mouse wheel (see tiles)
+PROFILER_KEY = pygame.K_F3  # Shows or hides the profiler overlay, timing the frames while shown
+TRACE_KEY = pygame.K_F4  # Saves the profiler's trace to a file
+PROFILER_REFRESH = 10  # The frames between updates of the profiler overlay
 
 # Initialization Functions
 def initialize_screen():
-    pygame.init()
+    # Only the modules used are initialized: the others, audio in particular, are slow to start
+    pygame.display.init()
+    pygame.font.init()
     screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
     pygame.display.set_caption("Electric Field and Potential Simulation")
     return screen
@@ -49,7 +68,27 @@ def initialize_buttons():
         },
         "plot": {
             "text": button_font.render("Mostrar Potencial", True, BUTTON_TEXT_COLOR),
+            "texts": (button_font.render("Mostrar Potencial", True, BUTTON_TEXT_COLOR),
+                      button_font.render("Mostrar Campo", True, BUTTON_TEXT_COLOR)),
             "rect": pygame.Rect(10, 300, 230, 30)
+        },
+        "contours": {
+            "text": button_font.render("Mostrar Equipotenciais", True, BUTTON_TEXT_COLOR),
+            "texts": (button_font.render("Mostrar Equipotenciais", True, BUTTON_TEXT_COLOR),
+                      button_font.render("Ocultar Equipotenciais", True, BUTTON_TEXT_COLOR)),
+            "rect": pygame.Rect(10, 350, 230, 30)
+        },
+        "gauss": {
+            "text": button_font.render("Superfície: nenhuma", True, BUTTON_TEXT_COLOR),
+            "texts": tuple(button_font.render("Superfície: " + name, True, BUTTON_TEXT_COLOR)
+                           for name in ("nenhuma", "círculo", "polígono", "livre")),
+            "rect": pygame.Rect(10, 400, 230, 30)
+        },
+        "lines": {
+            "text": button_font.render("Mostrar Linhas de Campo", True, BUTTON_TEXT_COLOR),
+            "texts": (button_font.render("Mostrar Linhas de Campo", True, BUTTON_TEXT_COLOR),
+                      button_font.render("Ocultar Linhas de Campo", True, BUTTON_TEXT_COLOR)),
+            "rect": pygame.Rect(10, 450, 230, 30)
         }
     }
     return buttons
@@ -61,7 +100,291 @@ def initialize_menu_icon():
     return menu_icon_text, menu_icon_rect
 
 
-def handle_mouse_down(event, charges, buttons, menu_icon_rect, sidebar_visible, remove_mode, plot_mode, offset_x, offset_y):
+class InfoBox:
+    """The readout of the field and potential under the mouse, with its minimize button."""
+
+    def __init__(self, button_rect):
+        self.button_rect = button_rect
+        self.font = pygame.font.Font(None, 18)
+        button_font = pygame.font.Font(None, 24)
+        self.button_texts = {minimized: button_font.render('+' if minimized else '-', True, (255, 255, 255))
+                             for minimized in (False, True)}
+
+    BOX_WIDTH, BOX_HEIGHT = 200, 100
+    GAP = 10  # Between the box and the button
+
+    def rect(self, minimized):
+        """Returns the screen area of the box and the button, or of the button alone when minimized."""
+        box_x = 0 if minimized else self.BOX_WIDTH + self.GAP
+        return pygame.Rect(self.button_rect.x - box_x, self.button_rect.y,
+                           box_x + self.button_rect.width, self.BOX_HEIGHT if not minimized else self.button_rect.height)
+
+    def render(self, lines, minimized):
+        """Returns a surface with the box showing 'lines' and the button, and its position.
+
+        A minimized box shows only the button, and 'lines' may be None.
+        """
+        box_width = self.BOX_WIDTH
+        box_height = self.BOX_HEIGHT
+        box_x = 0 if minimized else box_width + self.GAP
+        surface = pygame.Surface((box_x + self.button_rect.width, box_height))
+        surface.fill(TRANSPARENT)
+        surface.set_colorkey(TRANSPARENT)
+
+        button_rect = pygame.Rect((box_x, 0), self.button_rect.size)
+        pygame.draw.rect(surface, (100, 100, 100), button_rect)
+        button_text = self.button_texts[minimized]
+        surface.blit(button_text, button_text.get_rect(center=button_rect.center))
+
+        if not minimized:
+            pygame.draw.rect(surface, (200, 200, 200), (0, 0, box_width, box_height))
+            pygame.draw.rect(surface, (0, 0, 0), (0, 0, box_width, box_height), 2)
+            y_offset = 10
+            for line in lines:
+                surface.blit(self.font.render(line, True, (0, 0, 0)), (10, y_offset))
+                y_offset += 20
+        return surface, (self.button_rect.x - box_x, self.button_rect.y)
+
+
+class GaussTool:
+    """A closed curve drawn over the charges, with the flux through it and the charge it encloses.
+
+    In each mode but the first (see MODES), dragging empty space draws a
+    circle out from its center or a freehand curve, and clicks place the
+    vertices of a polygon, closed by clicking its first vertex again or
+    with the right button.  Dragging inside the curve moves it, and Escape
+    removes it.  The flux is computed again whenever the curve or the
+    charges change (see flux).
+    """
+
+    MODES = (None, "circle", "polygon", "freehand")
+    COLOR = (255, 140, 0)
+    BOX_RECT = pygame.Rect(SCREEN_WIDTH - 240, 120, 230, 70)  # The flux readout, below the info box
+
+    def __init__(self):
+        self.mode = 0
+        self.curve = None
+        self.path = []  # The world points of the curve being drawn
+        self.moving = None  # The world point and curve a move started from
+        self.version = 0  # Bumped whenever the curve or the path changes
+        self.font = pygame.font.Font(None, 18)
+        self._readout = (None, None)  # The (key, lines) of the last flux computed
+
+    def next_mode(self):
+        """Switches to the next mode, dropping the curve."""
+        self.mode = (self.mode + 1) % len(self.MODES)
+        self.clear()
+
+    def clear(self):
+        """Removes the curve."""
+        self.curve, self.path, self.moving = None, [], None
+        self.version += 1
+
+    def press(self, world, button):
+        """Starts drawing or moving the curve at 'world', returning False when the tool is off."""
+        kind = self.MODES[self.mode]
+        if kind is None:
+            return False
+        if kind == "polygon" and self.path:
+            first = self.path[0]
+            if button == 3 or len(self.path) >= 3 and \
+                    math.hypot(world[0] - first[0], world[1] - first[1]) * electrostatics.ZOOM < PICK_RADIUS:
+                self._close()
+            else:
+                self.path.append(world)
+        elif self.curve is not None and self.curve.winding(*world):
+            self.moving = (world, self.curve)
+        elif button == 1:
+            self.path = [world]
+        self.version += 1
+        return True
+
+    def move(self, world):
+        """Moves the curve, or the end of the curve being drawn, to 'world'."""
+        kind = self.MODES[self.mode]
+        if self.moving:
+            start, curve = self.moving
+            self.curve = curve.moved(world[0] - start[0], world[1] - start[1])
+        elif self.path and kind == "circle":
+            radius = math.hypot(world[0] - self.path[0][0], world[1] - self.path[0][1])
+            if radius:
+                self.curve = Circle(self.path[0], radius)
+        elif self.path and kind == "freehand":
+            self.path.append(world)
+        else:
+            return
+        self.version += 1
+
+    def release(self):
+        """Ends a move, a circle or a freehand curve."""
+        kind = self.MODES[self.mode]
+        self.moving = None
+        if kind == "freehand" and self.path:
+            self._close()
+        elif kind == "circle":
+            self.path = []
+        self.version += 1
+
+    def _close(self):
+        """Makes the path drawn the curve, unless it encloses nothing."""
+        try:
+            if self.MODES[self.mode] == "freehand":
+                self.curve = freehand(self.path, spacing=2 / electrostatics.ZOOM)
+            else:
+                self.curve = Polygon(self.path)
+        except ValueError:
+            pass
+        self.path = []
+
+    def readout(self, charges):
+        """Returns the lines of the flux readout, computed once per curve and revision of the charges."""
+        key = (self.curve, charges.revision)
+        if self._readout[0] != key:
+            total, error, _ = flux(charges, self.curve)
+            self._readout = (key, [
+                f"Flux: {total:.4e}",
+                f"Q inside (flux/4pi): {total / (4 * pi):.4e} C",
+                f"Q inside (exact): {enclosed_charge(charges, self.curve):.4e} C",
+            ])
+        return self._readout[1]
+
+    def render(self, charges):
+        """Returns the curve, the path being drawn and the flux readout over a transparent layer surface."""
+        if self.curve is None and not self.path:
+            return None
+        surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
+        for points, closed in ((self.curve and self.curve.outline(), True), (self.path, False)):
+            if points is not None and len(points) > 1:
+                x, y = to_screen(*numpy.transpose(points), SCREEN_WIDTH, SCREEN_HEIGHT)
+                pygame.draw.lines(surface, self.COLOR, closed, numpy.column_stack([x, y]).tolist(), 2)
+        if self.curve is not None:
+            pygame.draw.rect(surface, (200, 200, 200), self.BOX_RECT)
+            pygame.draw.rect(surface, self.COLOR, self.BOX_RECT, 2)
+            for i, line in enumerate(self.readout(charges)):
+                surface.blit(self.font.render(line, True, BLACK), (self.BOX_RECT.x + 10, self.BOX_RECT.y + 10 + 18 * i))
+        return surface, (0, 0)
+
+
+class Compositor:
+    """Draws cached layers onto the screen, updating only the areas that changed.
+
+    Each frame the caller lists its layers in drawing order as (name, key,
+    render).  A layer is re-rendered, by calling render(), only when its key
+    changes; render() returns the layer's surface and position, or None when
+    the layer is hidden.  The old and new extents of changed layers are
+    recomposed from all the layers and sent to the display, which is never
+    flipped as a whole.
+    """
+
+    def __init__(self, screen):
+        self.screen = screen
+        self._layers = {}  # The (key, surface, position, extent) of each layer by name
+
+    def compose(self, layers):
+        """Draws 'layers' and updates the display, returning the dirty rectangles."""
+        dirty = []
+        current = {}
+        for name, key, render in layers:
+            old = self._layers.pop(name, None)
+            if old is not None and old[0] == key:
+                current[name] = old
+                continue
+            with profiler.phase("draw " + name):
+                rendered = render()
+            if rendered is None:
+                current[name] = (key, None, None, None)
+            else:
+                surface, position = rendered
+                current[name] = (key, surface, position, surface.get_bounding_rect().move(position))
+                dirty.append(current[name][3])
+            if old is not None and old[3] is not None:
+                dirty.append(old[3])
+        dirty.extend(old[3] for old in self._layers.values() if old[3] is not None)
+        self._layers = current
+
+        dirty = [rect.clip(self.screen.get_rect()) for rect in dirty]
+        dirty = [rect for rect in dirty if rect.width and rect.height]
+        if not dirty:
+            return dirty
+        for rect in dirty:
+            self.screen.set_clip(rect)
+            for _, surface, position, _ in current.values():
+                if surface is not None:
+                    self.screen.blit(surface, position)
+        self.screen.set_clip(None)
+        with profiler.phase("display update"):
+            pygame.display.update(dirty)
+        return dirty
+
+
+class BackgroundRenderer:
+    """Renders tiles and overlays on a worker thread into a TileCache.
+
+    The UI thread asks for the jobs its view is missing, as (key, render)
+    pairs, together with a snapshot of the charges, and keeps showing what
+    the cache has meanwhile.  Each request replaces the jobs not yet
+    started, so work for views or scene revisions that are gone is dropped.
+    render(field, potential) returns the surface to store under key and
+    whether it is complete; an incomplete one is shown meanwhile and its
+    job goes to the back of the queue to be refined.  The worker renders
+    from its own copy of the charges, with its own ElectricField and
+    Potential.
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+        self._pending = None  # The (snapshot, jobs) not done yet
+        self._busy = False  # Whether the worker is rendering a job
+        self._closed = False
+        self._condition = threading.Condition()
+        self._charges = ChargeSet()
+        self._field = ElectricField(self._charges)
+        self._potential = Potential(self._charges)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def request(self, charges, jobs):
+        """Replaces the pending jobs with 'jobs', to be rendered from the current 'charges'."""
+        with self._condition:
+            self._pending = (charges.snapshot(), list(jobs))
+            self._condition.notify_all()
+
+    def wait_idle(self):
+        """Waits until the worker has rendered every job requested, for timing whole frames."""
+        with self._condition:
+            self._condition.wait_for(lambda: self._closed or not (self._busy or self._pending and self._pending[1]))
+
+    def close(self):
+        """Drops the pending jobs and waits for the worker to finish its current one."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._closed and not (self._pending and self._pending[1]):
+                    self._condition.wait()
+                if self._closed:
+                    return
+                snapshot, jobs = self._pending
+                key, render = jobs.pop(0)
+                self._busy = True
+            complete = self.cache.complete(key)
+            if not complete:
+                self._charges.restore(snapshot)
+                with profiler.phase("worker " + str(key[0])):
+                    surface, complete = render(self._field, self._potential)
+                self.cache.put(key, surface, complete)
+            with self._condition:
+                if not complete and self._pending is not None and self._pending[1] is jobs:
+                    jobs.append((key, render))
+                self._busy = False
+                self._condition.notify_all()
+
+
+def handle_mouse_down(event, charges, buttons, menu_icon_rect, sidebar_visible, remove_mode, plot_mode, contour_mode, lines_mode, offset_x, offset_y, gauss=None):
     mouse_x, mouse_y = event.pos
     dragging_charge = None
     dragging_line_point = None
@@ -72,85 +395,56 @@ def handle_mouse_down(event, charges, buttons, menu_icon_rect, sidebar_visible,
 
     
     if sidebar_visible:
+        # New charges are placed at the center of the view
+        center = array(to_world(SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2, SCREEN_WIDTH, SCREEN_HEIGHT))
         if buttons["positive"]["rect"].collidepoint(mouse_x, mouse_y):
-            charges.append(PointCharge(0, 0, 1e-6))
+            charges.append(PointCharge(center[0], center[1], 1e-6))
             remove_mode = False
         elif buttons["negative"]["rect"].collidepoint(mouse_x, mouse_y):
-            charges.append(PointCharge(0, 0, -1e-6))
+            charges.append(PointCharge(center[0], center[1], -1e-6))
             remove_mode = False
         elif buttons["line_positive"]["rect"].collidepoint(mouse_x, mouse_y):
-            charges.append(LineCharge(1e-6, array([-100, -50]), array([100, 50])))
+            charges.append(LineCharge(1e-6, center + array([-100, -50]), center + array([100, 50])))
             remove_mode = False
         elif buttons["line_negative"]["rect"].collidepoint(mouse_x, mouse_y):
-            charges.append(LineCharge(-1e-6, array([-100, 50]), array([100, -50])))
+            charges.append(LineCharge(-1e-6, center + array([-100, 50]), center + array([100, -50])))
             remove_mode = False
         elif buttons["remove"]["rect"].collidepoint(mouse_x, mouse_y):
             remove_mode = not remove_mode
         elif buttons["plot"]["rect"].collidepoint(mouse_x, mouse_y):
             plot_mode = not plot_mode
-            button_font = pygame.font.Font(None, 24)
-            new_text = "Mostrar Campo" if plot_mode else "Mostrar Potencial"
-            buttons["plot"]["text"] = button_font.render(new_text, True, BUTTON_TEXT_COLOR)
+            buttons["plot"]["text"] = buttons["plot"]["texts"][plot_mode]
+        elif buttons["contours"]["rect"].collidepoint(mouse_x, mouse_y):
+            contour_mode = not contour_mode
+            buttons["contours"]["text"] = buttons["contours"]["texts"][contour_mode]
+        elif buttons["lines"]["rect"].collidepoint(mouse_x, mouse_y):
+            lines_mode = not lines_mode
+            buttons["lines"]["text"] = buttons["lines"]["texts"][lines_mode]
+        elif gauss is not None and buttons["gauss"]["rect"].collidepoint(mouse_x, mouse_y):
+            gauss.next_mode()
+            buttons["gauss"]["text"] = buttons["gauss"]["texts"][gauss.mode]
             
-    if remove_mode:
-        # Iterate over a copy to avoid issues during removal
-        for charge in charges.copy():
-            if isinstance(charge, PointCharge):
-                charge_screen_x = charge.x + SCREEN_WIDTH // 2
-                charge_screen_y = -charge.y + SCREEN_HEIGHT // 2
-                dx = mouse_x - charge_screen_x
-                dy = mouse_y - charge_screen_y
-                if dx**2 + dy**2 < 25**2:
-                    charges.remove(charge)
-                    return sidebar_visible, remove_mode, plot_mode, None, None, offset_x, offset_y
-                    
-            elif isinstance(charge, LineCharge):
-                start_screen_x = charge.x1[0] + SCREEN_WIDTH // 2
-                start_screen_y = -charge.x1[1] + SCREEN_HEIGHT // 2
-                end_screen_x = charge.x2[0] + SCREEN_WIDTH // 2
-                end_screen_y = -charge.x2[1] + SCREEN_HEIGHT // 2
-
-                start_dist_sq = (mouse_x - start_screen_x)**2 + (mouse_y - start_screen_y)**2
-                end_dist_sq = (mouse_x - end_screen_x)**2 + (mouse_y - end_screen_y)**2
-
-                if start_dist_sq < 25**2 or end_dist_sq < 25**2:
-                    charges.remove(charge)
-                    return sidebar_visible, remove_mode, plot_mode, None, None, offset_x, offset_y
+    # Find the nearest charge handle (a point charge or a line end point) under the mouse
+    math_x, math_y = to_world(mouse_x, mouse_y, SCREEN_WIDTH, SCREEN_HEIGHT)
+    handle = charges.handles.nearest(math_x, math_y, PICK_RADIUS / electrostatics.ZOOM)
+
+    if remove_mode and handle:
+        charges.remove(handle[0])
+        return sidebar_visible, remove_mode, plot_mode, contour_mode, lines_mode, None, None, offset_x, offset_y
 
     # Check for charge dragging
-    for charge in charges:
-        if isinstance(charge, PointCharge):
-            charge_screen_x = charge.x + SCREEN_WIDTH // 2
-            charge_screen_y = -charge.y + SCREEN_HEIGHT // 2
-            if (mouse_x - charge_screen_x)**2 + (mouse_y - charge_screen_y)**2 < 25**2:
-                dragging_charge = charge
-                offset_x = mouse_x - charge_screen_x
-                offset_y = mouse_y - charge_screen_y
-                break
-        elif isinstance(charge, LineCharge):
-            start_screen_x, start_screen_y = charge.x1[0] + SCREEN_WIDTH // 2, -charge.x1[1] + SCREEN_HEIGHT // 2
-            end_screen_x, end_screen_y = charge.x2[0] + SCREEN_WIDTH // 2, -charge.x2[1] + SCREEN_HEIGHT // 2
-
-            if (mouse_x - start_screen_x)**2 + (mouse_y - start_screen_y)**2 < 25**2:
-                dragging_charge = charge
-                dragging_line_point = "start"
-                offset_x = mouse_x - start_screen_x
-                offset_y = mouse_y - start_screen_y
-                break
-            elif (mouse_x - end_screen_x)**2 + (mouse_y - end_screen_y)**2 < 25**2:
-                dragging_charge = charge
-                dragging_line_point = "end"
-                offset_x = mouse_x - end_screen_x
-                offset_y = mouse_y - end_screen_y
-                break
-
-    return sidebar_visible, remove_mode, plot_mode, dragging_charge, dragging_line_point, offset_x, offset_y
+    if handle:
+        dragging_charge, dragging_line_point = handle
+        handle_x, handle_y = charges.handle_position(handle)
+        offset_x = math_x - handle_x
+        offset_y = math_y - handle_y
+
+    return sidebar_visible, remove_mode, plot_mode, contour_mode, lines_mode, dragging_charge, dragging_line_point, offset_x, offset_y
 
 def handle_mouse_motion(event, dragging_charge, dragging_line_point, offset_x, offset_y):
     if dragging_charge:
         mouse_x, mouse_y = event.pos
-        math_x = mouse_x - SCREEN_WIDTH // 2
-        math_y = -(mouse_y - SCREEN_HEIGHT // 2)
+        math_x, math_y = to_world(mouse_x, mouse_y, SCREEN_WIDTH, SCREEN_HEIGHT)
 
         if isinstance(dragging_charge, PointCharge):
             dragging_charge.x = math_x - offset_x
@@ -168,22 +462,141 @@ def render_sidebar(screen, sidebar_rect, buttons, remove_mode):
     if remove_mode:
         pygame.draw.rect(screen, (255, 0, 0), buttons["remove"]["rect"], 2)
 
+def sidebar_layer(sidebar_rect, buttons, remove_mode):
+    """Returns the sidebar as a layer surface and its position."""
+    surface = pygame.Surface(sidebar_rect.size)
+    render_sidebar(surface, sidebar_rect.move(-sidebar_rect.x, -sidebar_rect.y), buttons, remove_mode)
+    return surface, sidebar_rect.topleft
+
+def charges_layer(charges):
+    """Returns the charges drawn over a transparent layer surface, and its position."""
+    surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+    surface.fill(TRANSPARENT)
+    surface.set_colorkey(TRANSPARENT)
+    charges.plot(surface, SCREEN_WIDTH, SCREEN_HEIGHT)
+    return surface, (0, 0)
+
+def info_lines(field, potential, world_x, world_y):
+    """Returns the info box text for the field and potential at (world_x, world_y)."""
+    Ex, Ey = field.vector(world_x, world_y)
+    if isinstance(Ex, numpy.ndarray):
+        Ex = Ex.item()
+    if isinstance(Ey, numpy.ndarray):
+        Ey = Ey.item()
+    E_mag = sqrt(Ex**2 + Ey**2)
+    V_val = potential.magnitude(world_x, world_y)
+    return [
+        f"E: ({Ex:.2e}, {Ey:.2e}) N/C",
+        f"|E|: {E_mag:.2e} N/C",
+        f"V: {V_val:.2e} V"
+    ]
+
+def profiler_layer(font):
+    """Returns a surface with the rolling per-frame timings and counts of the profiler, and its position."""
+    frame, times, counts = profiler.averages()
+    lines = ["frame %.1f ms (%.0f fps)" % (1e3 * frame, 1 / frame if frame else 0)]
+    lines += ["%s %.2f ms" % (name, 1e3 * seconds)
+              for name, seconds in sorted(times.items(), key=lambda item: -item[1])]
+    lines += ["%s %.3g" % item for item in counts.items()]
+    texts = [font.render(line, True, WHITE) for line in lines]
+    surface = pygame.Surface((max(text.get_width() for text in texts) + 20, 18 * len(texts) + 10), pygame.SRCALPHA)
+    surface.fill((0, 0, 0, 170))
+    for i, text in enumerate(texts):
+        surface.blit(text, (10, 5 + 18 * i))
+    return surface, (SCREEN_WIDTH - surface.get_width() - 10, SCREEN_HEIGHT - surface.get_height() - 10)
+
+def save_trace(path=None):
+    """Saves the profiler's trace, by default to a new file named by the time, returning the path."""
+    path = path or time.strftime("trace_%Y%m%d_%H%M%S.json")
+    profiler.export_trace(path)
+    return path
+
+def render_contours(potential, extent, color):
+    """Returns the equipotentials of 'extent' drawn over a transparent screen-sized surface."""
+    # Transparent pixels of the line color keep the antialiased edges free of fringes
+    surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
+    surface.fill(color + (0,))
+    potential.plot_contours(surface, SCREEN_WIDTH, SCREEN_HEIGHT, color=color, extent=extent)
+    return surface
+
+def render_field_lines(field, extent):
+    """Returns the field lines of 'extent' drawn over a transparent screen-sized surface."""
+    surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
+    surface.fill(BLACK + (0,))
+    # The lines are traced to the same number of pixels at every zoom
+    pixel = (extent[1] - extent[0]) / SCREEN_WIDTH
+    for line in field.lines(radius=5 * pixel, tol=0.5 * pixel, hmin=0.05 * pixel, hmax=40 * pixel, extent=extent):
+        line.plot(surface, SCREEN_WIDTH, SCREEN_HEIGHT, extent=extent)
+    return surface
+
+def overlay_position(overlay, zoom_level, xoffset, yoffset):
+    """Returns where to draw an (surface, (zoom level, xoffset, yoffset)) overlay in the current view.
+
+    An overlay drawn for another position at this zoom is shifted into
+    place; one drawn at another zoom is not drawn, and None is returned.
+    """
+    if overlay is None or overlay[1][0] != zoom_level:
+        return None
+    zoom = level_zoom(zoom_level)
+    return round((overlay[1][1] - xoffset) * zoom), round((yoffset - overlay[1][2]) * zoom)
+
+def set_zoom_level(level, xoffset, yoffset):
+    """Sets the view to zoom 'level' centered at (xoffset, yoffset), returning the offsets used.
+
+    The offsets are rounded so that the tiles of the level fall on whole pixels.
+    """
+    zoom = level_zoom(level)
+    ox, oy = tile_origin(level, xoffset, yoffset, SCREEN_WIDTH, SCREEN_HEIGHT)
+    xoffset, yoffset = (SCREEN_WIDTH / 2 - ox) / zoom, (oy - SCREEN_HEIGHT / 2) / zoom
+    set_view(zoom, xoffset, yoffset)
+    return xoffset, yoffset
+
+def warm_up():
+    """Loads the kernels and tables a simulation uses, so that main() draws its first frame quickly.
+
+    Compiled kernels are loaded on first call, so each one is called once
+    on a tiny scene.
+    """
+    init(SCREEN_WIDTH, SCREEN_HEIGHT, zoom=1, xoffset=0)
+    charges = ChargeSet.from_arrays(*columns_from_dicts([
+        {"type": "point", "x": 0, "y": 0, "q": 1e-6},
+        {"type": "line", "q": 1e-6, "start": [-10, 10], "end": [10, 10]},
+    ]))
+    charges.E(1.0, 1.0), charges.V(1.0, 1.0)
+    surface = pygame.Surface((4, 4))
+    Potential(charges).plot(surface, 4, 4, resolution=2)
+
 # Main Function
-def main(initial_charges=None):
+def main(initial_charges=None, recorder=None, replay=None, field_table=False):
+    """Runs the simulation.
+
+    A 'recorder' (see recording.Recorder) records the session's input; a
+    'replay' (see recording.Replay) takes the place of the live input and
+    the initial charges, and runs its frames without waiting.  With
+    'field_table' the readouts are interpolated from a FieldTable, which
+    pays off in scenes of many charges.
+    """
     screen = initialize_screen()
     clock = pygame.time.Clock()
     init(SCREEN_WIDTH, SCREEN_HEIGHT, zoom=1, xoffset=0)
 
-    charges = []
-    if initial_charges:
-        for charge_data in initial_charges:
-            if charge_data["type"] == "point":
-                charges.append(PointCharge(charge_data["x"], charge_data["y"], charge_data["q"]))
-            elif charge_data["type"] == "line":
-                charges.append(LineCharge(charge_data["q"], charge_data["start"], charge_data["end"]))
+    # The initial charges may be a scene file path or a list of charge dicts
+    if replay is not None:
+        initial_charges = replay.charges
+    if isinstance(initial_charges, str):
+        charges = load_scene(initial_charges)
+    elif initial_charges:
+        charges = ChargeSet.from_arrays(*columns_from_dicts(initial_charges))
+    else:
+        charges = ChargeSet()
 
     field = ElectricField(charges)
     potential = Potential(charges)
+    if field_table:
+        field.table = potential.table = FieldTable(charges)
+    tile_cache = TileCache()
+    background = BackgroundRenderer(tile_cache)
+    compositor = Compositor(screen)
     sidebar_rect = initialize_sidebar()
     buttons = initialize_buttons()
     menu_icon_text, menu_icon_rect = initialize_menu_icon()
@@ -194,88 +607,181 @@ def main(initial_charges=None):
     sidebar_visible = True
     remove_mode = False
     plot_mode = False
+    contour_mode = False
+    lines_mode = False
     info_box_minimized = False
     minimize_button_rect = pygame.Rect(SCREEN_WIDTH - 30, 10, 20, 20)
+    info_box = InfoBox(minimize_button_rect)
+    gauss = GaussTool()
+
+    # The view: the zoom level and the world point at the center of the screen
+    zoom_level, xoffset, yoffset = 0, 0, 0
+    panning = None  # The mouse position and offsets where a pan started
+    background_key = background_surface = None
+    contours = None  # The last equipotentials drawn, and the view they were drawn for
+    field_lines = None  # The last field lines drawn, and the view they were drawn for
+
+    # The profiler overlay; ELECTROSTATICS_TRACE names a trace file to time the whole run into
+    trace_path = os.environ.get("ELECTROSTATICS_TRACE")
+    profiler.enable(bool(trace_path))
+    profiler_visible = False
+    profiler_font = pygame.font.Font(None, 20)
+    frame = 0
+    if recorder is not None:
+        recorder.start(charges)
 
     running = True
     while running:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                sidebar_visible, remove_mode, plot_mode, dragging_charge, dragging_line_point, offset_x, offset_y = handle_mouse_down(
-                    event, charges, buttons, menu_icon_rect, sidebar_visible, remove_mode, plot_mode, offset_x, offset_y
-                )
-                if minimize_button_rect.collidepoint(event.pos):
-                    info_box_minimized = not info_box_minimized
-
-            if event.type == pygame.MOUSEMOTION:
-                handle_mouse_motion(event, dragging_charge, dragging_line_point, offset_x, offset_y)
-
-            if event.type == pygame.MOUSEBUTTONUP:
-                dragging_charge = None
-                dragging_line_point = None
-
-        screen.fill(WHITE)
-
-        if plot_mode:
-            potential.plot(screen, SCREEN_WIDTH, SCREEN_HEIGHT)
-        else:
-            field.plot(screen, SCREEN_WIDTH, SCREEN_HEIGHT)
-
-        for charge in charges:
-            charge.plot(screen, SCREEN_WIDTH, SCREEN_HEIGHT)
+        with profiler.phase("events"):
+            events = pygame.event.get()
+            if replay is not None:
+                events = replay.events()  # The live input is dropped
+            if recorder is not None:
+                recorder.record(events, pygame.mouse.get_pos() if replay is None else replay.mouse)
+            for event in events:
+                if event.type == pygame.QUIT:
+                    running = False
+
+                if event.type == pygame.KEYDOWN and event.key == PROFILER_KEY:
+                    profiler_visible = not profiler_visible
+                    profiler.enable(profiler_visible or bool(trace_path))
+                if event.type == pygame.KEYDOWN and event.key == TRACE_KEY and profiler.ENABLED:
+                    print("Trace saved to", save_trace())
+
+                # The mouse wheel also sends buttons 4 and 5, which are left to MOUSEWHEEL
+                if event.type in (pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP) and event.button in (4, 5):
+                    continue
+
+                if event.type == pygame.MOUSEBUTTONDOWN:
+                    on_ui = (menu_icon_rect.collidepoint(event.pos) or info_box.rect(info_box_minimized).collidepoint(event.pos)
+                             or sidebar_visible and sidebar_rect.collidepoint(event.pos))
+                    sidebar_visible, remove_mode, plot_mode, contour_mode, lines_mode, dragging_charge, dragging_line_point, offset_x, offset_y = handle_mouse_down(
+                        event, charges, buttons, menu_icon_rect, sidebar_visible, remove_mode, plot_mode, contour_mode, lines_mode, offset_x, offset_y, gauss
+                    )
+                    charges.hold(dragging_charge)
+                    if minimize_button_rect.collidepoint(event.pos):
+                        info_box_minimized = not info_box_minimized
+                    # Dragging empty space draws or moves the Gaussian surface, if on, or pans the view
+                    if dragging_charge is None and not on_ui and not remove_mode \
+                            and not gauss.press(to_world(*event.pos, SCREEN_WIDTH, SCREEN_HEIGHT), event.button):
+                        panning = (event.pos, xoffset, yoffset)
+
+                if event.type == pygame.MOUSEMOTION:
+                    handle_mouse_motion(event, dragging_charge, dragging_line_point, offset_x, offset_y)
+                    if dragging_charge is None:
+                        gauss.move(to_world(*event.pos, SCREEN_WIDTH, SCREEN_HEIGHT))
+                    if panning:
+                        (start_x, start_y), start_xoffset, start_yoffset = panning
+                        zoom = level_zoom(zoom_level)
+                        xoffset, yoffset = set_zoom_level(zoom_level, start_xoffset - (event.pos[0] - start_x) / zoom,
+                                                          start_yoffset + (event.pos[1] - start_y) / zoom)
+
+                if event.type == pygame.MOUSEBUTTONUP:
+                    dragging_charge = None
+                    dragging_line_point = None
+                    panning = None
+                    charges.hold(None)
+                    gauss.release()
+
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+                    gauss.clear()
+
+                # The mouse wheel zooms about the point under the cursor
+                if event.type == pygame.MOUSEWHEEL and not panning:
+                    level = max(MIN_ZOOM_LEVEL, min(MAX_ZOOM_LEVEL, zoom_level + event.y))
+                    if level != zoom_level:
+                        mouse_x, mouse_y = pygame.mouse.get_pos() if replay is None else replay.mouse
+                        world_x, world_y = to_world(mouse_x, mouse_y, SCREEN_WIDTH, SCREEN_HEIGHT)
+                        zoom = level_zoom(level)
+                        zoom_level = level
+                        xoffset, yoffset = set_zoom_level(level, world_x - (mouse_x - SCREEN_WIDTH / 2) / zoom,
+                                                          world_y + (mouse_y - SCREEN_HEIGHT / 2) / zoom)
+
+        # The field or potential is drawn from tiles rendered in the background;
+        # tiles not rendered yet are stood in for by older or coarser ones
+        with profiler.phase("background"):
+            mode = "potential" if plot_mode else "field"
+            if (mode, viewport(), charges.revision, contour_mode, lines_mode, tile_cache.version) != background_key:
+                background_key = (mode, viewport(), charges.revision, contour_mode, lines_mode, tile_cache.version)
+                background_surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+                missing, incomplete = compose(background_surface, tile_cache, mode, zoom_level, charges.revision,
+                                              xoffset, yoffset)
+                jobs = [(key, lambda field, potential, key=key: render_tile(field, potential, *key.tile))
+                        for key in missing]
+                if contour_mode:
+                    contour_key = ("contours", charges.revision, viewport(), mode)
+                    if contour_key in tile_cache:
+                        contours = (tile_cache.get(contour_key), (zoom_level, xoffset, yoffset))
+                    else:
+                        color = WHITE if plot_mode else BLACK
+                        jobs.append((contour_key, lambda field, potential, extent=domain(), color=color:
+                                     (render_contours(potential, extent, color), True)))
+                if lines_mode:
+                    lines_key = ("lines", charges.revision, viewport())
+                    if lines_key in tile_cache:
+                        field_lines = (tile_cache.get(lines_key), (zoom_level, xoffset, yoffset))
+                    else:
+                        jobs.append((lines_key, lambda field, potential, extent=domain():
+                                     (render_field_lines(field, extent), True)))
+                # The whole view shows up coarse, with its equipotentials, before any of it is refined
+                jobs += [(key, lambda field, potential, key=key: render_tile(field, potential, *key.tile))
+                         for key in incomplete]
+                background.request(charges, jobs)
+
+        # Equipotentials and field lines drawn for another position at this zoom are shifted into place
+        contour_position = overlay_position(contours, zoom_level, xoffset, yoffset) if contour_mode else None
+        lines_position = overlay_position(field_lines, zoom_level, xoffset, yoffset) if lines_mode else None
 
         # Calculate mouse position in world coordinates
-        mouse_x, mouse_y = pygame.mouse.get_pos()
-        world_x = mouse_x - SCREEN_WIDTH // 2
-        world_y = SCREEN_HEIGHT // 2 - mouse_y
-
-        # Calculate electric field and potential
-        Ex, Ey = field.vector(world_x, world_y)
-        if isinstance(Ex, numpy.ndarray):
-            Ex = Ex.item()
-        if isinstance(Ey, numpy.ndarray):
-            Ey = Ey.item()
-        E_mag = sqrt(Ex**2 + Ey**2)
-        V_val = potential.magnitude(world_x, world_y)
-
-        # Draw info box and minimize button
-        pygame.draw.rect(screen, (100, 100, 100), minimize_button_rect)
-        button_font = pygame.font.Font(None, 24)
-        button_text = '-' if not info_box_minimized else '+'
-        button_text_surface = button_font.render(button_text, True, (255, 255, 255))
-        text_rect = button_text_surface.get_rect(center=minimize_button_rect.center)
-        screen.blit(button_text_surface, text_rect)
-
-        if not info_box_minimized:
-            box_width = 200
-            box_height = 100
-            box_x = minimize_button_rect.left - box_width - 10
-            box_y = 10
-            pygame.draw.rect(screen, (200, 200, 200), (box_x, box_y, box_width, box_height))
-            pygame.draw.rect(screen, (0, 0, 0), (box_x, box_y, box_width, box_height), 2)
-            font = pygame.font.Font(None, 18)
-            lines = [
-                f"E: ({Ex:.2e}, {Ey:.2e}) N/C",
-                f"|E|: {E_mag:.2e} N/C",
-                f"V: {V_val:.2e} V"
-            ]
-            y_offset = box_y + 10
-            for line in lines:
-                text_surface = font.render(line, True, (0, 0, 0))
-                screen.blit(text_surface, (box_x + 10, y_offset))
-                y_offset += 20
-
-        if sidebar_visible:
-            render_sidebar(screen, sidebar_rect, buttons, remove_mode)
-
-        screen.blit(menu_icon_text, (menu_icon_rect.x, menu_icon_rect.y))
-        pygame.display.flip()
-        clock.tick(60)
-
+        mouse_x, mouse_y = pygame.mouse.get_pos() if replay is None else replay.mouse
+        world_x, world_y = to_world(mouse_x, mouse_y, SCREEN_WIDTH, SCREEN_HEIGHT)
+
+        # Each layer is redrawn only when its key changes, and only the areas
+        # that changed reach the display
+        compositor.compose([
+            ("background", background_key, lambda: (background_surface, (0, 0))),
+            ("contours", (id(contours), contour_position),
+             lambda: None if contour_position is None else (contours[0], contour_position)),
+            ("lines", (id(field_lines), lines_position),
+             lambda: None if lines_position is None else (field_lines[0], lines_position)),
+            ("gauss", (gauss.version, gauss.curve is not None and charges.revision, viewport()),
+             lambda: gauss.render(charges)),
+            ("charges", (charges.revision, viewport()), lambda: charges_layer(charges)),
+            ("info", (True,) if info_box_minimized else (False, charges.revision, world_x, world_y),
+             lambda: info_box.render(None if info_box_minimized else info_lines(field, potential, world_x, world_y),
+                                     info_box_minimized)),
+            ("sidebar", (sidebar_visible, remove_mode, plot_mode, contour_mode, lines_mode, gauss.mode),
+             lambda: sidebar_layer(sidebar_rect, buttons, remove_mode) if sidebar_visible else None),
+            ("menu icon", None, lambda: (menu_icon_text, menu_icon_rect.topleft)),
+            ("profiler", (profiler_visible, profiler_visible and frame // PROFILER_REFRESH),
+             lambda: profiler_layer(profiler_font) if profiler_visible else None),
+        ])
+        profiler.end_frame()
+        frame += 1
+        if replay is None:
+            clock.tick(60)
+
+    background.close()
+    if recorder is not None:
+        recorder.save(charges)
+    if replay is not None:
+        replay.finish(charges)
+    if trace_path:
+        print("Trace saved to", save_trace(trace_path))
+    profiler.enable(False)
     pygame.quit()
 
 if __name__ == "__main__":
-    main()
+    import argparse
+    parser = argparse.ArgumentParser(description="Electric field and potential simulation.")
+    parser.add_argument("scene", nargs="?", help="the scene file to open")
+    parser.add_argument("--record", metavar="FILE", help="record the session's input to FILE (.json or .json.gz)")
+    parser.add_argument("--replay", metavar="FILE", help="replay a recorded session, as fast as possible")
+    parser.add_argument("--field-table", action="store_true",
+                        help="interpolate the readouts from a table of the field, for scenes of many charges")
+    args = parser.parse_args()
+    replay = Replay(args.replay) if args.replay else None
+    main(args.scene, Recorder(args.record) if args.record else None, replay, args.field_table)
+    if replay is not None:
+        print("%d frames in %.2f s, %s" % (len(replay.times), sum(replay.times),
+                                           "reproduced" if replay.reproduced else "NOT reproduced"))
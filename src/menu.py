@@ -1,5 +1,6 @@
 import pygame
-from multiprocessing import Process
+from multiprocessing import Pipe, Process
+from scene import list_scenes
 
 # Constantes usadas
 SCREEN_WIDTH = 800
@@ -9,14 +10,30 @@ BLACK = (0, 0, 0)
 BUTTON_COLOR = (0, 128, 255)
 BUTTON_TEXT_COLOR = (255, 255, 255)
 SCROLL_SPEED = 20
+SCENES_DIR = "scenes"  # Diretório com os arquivos de cena listados no menu
+PREWARM = True  # Mantém um processo de simulação já carregado esperando a próxima cena
 
-# Função para executar a simulação em um processo separado
-def run_simulation(charges=None):
+# Função para executar a simulação em um processo separado (scene é o caminho de um arquivo de cena)
+def run_simulation(scene=None):
     from main import main as main_simulation
-    main_simulation(charges)
+    main_simulation(scene)
+
+# Processo de simulação pré-aquecido: carrega os módulos e os kernels antes do clique,
+# avisa que está pronto e espera pela cena a abrir ((scene,), ou None para sair)
+def simulation_worker(connection):
+    from main import main as main_simulation, warm_up
+    warm_up()
+    try:
+        connection.send("pronto")
+        message = connection.recv()
+    except (EOFError, OSError):  # O menu foi fechado
+        return
+    connection.close()
+    if message is not None:
+        main_simulation(message[0])
 
 class Menu:
-    def __init__(self):
+    def __init__(self, prewarm=PREWARM):
         pygame.init()
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption("Menu - Simulação de Campos Elétricos")
@@ -38,17 +55,26 @@ class Menu:
         self.scroll_y = 0
         self.total_height = len(self.buttons) * 60 + 150
 
-    # Função para criar os botões com seus textos e ações
+        # Processo de simulação pré-aquecido
+        self.prewarm = prewarm
+        self.worker = None  # A ponta do menu do pipe com o processo
+        self.worker_process = None
+        self.worker_ready = False  # Se o processo já avisou que está pronto
+        self.pending = None  # A cena ((scene,)) clicada antes do processo ficar pronto
+        if self.prewarm:
+            self.start_worker()
+
+    # Função para criar os botões com seus textos e ações, um para cada cena do diretório de cenas
     def create_buttons(self):
-        return [
-            {"text": "Projeto em Branco", "action": self.projeto_em_branco},
-            {"text": "Exemplo: Dipolo", "action": self.exemplo_dipolo},
-            {"text": "Exemplo: Monopolo Falso", "action": self.exemplo_monopolo_falso},
-            {"text": "Exemplo: Linha e Ponto", "action": self.exemplo_linha_ponto},
-            {"text": "Exemplo: Duas Linhas", "action": self.exemplo_duas_linhas},
-            {"text": "Exemplo: Quadrupolo", "action": self.exemplo_quadrupolo},
-            {"text": "Sair", "action": self.exit_program}
+        cenas = [
+            {"text": name, "action": lambda path=path: self.abrir_cena(path)}
+            for name, path in list_scenes(SCENES_DIR)
         ]
+        return (
+            [{"text": "Projeto em Branco", "action": self.projeto_em_branco}]
+            + cenas
+            + [{"text": "Sair", "action": self.exit_program}]
+        )
 
     # Função para desenhar os botões na tela
     def draw_buttons(self):
@@ -76,55 +102,54 @@ class Menu:
                 self.scroll_y -= event.y * SCROLL_SPEED
                 self.scroll_y = max(0, min(self.scroll_y, self.total_height - SCREEN_HEIGHT))
 
-    # Funções de exemplo e ações associadas aos botões
+    # Inicia um novo processo de simulação pré-aquecido
+    def start_worker(self):
+        self.worker, child = Pipe()
+        self.worker_process = Process(target=simulation_worker, args=(child,))
+        self.worker_process.start()
+        child.close()
+        self.worker_ready = False
+
+    # Abre a simulação no processo pré-aquecido. A cena fica pendente até o aviso de pronto,
+    # verificado a cada quadro por poll_worker, para que o menu não trave esperando
+    def launch(self, scene=None):
+        if not self.prewarm:
+            Process(target=run_simulation, args=(scene,)).start()
+            return
+        self.pending = (scene,)
+        self.poll_worker()
+
+    # Entrega a cena pendente se o processo pré-aquecido já está pronto, e prepara outro para o
+    # próximo clique (a menos que o menu esteja fechando); se o processo morreu, a cena é aberta
+    # num processo novo. Com wait, espera o aviso de pronto em vez de só verificar
+    def poll_worker(self, wait=False):
+        if self.pending is None:
+            return
+        try:
+            if not self.worker_ready and (wait or self.worker.poll()):
+                self.worker.recv()  # "pronto"
+                self.worker_ready = True
+            if not self.worker_ready:
+                if self.worker_process.is_alive():
+                    return
+                raise EOFError  # Morreu sem avisar
+            self.worker.send(self.pending)
+        except (EOFError, OSError):
+            Process(target=run_simulation, args=self.pending).start()
+        self.pending = None
+        self.worker.close()
+        self.worker = None
+        if self.running:
+            self.start_worker()
+
+    # Funções associadas aos botões
     def projeto_em_branco(self):
         print("Abrindo projeto em branco...")
-        Process(target=run_simulation).start()
-
-    def exemplo_dipolo(self):
-        print("Abrindo exemplo: Dipolo...")
-        charges = [
-            {"type": "point", "x": -80, "y": 0, "q": 1e-6},
-            {"type": "point", "x": 80, "y": 0, "q": -1e-6}
-        ]
-        Process(target=run_simulation, args=(charges,)).start()
-
-    def exemplo_monopolo_falso(self):
-        print("Abrindo exemplo: Monopolo Falso...")
-        charges = [
-            {"type": "point", "x": -160, "y": 0, "q": 1e-6},
-            {"type": "point", "x": 160, "y": 0, "q": 1e-6},
-            {"type": "point", "x": 0, "y": -160, "q": 1e-6},
-            {"type": "point", "x": 0, "y": 160, "q": 1e-6},
-            {"type": "point", "x": 0, "y": 0, "q": -4e-6}
-        ]
-        Process(target=run_simulation, args=(charges,)).start()
+        self.launch()
 
-    def exemplo_linha_ponto(self):
-        print("Abrindo exemplo: Linha e Ponto...")
-        charges = [
-            {"type": "line", "q": 1e-6, "start": [-80, -160], "end": [-80, 160]},
-            {"type": "point", "x": 80, "y": 0, "q": -1e-6}
-        ]
-        Process(target=run_simulation, args=(charges,)).start()
-
-    def exemplo_duas_linhas(self):
-        print("Abrindo exemplo: Duas Linhas...")
-        charges = [
-            {"type": "line", "q": 1e-6, "start": [-40, -120], "end": [-40, 120]},
-            {"type": "line", "q": -1e-6, "start": [40, -120], "end": [40, 120]}
-        ]
-        Process(target=run_simulation, args=(charges,)).start()
-
-    def exemplo_quadrupolo(self):
-        print("Abrindo exemplo: Quadrupolo...")
-        charges = [
-            {"type": "point", "x": -160, "y": 0, "q": 1e-6},
-            {"type": "point", "x": 160, "y": 0, "q": 1e-6},
-            {"type": "point", "x": 0, "y": -160, "q": -1e-6},
-            {"type": "point", "x": 0, "y": 160, "q": -1e-6}
-        ]
-        Process(target=run_simulation, args=(charges,)).start()
+    def abrir_cena(self, path):
+        print(f"Abrindo cena: {path}...")
+        self.launch(path)
 
     def exit_program(self):
         print("Saindo...")
@@ -134,6 +159,7 @@ class Menu:
     def run(self):
         while self.running:
             self.handle_events()
+            self.poll_worker()
             self.screen.fill(WHITE)
             self.screen.blit(self.background_image, (0, 0))
             self.screen.blit(self.title_text, (self.title_rect.x, self.title_rect.y - self.scroll_y))
@@ -141,6 +167,14 @@ class Menu:
             pygame.display.flip()
             self.clock.tick(60)
 
+        self.poll_worker(wait=True)  # Uma cena clicada ainda é aberta
+        if self.worker is not None:
+            try:
+                self.worker.send(None)  # Encerra o processo pré-aquecido que não foi usado
+            except OSError:  # Ele já tinha morrido
+                pass
+            self.worker.close()
+            self.worker_process.join()
         pygame.quit()
 
 if __name__ == "__main__":
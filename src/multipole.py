@@ -0,0 +1,104 @@
+import numpy
+from numpy import sqrt
+
+class QuadTree:
+    """A quadtree over point charges with multipole moments for each node.
+
+    Each node stores the monopole, dipole and (traceless) quadrupole moments
+    of its charges about the node's center.  Evaluating Barnes-Hut style, a
+    node whose width is less than 'theta' times its distance to a point is
+    summed through its moments; closer nodes are opened, down to leaves that
+    are summed directly.  The error shrinks roughly as theta**3.
+    """
+
+    LEAF_SIZE = 32  # The most charges kept in a leaf
+    MAX_DEPTH = 24  # Nodes this deep are leaves however many charges they hold
+
+    def __init__(self, x, y, q):
+        """Builds the tree over charges 'q' at (x, y)."""
+        x, y, q = (numpy.asarray(a, dtype=float) for a in (x, y, q))
+        order = numpy.arange(len(q))
+
+        # Nodes are (center x, center y, half width, start, end) with their
+        # charges in order[start:end], and up to four children
+        centers, halves, ranges, children = [], [], [], []
+        cx, cy = (x.min() + x.max()) / 2, (y.min() + y.max()) / 2
+        half = max(x.max() - x.min(), y.max() - y.min()) / 2 * (1 + 1e-9) + 1e-12
+        stack = [(len(centers), cx, cy, half, 0, len(q), 0)]
+        centers.append((cx, cy)); halves.append(half); ranges.append((0, len(q))); children.append(())
+        while stack:
+            node, cx, cy, half, start, end, depth = stack.pop()
+            if end - start <= self.LEAF_SIZE or depth >= self.MAX_DEPTH:
+                continue
+            index = order[start:end]
+            code = (x[index] >= cx).astype(int) + 2 * (y[index] >= cy)
+            order[start:end] = index[numpy.argsort(code, kind='stable')]
+            counts = numpy.bincount(code, minlength=4)
+            kids = []
+            for quadrant, count in enumerate(counts):
+                if count:
+                    child = len(centers)
+                    ccx = cx + (half / 2 if quadrant & 1 else -half / 2)
+                    ccy = cy + (half / 2 if quadrant & 2 else -half / 2)
+                    centers.append((ccx, ccy)); halves.append(half / 2)
+                    ranges.append((start, start + count)); children.append(())
+                    stack.append((child, ccx, ccy, half / 2, start, start + count, depth + 1))
+                    kids.append(child)
+                start += count
+            children[node] = tuple(kids)
+
+        self.x, self.y, self.q = x[order], y[order], q[order]
+        self.centers = numpy.array(centers)
+        self.halves = numpy.array(halves)
+        self.ranges = ranges
+        self.children = children
+
+        # Moments about each node's center
+        self.moments = numpy.empty((len(centers), 6))  # Q, Dx, Dy, Qxx, Qxy, Qyy
+        for node, (start, end) in enumerate(ranges):
+            dx = self.x[start:end] - self.centers[node, 0]
+            dy = self.y[start:end] - self.centers[node, 1]
+            qn = self.q[start:end]
+            self.moments[node] = (qn.sum(), qn @ dx, qn @ dy, qn @ (2 * dx**2 - dy**2),
+                                  3 * qn @ (dx * dy), qn @ (2 * dy**2 - dx**2))
+
+    def evaluate(self, quantity, kernel, theta, x, y):
+        """Sums the field 'E' or potential 'V' of the charges at points (x, y).
+
+        'kernel' is the direct point charge kernel used inside opened leaves.
+        Returns the (Ex, Ey) or (V,) components for the flat arrays (x, y).
+        """
+        out = numpy.zeros((2 if quantity == 'E' else 1, len(x)))
+        stack = [(0, numpy.arange(len(x)))]
+        while stack:
+            node, targets = stack.pop()
+            cx, cy = self.centers[node]
+            rx, ry = x[targets] - cx, y[targets] - cy
+            r_squared = rx**2 + ry**2
+            far = (2 * self.halves[node])**2 < theta**2 * r_squared
+            if far.any():
+                out[:, targets[far]] += self._expansion(quantity, node, rx[far], ry[far], r_squared[far])
+            near = targets[~far]
+            if not len(near):
+                continue
+            if self.children[node]:
+                stack.extend((child, near) for child in self.children[node])
+            else:
+                start, end = self.ranges[node]
+                out[:, near] += kernel(x[near], y[near], self.x[start:end], self.y[start:end],
+                                       self.q[start:end])
+        return out
+
+    def _expansion(self, quantity, node, rx, ry, r_squared):
+        """Evaluates the moments of 'node' at offsets (rx, ry) from its center."""
+        Q, Dx, Dy, Qxx, Qxy, Qyy = self.moments[node]
+        inv = 1 / sqrt(r_squared)
+        inv3 = inv / r_squared
+        inv5 = inv3 / r_squared
+        DR = Dx * rx + Dy * ry
+        QRx, QRy = Qxx * rx + Qxy * ry, Qxy * rx + Qyy * ry
+        RQR = rx * QRx + ry * QRy
+        if quantity == 'V':
+            return (Q * inv + DR * inv3 + 0.5 * RQR * inv5,)
+        radial = Q * inv3 + 3 * DR * inv5 + 2.5 * RQR * inv5 / r_squared
+        return radial * rx - Dx * inv3 - QRx * inv5, radial * ry - Dy * inv3 - QRy * inv5
@@ -0,0 +1,144 @@
+"""Timing of the phases of each frame and of the charge kernels.
+
+Code marks its phases with
+
+    with profiler.phase('events'):
+        ...
+
+and counts work with profiler.count(name, n).  Both do nothing until
+enable() is called: phase() then returns a shared do-nothing context, so
+the hooks can stay in the hot paths.  While enabled, the time of each
+phase is added to the current frame, which end_frame() closes, and every
+phase is also kept as an event of a trace that export_trace() writes in
+the Chrome trace format (for chrome://tracing or Perfetto).  Phases may
+nest and may run on any thread.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+
+HISTORY = 120  # The frames kept for the rolling averages
+TRACE_EVENTS = 200000  # The most recent phases kept for export_trace
+
+ENABLED = False
+_frames = deque(maxlen=HISTORY)  # The (duration, times, counts) of each closed frame
+_times = {}  # The seconds spent in each phase in the current frame
+_counts = {}  # The counts of the current frame
+_trace = deque(maxlen=TRACE_EVENTS)  # (name, thread, start, duration) of each phase
+_trace_counts = deque(maxlen=TRACE_EVENTS // 10)  # (time, counts) at the end of each frame
+_frame_start = None
+_lock = threading.Lock()
+
+
+class _Phase:
+    """Times one phase into the current frame and the trace."""
+
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        end = time.perf_counter()
+        with _lock:
+            _times[self.name] = _times.get(self.name, 0.0) + end - self.start
+            _trace.append((self.name, threading.get_ident(), self.start, end - self.start))
+        return False
+
+
+class _NoPhase:
+    """The phase of a disabled profiler."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NO_PHASE = _NoPhase()
+
+def enable(enabled=True):
+    """Turns the timing on or off, starting from an empty history when turned on."""
+    global ENABLED, _frame_start
+    if enabled and not ENABLED:
+        reset()
+        _frame_start = time.perf_counter()
+    ENABLED = enabled
+
+def reset():
+    """Drops the frames, the current frame and the trace."""
+    with _lock:
+        _frames.clear()
+        _times.clear()
+        _counts.clear()
+        _trace.clear()
+        _trace_counts.clear()
+
+def phase(name):
+    """Returns a context manager timing the phase 'name' when the profiler is enabled."""
+    return _Phase(name) if ENABLED else _NO_PHASE
+
+def count(name, n=1):
+    """Adds 'n' to the counter 'name' of the current frame when the profiler is enabled."""
+    if ENABLED:
+        with _lock:
+            _counts[name] = _counts.get(name, 0) + n
+
+def end_frame():
+    """Closes the current frame and starts the next one."""
+    global _frame_start
+    if not ENABLED:
+        return
+    now = time.perf_counter()
+    with _lock:
+        _frames.append((now - _frame_start, dict(_times), dict(_counts)))
+        _trace_counts.append((now, dict(_counts)))
+        _times.clear()
+        _counts.clear()
+        _trace.append(('frame', threading.get_ident(), _frame_start, now - _frame_start))
+    _frame_start = now
+
+def averages():
+    """Returns the mean frame time, and the mean time and count per frame of each phase and counter.
+
+    The means are over the last HISTORY frames, as (frame, {phase:
+    seconds}, {counter: count}); phases and counters are in the order first
+    seen.
+    """
+    with _lock:
+        frames = list(_frames)
+    if not frames:
+        return 0.0, {}, {}
+    n = len(frames)
+    times, counts = {}, {}
+    for _, frame_times, frame_counts in frames:
+        for name, seconds in frame_times.items():
+            times[name] = times.get(name, 0.0) + seconds / n
+        for name, value in frame_counts.items():
+            counts[name] = counts.get(name, 0) + value / n
+    return sum(frame[0] for frame in frames) / n, times, counts
+
+def export_trace(path):
+    """Writes the traced phases, and the counters of each frame, to 'path' as Chrome trace JSON.
+
+    Returns the number of events written.
+    """
+    with _lock:
+        trace, trace_counts = list(_trace), list(_trace_counts)
+    pid = os.getpid()
+    events = [{'name': name, 'ph': 'X', 'pid': pid, 'tid': thread, 'ts': 1e6 * start, 'dur': 1e6 * duration}
+              for name, thread, start, duration in trace]
+    events += [{'name': name, 'ph': 'C', 'pid': pid, 'ts': 1e6 * now, 'args': {name: value}}
+               for now, counts in trace_counts for name, value in counts.items()]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+    return len(events)
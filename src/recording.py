@@ -0,0 +1,134 @@
+"""Recording the input of a simulation session, and replaying it.
+
+A recording holds the charges a session started and ended with and the
+input events of each of its frames: mouse buttons, motion and wheel, and
+keys.  It is saved as JSON, gzip-compressed when the file name ends in
+.gz, with each event a short list:
+
+    [frame, "down", x, y, button]        [frame, "up", x, y, button]
+    [frame, "motion", x, y, dx, dy, left, middle, right]
+    [frame, "wheel", x, y, dx, dy]       [frame, "key", key]
+
+where a wheel event keeps the mouse position it happened at.  A Replay
+gives main() the events of one recorded frame per loop iteration without
+waiting for the frame rate, so a session runs the same way every time,
+headless and as fast as it can, and can serve as a benchmark.
+"""
+import gzip
+import json
+import time
+
+import numpy
+import pygame
+
+from scene import columns_from_dicts, dicts_from_columns
+
+VERSION = 1
+
+def _open(path, mode):
+    return gzip.open(path, mode + 't', encoding='utf-8') if path.endswith('.gz') else open(path, mode, encoding='utf-8')
+
+def encode(frame, event, mouse):
+    """Returns the recorded form of a pygame event, or None for events that are not recorded."""
+    if event.type in (pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP):
+        return [frame, 'down' if event.type == pygame.MOUSEBUTTONDOWN else 'up', *event.pos, event.button]
+    if event.type == pygame.MOUSEMOTION:
+        return [frame, 'motion', *event.pos, *event.rel, *(int(button) for button in event.buttons)]
+    if event.type == pygame.MOUSEWHEEL:
+        return [frame, 'wheel', *mouse, event.x, event.y]
+    if event.type == pygame.KEYDOWN:
+        return [frame, 'key', event.key]
+    return None
+
+def decode(record):
+    """Returns the pygame event and mouse position of a recorded event."""
+    kind, data = record[1], record[2:]
+    if kind in ('down', 'up'):
+        event_type = pygame.MOUSEBUTTONDOWN if kind == 'down' else pygame.MOUSEBUTTONUP
+        return pygame.event.Event(event_type, pos=tuple(data[:2]), button=data[2]), tuple(data[:2])
+    if kind == 'motion':
+        return (pygame.event.Event(pygame.MOUSEMOTION, pos=tuple(data[:2]), rel=tuple(data[2:4]),
+                                   buttons=tuple(data[4:7])), tuple(data[:2]))
+    if kind == 'wheel':
+        return pygame.event.Event(pygame.MOUSEWHEEL, x=data[2], y=data[3], flipped=False), tuple(data[:2])
+    if kind == 'key':
+        return pygame.event.Event(pygame.KEYDOWN, key=data[0], mod=0, unicode='', scancode=0), None
+    raise ValueError('unknown event %r' % kind)
+
+
+class Recorder:
+    """Records the input of a session into 'path' (see main)."""
+
+    def __init__(self, path):
+        self.path = path
+        self.charges = None  # The initial charges, as dicts
+        self.events = []
+        self.frames = 0
+
+    def start(self, charges):
+        """Starts the recording from the ChargeSet 'charges'."""
+        self.charges = dicts_from_columns(*charges._rows())
+
+    def record(self, events, mouse):
+        """Records the events of a frame, given the mouse position."""
+        for event in events:
+            record = encode(self.frames, event, mouse)
+            if record is not None:
+                self.events.append(record)
+        self.frames += 1
+
+    def save(self, charges):
+        """Saves the recording, with the final ChargeSet 'charges'."""
+        with _open(self.path, 'w') as f:
+            json.dump({'version': VERSION, 'frames': self.frames, 'charges': self.charges,
+                       'final': dicts_from_columns(*charges._rows()), 'events': self.events},
+                      f, separators=(',', ':'))
+
+
+class Replay:
+    """Replays the session recorded in 'path' (see main).
+
+    events() returns the events of the next frame, and a QUIT event once
+    the recording is played.  The time between calls is kept in 'times',
+    and main() calls finish() at the end.
+    """
+
+    def __init__(self, path):
+        with _open(path, 'r') as f:
+            data = json.load(f)
+        if data.get('version') != VERSION:
+            raise ValueError('%s: unknown recording version %r' % (path, data.get('version')))
+        self.path = path
+        self.charges = data['charges']  # The initial charges, as dicts
+        self.final = data['final']
+        self.frames = data['frames']
+        self.frame = 0
+        self.mouse = (0, 0)  # The mouse position as of the events replayed
+        self.times = []
+        self.reproduced = None  # Whether the session ended with the recorded charges (see finish)
+        self._events = {}
+        for record in data['events']:
+            self._events.setdefault(record[0], []).append(record)
+        self._last = None
+
+    def events(self):
+        """Returns the pygame events of the next frame."""
+        now = time.perf_counter()
+        if self._last is not None:
+            self.times.append(now - self._last)
+        self._last = now
+        if self.frame >= self.frames:
+            return [pygame.event.Event(pygame.QUIT)]
+        events = []
+        for record in self._events.get(self.frame, ()):
+            event, mouse = decode(record)
+            events.append(event)
+            if mouse is not None:
+                self.mouse = mouse
+        self.frame += 1
+        return events
+
+    def finish(self, charges):
+        """Notes whether the session ended with the ChargeSet 'charges' as recorded, in 'reproduced'."""
+        final = columns_from_dicts(self.final)
+        self.reproduced = all(a.shape == b.shape and numpy.allclose(a, b) for a, b in zip(charges._rows(), final))
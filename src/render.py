@@ -0,0 +1,174 @@
+"""Renders scenes to PNG files without a display.
+
+Render one image of a scene:
+
+    python src/render.py scenes/01_dipolo.json -o dipolo.png --mode both
+
+or a numbered frame sequence, here moving charge 0 from x=-150 to x=150:
+
+    python src/render.py scenes/01_dipolo.json -o frames/dipolo_%04d.png \\
+        --frames 60 --animate 0 x -150 150 --workers 4
+
+Frames are independent, so they are rendered in a pool of processes, and
+each one is written to disk as soon as it is done.
+"""
+import argparse
+import os
+from multiprocessing import Pool
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame  # noqa: E402
+
+import electrostatics  # noqa: E402
+from electrostatics import ElectricField, Potential  # noqa: E402
+from scene import load_scene  # noqa: E402
+
+WHITE = (255, 255, 255)
+BLACK = (0, 0, 0)
+MODES = ('field', 'potential', 'both')
+ANIMATED = ('x', 'y', 'x2', 'y2', 'q')  # The charge values that can be animated
+
+def render(charges, mode, width, height, resolution=None, spacing=27, contours=0, tolerance=None):
+    """Returns a surface with the field arrows, the potential heatmap or both, and the charges.
+
+    'contours' is the number of equipotentials drawn over them, if any, and
+    'tolerance' samples the heatmap adaptively (see HeatmapRefiner).
+    """
+    surface = pygame.Surface((width, height))
+    surface.fill(WHITE)
+    potential = Potential(charges)
+    if mode in ('potential', 'both'):
+        potential.plot(surface, width, height, resolution=resolution, tolerance=tolerance)
+    if mode in ('field', 'both'):
+        ElectricField(charges).plot(surface, width, height, spacing=spacing)
+    if contours:
+        potential.plot_contours(surface, width, height, contours,
+                                color=BLACK if mode == 'field' else WHITE)
+    charges.plot(surface, width, height)
+    return surface
+
+def animate(charges, index, name, value):
+    """Sets the value 'name' (see ANIMATED) of charge 'index' to 'value'.
+
+    'x' and 'y' are a point charge's position or a line charge's first end
+    point, and 'x2' and 'y2' a line charge's second end point.
+    """
+    charge = charges[index]
+    if name == 'q':
+        charge.q = value
+    elif hasattr(charge, 'x1'):
+        end = 'x2' if name.endswith('2') else 'x1'
+        point = getattr(charge, end)
+        point[0 if name.startswith('x') else 1] = value
+        setattr(charge, end, point)
+    elif name in ('x', 'y'):
+        setattr(charge, name, value)
+    else:
+        raise ValueError('a point charge has no %r' % name)
+
+#-----------------------------------------------------------------------------
+# Frame sequences
+
+_WORKER = {}  # The scene and options of a worker process
+
+def configure(options):
+    """Sets the domain, precision and memory budget of the evaluations from 'options'."""
+    electrostatics.init(options['width'], options['height'], options['zoom'], options['xoffset'], options['yoffset'])
+    electrostatics.set_precision(options['precision'])
+    if options['memory']:
+        electrostatics.set_memory_budget(int(options['memory'] * 2**20))
+
+def _init_worker(options):
+    """Loads the scene once per worker process."""
+    configure(options)
+    _WORKER.update(options, charges=load_scene(options['scene']))
+
+def _render_frame(frame):
+    """Renders and saves frame number 'frame', returning its path."""
+    options = _WORKER
+    if options['animate']:
+        index, name, start, stop = options['animate']
+        t = frame / max(1, options['frames'] - 1)
+        animate(options['charges'], index, name, start + t * (stop - start))
+    surface = render(options['charges'], options['mode'], options['width'], options['height'],
+                     options['resolution'], options['spacing'], options['contours'], options['tolerance'])
+    path = options['output'] % frame
+    pygame.image.save(surface, path)
+    return path
+
+def render_frames(options, workers=None):
+    """Renders options['frames'] frames in a process pool, yielding each path once it is saved."""
+    directory = os.path.dirname(options['output'])
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if workers == 1:
+        _init_worker(options)
+        for frame in range(options['frames']):
+            yield _render_frame(frame)
+        return
+    with Pool(workers, initializer=_init_worker, initargs=(options,)) as pool:
+        yield from pool.imap(_render_frame, range(options['frames']))
+
+#-----------------------------------------------------------------------------
+# Command line
+
+def parse_size(text):
+    """Parses a WIDTHxHEIGHT size."""
+    width, height = text.lower().split('x')
+    return int(width), int(height)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Renders a scene to PNG without a display.')
+    parser.add_argument('scene', help='the scene file (.json or .npz)')
+    parser.add_argument('-o', '--output', help='the PNG file, or a %%d pattern for frames')
+    parser.add_argument('--mode', choices=MODES, default='field')
+    parser.add_argument('--size', type=parse_size, default=(800, 600), help='WIDTHxHEIGHT (default 800x600)')
+    parser.add_argument('--zoom', type=float, default=1)
+    parser.add_argument('--xoffset', type=float, default=0)
+    parser.add_argument('--yoffset', type=float, default=0)
+    parser.add_argument('--resolution', type=int, help='heatmap samples per axis (default: one per pixel)')
+    parser.add_argument('--tolerance', type=float,
+                        help='sample the heatmap adaptively to this error in its log scale (a color step is 1/256)')
+    parser.add_argument('--spacing', type=int, default=27, help='arrow spacing in pixels')
+    parser.add_argument('--precision', choices=('float32', 'float64'), default='float64',
+                        help='the precision of the field and potential evaluations')
+    parser.add_argument('--memory', type=float, metavar='MB',
+                        help='bound on the temporary memory of each evaluation (default 16)')
+    parser.add_argument('--contours', type=int, default=0, metavar='N', help='draw about N equipotentials')
+    parser.add_argument('--frames', type=int, help='render this many numbered frames')
+    parser.add_argument('--animate', nargs=4, metavar=('INDEX', 'VALUE', 'START', 'STOP'),
+                        help='sweep a value (%s) of a charge linearly over the frames' % ', '.join(ANIMATED))
+    parser.add_argument('--workers', type=int, help='frame rendering processes (default: one per CPU)')
+    args = parser.parse_args(argv)
+    if args.animate:
+        index, name, start, stop = args.animate
+        if name not in ANIMATED:
+            parser.error('--animate VALUE must be one of %s' % ', '.join(ANIMATED))
+        args.animate = int(index), name, float(start), float(stop)
+        args.frames = args.frames or 30
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    width, height = args.size
+    options = {
+        'scene': args.scene, 'mode': args.mode, 'width': width, 'height': height,
+        'zoom': args.zoom, 'xoffset': args.xoffset, 'yoffset': args.yoffset, 'resolution': args.resolution,
+        'spacing': args.spacing, 'contours': args.contours, 'tolerance': args.tolerance,
+        'precision': args.precision, 'memory': args.memory, 'frames': args.frames, 'animate': args.animate,
+    }
+    base = os.path.splitext(os.path.basename(args.scene))[0]
+    if args.frames:
+        options['output'] = args.output or base + '_%04d.png'
+        for path in render_frames(options, args.workers):
+            print(path)
+    else:
+        configure(options)
+        path = args.output or base + '.png'
+        pygame.image.save(render(load_scene(args.scene), args.mode, width, height,
+                                 args.resolution, args.spacing, args.contours, args.tolerance), path)
+        print(path)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Reading and writing scenes of charges.
+
+A scene is stored either as JSON, for hand-edited scenes:
+
+    {"name": "Exemplo: Dipolo",
+     "charges": [{"type": "point", "x": -80, "y": 0, "q": 1e-6},
+                 {"type": "line", "q": 1e-6, "start": [-80, -160], "end": [-80, 160]}]}
+
+or as a NumPy .npz archive of columns, for large generated distributions:
+'x1' and 'x2' (n, 2) end points (a point charge's position in both), 'q'
+(n,) charges, 'line' (n,) booleans and an optional 'name'.  Both load
+straight into a ChargeSet's arrays.
+"""
+import json
+import os
+
+import numpy
+
+SCENE_EXTENSIONS = ('.json', '.npz')
+
+def columns_from_dicts(charges):
+    """Returns the (x1, x2, q, line) columns of charges given as dicts."""
+    x1 = numpy.empty((len(charges), 2))
+    x2 = numpy.empty((len(charges), 2))
+    q = numpy.empty(len(charges))
+    line = numpy.empty(len(charges), dtype=bool)
+    for i, charge in enumerate(charges):
+        if charge["type"] == "point":
+            x1[i] = x2[i] = charge["x"], charge["y"]
+        elif charge["type"] == "line":
+            x1[i], x2[i] = charge["start"], charge["end"]
+        else:
+            raise ValueError('unknown charge type %r' % charge["type"])
+        q[i] = charge["q"]
+        line[i] = charge["type"] == "line"
+    return x1, x2, q, line
+
+def dicts_from_columns(x1, x2, q, line):
+    """Returns charges given as dicts from (x1, x2, q, line) columns."""
+    charges = []
+    for a, b, charge, is_line in zip(x1.tolist(), x2.tolist(), q.tolist(), line.tolist()):
+        if is_line:
+            charges.append({"type": "line", "q": charge, "start": a, "end": b})
+        else:
+            charges.append({"type": "point", "x": a[0], "y": a[1], "q": charge})
+    return charges
+
+def load_scene(path):
+    """Returns the ChargeSet stored in the scene file 'path'."""
+    from electrostatics import ChargeSet  # Imported here so that listing scenes stays light
+    if path.endswith('.npz'):
+        with numpy.load(path) as data:
+            return ChargeSet.from_arrays(data['x1'], data['x2'], data['q'], data['line'])
+    with open(path, encoding='utf-8') as f:
+        return ChargeSet.from_arrays(*columns_from_dicts(json.load(f)["charges"]))
+
+def save_scene(path, charges, name=None):
+    """Stores 'charges' in the scene file 'path', as .npz or JSON by its extension."""
+    x1, x2, q, line = charges._rows()
+    name = name or scene_name(path)
+    if path.endswith('.npz'):
+        numpy.savez(path, x1=x1, x2=x2, q=q, line=line, name=numpy.array(name))
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"name": name, "charges": dicts_from_columns(x1, x2, q, line)}, f, indent=4)
+
+def scene_name(path):
+    """Returns the name stored in the scene file 'path', or one made from the file name."""
+    try:
+        if path.endswith('.npz'):
+            with numpy.load(path) as data:
+                if 'name' in data:
+                    return str(data['name'])
+        else:
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)["name"]
+    except (OSError, KeyError, ValueError):
+        pass
+    return os.path.splitext(os.path.basename(path))[0].replace('_', ' ')
+
+def list_scenes(directory):
+    """Returns the (name, path) of each scene file in 'directory', sorted by file name."""
+    if not os.path.isdir(directory):
+        return []
+    paths = sorted(os.path.join(directory, entry) for entry in os.listdir(directory)
+                   if entry.endswith(SCENE_EXTENSIONS))
+    return [(scene_name(path), path) for path in paths]
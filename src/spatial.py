@@ -0,0 +1,61 @@
+from math import floor
+
+class SpatialHash:
+    """A uniform grid of square cells for finding the points near a position.
+
+    Each point is stored under a hashable key.  Points can be inserted, moved
+    and removed one at a time, and a nearest-point query only looks at the
+    cells within its radius.
+    """
+
+    def __init__(self, cell=50):
+        """Initializes an empty grid of cells 'cell' wide."""
+        self.cell = cell
+        self._cells = {}  # (i, j) -> {key: (x, y)}
+        self._points = {}  # key -> (i, j)
+
+    def __len__(self):
+        return len(self._points)
+
+    def __contains__(self, key):
+        return key in self._points
+
+    def _cell_of(self, x, y):
+        """Returns the cell holding (x, y)."""
+        return floor(x / self.cell), floor(y / self.cell)
+
+    def insert(self, key, x, y):
+        """Adds the point (x, y) under 'key'."""
+        cell = self._cell_of(x, y)
+        self._cells.setdefault(cell, {})[key] = (x, y)
+        self._points[key] = cell
+
+    def remove(self, key):
+        """Removes the point under 'key'."""
+        cell = self._points.pop(key)
+        bucket = self._cells[cell]
+        del bucket[key]
+        if not bucket:
+            del self._cells[cell]
+
+    def move(self, key, x, y):
+        """Moves the point under 'key' to (x, y)."""
+        cell = self._cell_of(x, y)
+        if self._points[key] == cell:
+            self._cells[cell][key] = (x, y)
+        else:
+            self.remove(key)
+            self.insert(key, x, y)
+
+    def nearest(self, x, y, radius):
+        """Returns the key of the point nearest to (x, y) closer than 'radius', or None."""
+        best, best_distance = None, radius**2
+        i0, j0 = self._cell_of(x - radius, y - radius)
+        i1, j1 = self._cell_of(x + radius, y + radius)
+        for i in range(i0, i1 + 1):
+            for j in range(j0, j1 + 1):
+                for key, (px, py) in self._cells.get((i, j), {}).items():
+                    distance = (px - x)**2 + (py - y)**2
+                    if distance < best_distance:
+                        best, best_distance = key, distance
+        return best
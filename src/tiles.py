@@ -0,0 +1,192 @@
+"""A pyramid of rendered tiles of the field or potential, for zooming and panning.
+
+Zoom level 'level' shows the world at ZOOM = 2**(level / STEPS) pixels per
+unit.  At each level the plane is cut into TILE_SIZE pixel tiles, where
+tile (i, j) covers pixels [i, i + 1) * TILE_SIZE to the right and
+[j, j + 1) * TILE_SIZE down from the world origin.  A tile only depends on
+its level, position, the plot mode and the charges, so panning reuses every
+tile still on screen, and a tile that is not rendered yet is stood in for
+by its last rendered version or by enlarged tiles of coarser levels.
+"""
+import math
+import threading
+from collections import OrderedDict, namedtuple
+
+import pygame
+
+TILE_SIZE = 256  # The width and height of a tile in pixels
+STEPS = 4  # Zoom levels per doubling
+FALLBACK_LEVELS = 2 * STEPS  # How many coarser levels are searched for stand-ins
+BUDGET = 64 * 2**20  # Default bound on the memory held by a TileCache, in bytes
+REFINE_BUDGET = 0.01  # Seconds spent refining a potential tile per render_tile call
+WHITE = (255, 255, 255)
+
+def level_zoom(level):
+    """Returns the zoom of 'level'."""
+    return 2**(level / STEPS)
+
+def tile_extent(level, i, j):
+    """Returns the (xmin, xmax, ymin, ymax) world rectangle of tile (i, j) of 'level'."""
+    size = TILE_SIZE / level_zoom(level)
+    return i * size, (i + 1) * size, -(j + 1) * size, -j * size
+
+def tile_origin(level, xoffset, yoffset, screen_width, screen_height):
+    """Returns the screen position of the world origin at 'level', in whole pixels."""
+    zoom = level_zoom(level)
+    return round(screen_width / 2 - xoffset * zoom), round(screen_height / 2 + yoffset * zoom)
+
+def visible_tiles(level, xoffset, yoffset, screen_width, screen_height):
+    """Returns the (i, j) of the tiles on screen, nearest the center first."""
+    ox, oy = tile_origin(level, xoffset, yoffset, screen_width, screen_height)
+    columns = range(-ox // TILE_SIZE, (screen_width - ox - 1) // TILE_SIZE + 1)
+    rows = range(-oy // TILE_SIZE, (screen_height - oy - 1) // TILE_SIZE + 1)
+    center_i = (screen_width / 2 - ox) / TILE_SIZE - 0.5
+    center_j = (screen_height / 2 - oy) / TILE_SIZE - 0.5
+    return sorted(((i, j) for i in columns for j in rows),
+                  key=lambda tile: (tile[0] - center_i)**2 + (tile[1] - center_j)**2)
+
+
+class TileKey(namedtuple('TileKey', 'mode level i j revision')):
+    """The cache key of tile (i, j) of 'level' in the plot 'mode', rendered at the charges' 'revision'."""
+
+    __slots__ = ()
+
+    @property
+    def tile(self):
+        """The (mode, level, i, j) of the tile, whatever the revision."""
+        return self[:4]
+
+
+def render_tile(field, potential, mode, level, i, j):
+    """Returns a new surface with tile (i, j) of 'level' of the 'field' or 'potential' mode,
+    and whether the tile is complete.
+
+    Potential tiles are drawn progressively, one sample per pixel: the first
+    call gives a coarse tile and each later one refines it for REFINE_BUDGET.
+    """
+    surface = pygame.Surface((TILE_SIZE, TILE_SIZE))
+    surface.fill(WHITE)
+    extent = tile_extent(level, i, j)
+    if mode == 'potential':
+        complete = potential.plot(surface, TILE_SIZE, TILE_SIZE, resolution=None, extent=extent,
+                                  budget=REFINE_BUDGET)
+    else:
+        field.plot(surface, TILE_SIZE, TILE_SIZE, extent=extent)
+        complete = True
+    return surface, complete
+
+
+class TileCache:
+    """Rendered surfaces by key, dropping the least recently used past a memory budget.
+
+    Tiles are stored under TileKeys, and other surfaces (such as overlays)
+    under any other hashable key.  A surface may be put as incomplete, to be
+    shown until it is replaced.  The cache may be filled from one thread and
+    read from another.
+    """
+
+    def __init__(self, budget=BUDGET):
+        self.budget = budget
+        self.size = 0  # The bytes held
+        self.version = 0  # Bumped on every put, so that readers can tell when to redraw
+        self._surfaces = OrderedDict()
+        self._newest = {}  # The newest revision put of each (mode, level, i, j)
+        self._incomplete = set()  # The keys whose surfaces are still to be refined
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._surfaces
+
+    def get(self, key):
+        """Returns the surface under 'key', or None."""
+        with self._lock:
+            surface = self._surfaces.get(key)
+            if surface is not None:
+                self._surfaces.move_to_end(key)
+            return surface
+
+    def complete(self, key):
+        """Returns True if the surface under 'key' is there and complete."""
+        with self._lock:
+            return key in self._surfaces and key not in self._incomplete
+
+    def put(self, key, surface, complete=True):
+        """Stores 'surface' under 'key', evicting the least recently used surfaces over budget."""
+        with self._lock:
+            if key in self._surfaces:
+                self.size -= self._bytes(self._surfaces.pop(key))
+            self._surfaces[key] = surface
+            if complete:
+                self._incomplete.discard(key)
+            else:
+                self._incomplete.add(key)
+            self.size += self._bytes(surface)
+            if isinstance(key, TileKey) and key.revision >= self._newest.get(key.tile, key.revision):
+                self._newest[key.tile] = key.revision
+            while self.size > self.budget and len(self._surfaces) > 1:
+                old, evicted = self._surfaces.popitem(last=False)
+                self.size -= self._bytes(evicted)
+                self._incomplete.discard(old)
+                if isinstance(old, TileKey) and self._newest.get(old.tile) == old.revision:
+                    del self._newest[old.tile]
+            self.version += 1
+
+    def newest(self, mode, level, i, j):
+        """Returns the newest rendered surface of a tile, whatever its revision, or None."""
+        with self._lock:
+            revision = self._newest.get((mode, level, i, j))
+        return None if revision is None else self.get(TileKey(mode, level, i, j, revision))
+
+    @staticmethod
+    def _bytes(surface):
+        return surface.get_bytesize() * surface.get_width() * surface.get_height()
+
+
+def compose(surface, cache, mode, level, revision, xoffset, yoffset):
+    """Draws the tiles of the view onto 'surface', standing in for missing ones.
+
+    A missing tile is drawn from its newest other revision, or else from
+    the tiles of the nearest coarser level that has any, enlarged.  Returns
+    the keys of the missing tiles and of the incomplete ones, each nearest
+    the center first.
+    """
+    width, height = surface.get_size()
+    surface.fill(WHITE)
+    ox, oy = tile_origin(level, xoffset, yoffset, width, height)
+    missing, incomplete = [], []
+    for i, j in visible_tiles(level, xoffset, yoffset, width, height):
+        key = TileKey(mode, level, i, j, revision)
+        position = (ox + i * TILE_SIZE, oy + j * TILE_SIZE)
+        tile = cache.get(key)
+        if tile is None:
+            missing.append(key)
+            tile = cache.newest(mode, level, i, j)
+        elif not cache.complete(key):
+            incomplete.append(key)
+        if tile is not None:
+            surface.blit(tile, position)
+        else:
+            _draw_parents(surface, cache, mode, level, i, j, revision, position, xoffset, yoffset)
+    return missing, incomplete
+
+def _draw_parents(surface, cache, mode, level, i, j, revision, position, xoffset, yoffset):
+    """Draws the area of tile (i, j) from enlarged tiles of the nearest coarser level that has any."""
+    width, height = surface.get_size()
+    surface.set_clip(pygame.Rect(position, (TILE_SIZE, TILE_SIZE)))
+    for parent in range(level - 1, level - FALLBACK_LEVELS - 1, -1):
+        ratio = level_zoom(level - parent)  # The enlargement from the parent level
+        size = math.ceil(TILE_SIZE * ratio)
+        ox, oy = tile_origin(parent, xoffset, yoffset, width, height)
+        ox, oy = width / 2 + (ox - width / 2) * ratio, height / 2 + (oy - height / 2) * ratio
+        drawn = False
+        for pi in range(math.floor(i / ratio), math.floor((i + 1) / ratio - 1e-9) + 1):
+            for pj in range(math.floor(j / ratio), math.floor((j + 1) / ratio - 1e-9) + 1):
+                tile = cache.get(TileKey(mode, parent, pi, pj, revision)) or cache.newest(mode, parent, pi, pj)
+                if tile is not None:
+                    surface.blit(pygame.transform.scale(tile, (size, size)),
+                                 (round(ox + pi * TILE_SIZE * ratio), round(oy + pj * TILE_SIZE * ratio)))
+                    drawn = True
+        if drawn:
+            break
+    surface.set_clip(None)
@@ -0,0 +1,86 @@
+"""Checks the accuracy of FieldTable against the exact sums, at a realistic number of charges.
+
+Run from the repository root:
+
+    python -m pytest tests
+"""
+import os
+import sys
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import numpy  # noqa: E402
+import pytest  # noqa: E402
+
+import electrostatics  # noqa: E402
+from electrostatics import ChargeSet, FieldTable, PointCharge  # noqa: E402
+
+EXTENT = (-400.0, 400.0, -300.0, 300.0)
+CHARGES = 512
+POINTS = 20000
+
+
+def random_charges(seed, count=CHARGES):
+    """Returns a ChargeSet of 'count' charges over EXTENT, a quarter of them line charges, summing to zero."""
+    rng = numpy.random.default_rng(seed)
+    xmin, xmax, ymin, ymax = EXTENT
+    x1 = numpy.column_stack([rng.uniform(xmin, xmax, count), rng.uniform(ymin, ymax, count)])
+    line = rng.random(count) < 0.25
+    angle = rng.uniform(0, 2 * numpy.pi, count)
+    length = numpy.where(line, rng.uniform(20, 80, count), 0)
+    x2 = x1 + length[:, numpy.newaxis] * numpy.column_stack([numpy.cos(angle), numpy.sin(angle)])
+    q = rng.choice([-1.0, 1.0], count) * rng.uniform(0.5, 2, count)
+    return ChargeSet.from_arrays(x1, x2, q - q.mean(), line)
+
+
+def relative_errors(table, charges, quantity, seed):
+    """Returns the error of 'table' at random points, relative to the exact value there."""
+    rng = numpy.random.default_rng(seed)
+    xmin, xmax, ymin, ymax = EXTENT
+    x, y = rng.uniform(xmin, xmax, POINTS), rng.uniform(ymin, ymax, POINTS)
+    exact = numpy.reshape(getattr(charges, quantity)(x, y), (-1, POINTS))
+    values = numpy.reshape(getattr(table, quantity)(x, y), (-1, POINTS))
+    return numpy.hypot.reduce(values - exact, axis=0) / numpy.hypot.reduce(exact, axis=0)
+
+
+@pytest.fixture(scope='module', autouse=True)
+def viewport():
+    electrostatics.init(800, 600)
+
+
+@pytest.mark.parametrize('order', [1, 3])
+@pytest.mark.parametrize('quantity', ['E', 'V'])
+def test_error_bound(order, quantity):
+    charges = random_charges(0)
+    table = FieldTable(charges, order=order, extent=EXTENT)
+    error = relative_errors(table, charges, quantity, 1)
+    assert numpy.percentile(error, 99) <= table.tolerance
+    if quantity == 'E':  # The potential crosses zero, where no relative error is bounded
+        assert error.max() <= 10 * table.tolerance
+
+
+def test_error_bound_after_drag():
+    charges = random_charges(2)
+    table = FieldTable(charges, extent=EXTENT)
+    table.build()
+    charge = next(charge for charge in charges if isinstance(charge, PointCharge))
+    charges.hold(charge)
+    for step in range(3):
+        charge.x, charge.y = charge.x + 15, charge.y - 10
+        error = relative_errors(table, charges, 'E', 3 + step)
+        assert numpy.percentile(error, 99) <= table.tolerance
+        assert error.max() <= 10 * table.tolerance
+    charges.hold(None)
+
+
+def test_single_points_match_batches():
+    charges = random_charges(4)
+    table = FieldTable(charges, extent=EXTENT)
+    rng = numpy.random.default_rng(5)
+    x, y = rng.uniform(-450, 450, 200), rng.uniform(-350, 350, 200)  # Some off the table
+    Ex, Ey = table.E(x, y)
+    single = numpy.array([table.E(a, b) for a, b in zip(x.tolist(), y.tolist())])
+    assert numpy.allclose(single, numpy.column_stack([Ex, Ey]), rtol=1e-12, atol=0)
+    V = table.V(x, y)
+    assert numpy.allclose([table.V(a, b) for a, b in zip(x.tolist(), y.tolist())], V, rtol=1e-12, atol=0)